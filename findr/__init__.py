@@ -21,11 +21,34 @@ For examples, see: findr.examples.
 """
 
 import ctypes
-__all__=["auto","common","pij","netr","osdepend","types"]
+__all__=["anchors","auto","backend","batch","blocks","cascade","common","dist","export","fdr","io","labeled","llr","pij","plan","plink","preprocess","quant","netr","server","stability","osdepend","panel","stats","sym","types","util"]
 from . import pij, netr
 try: from exceptions import ValueError,OSError
 except ImportError: pass
 
+def __getattr__(name):
+	"""Imports optional submodules on first access as attributes, e.g. findr.blocks, without importing them with findr."""
+	if name in __all__:
+		from importlib import import_module
+		return import_module('.'+name,__name__)
+	raise AttributeError("module '"+__name__+"' has no attribute '"+name+"'")
+
+def estimate(*a,**ka):
+	"""Predicts peak memory and runtime of a findr function. See findr.plan.estimate."""
+	from .plan import estimate
+	return estimate(*a,**ka)
+
+class _lazy(object):
+	"""Method of findr.lib implemented in an optional module, which is only imported when the method is first accessed."""
+	def __init__(self,module,name):
+		self.module=module
+		self.name=name
+	def __get__(self,obj,cls=None):
+		from importlib import import_module
+		from types import MethodType
+		f=getattr(import_module('.'+self.module,__name__),self.name)
+		return f if obj is None else MethodType(f,obj)
+
 class lib:
 	@staticmethod	
 	def default_libpaths():
@@ -37,14 +60,18 @@ class lib:
 		else:
 			lp=lpaths
 		return [pjoin(x,libfname) for x in lp]
-	def __init__(self,path=None,loglv=6,rs=0,nth=0):
+	def __init__(self,path=None,loglv=6,rs=0,nth=0,backend='c'):
 		"""Links and initializes shared library.
 		path:	Extra exact file location for shared library
 		loglv:	Level of logging output. 1-3: Errors, 4-6: Warnings, 7-9: Infos, 10-12: Debug, 0: Default(6).
 		rs:		Initial random seed. Default (0) indicates to use current time.
 		nth:	Maximum number of parallel threads. Default (0) indicates to use automatically determined number of cores (not always correct).
+		backend:	Engine of findr functions. 'c': shared library. 'numpy': NumPy reference engine in findr.backend, without the library.
+			'auto': shared library if found, or NumPy engine otherwise.
 		"""
 		self.lib=None
+		self.path=None
+		self.version=None
 		import logging
 		from .auto import pkgname,version
 		from .osdepend import fdll,typesizet
@@ -54,6 +81,15 @@ class lib:
 			raise ValueError('Wrong log level')
 		if nth<0:
 			raise ValueError('Wrong number of threads')
+		if backend not in ['c','numpy','auto']:
+			raise ValueError('Unknown backend: '+str(backend))
+		self.loglv=loglv
+		self.rs=rs
+		self.nth=nth
+		self.backend=backend
+		if backend=='numpy':
+			self._numpy()
+			return
 		paths=self.default_libpaths()
 		if path:
 			paths=[path]+paths
@@ -78,8 +114,22 @@ class lib:
 				continue
 			break
 		if lib is None:
+			if backend=='auto':
+				logging.warning('Library not found at default path. Using NumPy engine.')
+				self.backend='numpy'
+				self._numpy()
+				return
 			raise OSError("Library not found at default path. Please install/update "+pkgname+' library and python interface, or set library path manually.')
 		self.lib=lib
+		self.path=p
+		self.version=lv
+		self.backend='c'
+	def _numpy(self):
+		"""Replaces library functions with the NumPy engine for this instance."""
+		from types import MethodType
+		from .backend import methods
+		for k,f in methods().items():
+			setattr(self,k,MethodType(f,self))
 	def cfunc(self,*a,**ka):
 		if self.lib is None:
 			raise ValueError("Not initialized.")
@@ -96,6 +146,15 @@ class lib:
 	pij_rank=pij.rank
 	pij_rank_pv=pij.rank_pv
 	netr_one_greedy=netr.one_greedy
+	netr_one_greedy_parallel=netr.one_greedy_parallel
+	netr_one_greedy_sweep=netr.one_greedy_sweep
+	labeled=_lazy('labeled','run')
+	blocks=_lazy('blocks','run')
+	calibrate=_lazy('plan','calibrate')
+	cascade=_lazy('cascade','run')
+	stability=_lazy('stability','run')
+	batch=_lazy('batch','run')
+	dist_work=_lazy('dist','work')
 	
 	
 	
@@ -0,0 +1,290 @@
+# Copyright 2016-2018, 2020 Lingfei Wang
+# 
+# This file is part of Findr.
+# 
+# Findr is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# Findr is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+# 
+# You should have received a copy of the GNU Affero General Public License
+# along with Findr.  If not, see <http://www.gnu.org/licenses/>.
+# 
+"""Command line interface of findr, as python -m findr.
+Subcommands:
+	run:	Runs a pij function in planned row blocks, writing each block into an output directory (as in findr.blocks checkpoints),
+		and assembles outputs into one file per output key. Interrupted runs resume from completed blocks.
+		Blocks can be split into shards for separate jobs, or for multiple local processes.
+	merge:	Assembles outputs of completed blocks, e.g. after all shards have finished.
+	netr:	Runs netr_one_greedy.
+	plan:	Predicts memory and runtime with findr.estimate.
+	publish:	Publishes a run into a work queue of tiles on a shared filesystem, for workers on multiple nodes (findr.dist).
+	work:	Runs a worker that computes tiles of a published run until none is left.
+	status:	Reports progress of a published run.
+	collect:	Verifies completeness of a published run and assembles its outputs.
+Input files are read with findr.io.load: .npy files, or raw binary files of findr-bin with sidecar metadata or --ns.
+Each subcommand prints a summary in JSON, including timing.
+For options, see python -m findr <subcommand> -h."""
+
+try: from exceptions import ValueError
+except ImportError: pass
+
+def _lib(a):
+	from . import lib
+	return lib(path=a.lib,loglv=a.loglv,rs=a.rs,nth=a.nth,backend=a.backend)
+
+def _ka(a):
+	ka={}
+	if getattr(a,'nodiag',False):
+		ka['nodiag']=True
+	if getattr(a,'na',None) is not None:
+		ka['na']=a.na
+	if getattr(a,'memlimit',None) is not None:
+		ka['memlimit']=a.memlimit
+	return ka
+
+def _shard(todo,shard):
+	"""Blocks of shard i of n, as contiguous ranges of blocks."""
+	i,n=shard
+	k=len(todo)
+	return todo[k*i//n:k*(i+1)//n]
+
+def _parseshard(s):
+	i,n=[int(x) for x in s.split('/')]
+	if n<=0 or i<0 or i>=n:
+		raise ValueError('Wrong shard '+s)
+	return (i,n)
+
+def _plannrow(a,name,data):
+	from .blocks import spec,defaultnrow
+	from .plan import maxnrow
+	nt,nt2,_=spec(name,data)
+	ns=data[-1].shape[1]
+	if a.nrow is not None:
+		return a.nrow
+	if a.memory is not None:
+		n=maxnrow(name,nt,nt2,ns,a.memory,memlimit=a.memlimit if a.memlimit is not None else -1,backend=a.backend)
+		if n==0:
+			raise ValueError('Memory budget too small for a single row.')
+		return n
+	return defaultnrow(name,nt,nt2)
+
+def cmd_run(a):
+	import os
+	import sys
+	import time
+	import subprocess
+	from .blocks import spec,bounds,checkpoint,iterblocks,assemble,_fixka,_blockfile,_save,printprogress
+	from .io import loadinputs
+	from .plan import estimate
+	from .quant import check
+	t0=time.time()
+	name=a.method
+	check(name,a.out_dtype)
+	data=loadinputs(a.inputs,name,a.ns)
+	nt,nt2,_=spec(name,data)
+	ns=data[-1].shape[1]
+	ka=_fixka(name,data,_ka(a))
+	nrow=_plannrow(a,name,data)
+	shard=_parseshard(a.shard) if a.shard else (0,1)
+	todo=[x for x in _shard(bounds(nt,nrow),shard)]
+	done=set(checkpoint(a.output,name,data,ka,nrow))
+	todo=[x for x in todo if x not in done]
+	est=estimate(name,nt,nt2,ns,memlimit=ka.get('memlimit',-1),nth=a.nth,nrow=nrow,backend=a.backend)
+	ans={'method':name,'nt':nt,'nt2':nt2,'ns':ns,'nrow':nrow,'nblock':len(bounds(nt,nrow)),'shard':list(shard),
+		'skipped':len(_shard(bounds(nt,nrow),shard))-len(todo),'predicted_memory':est['memory'],'predicted_runtime':est['runtime']}
+	ret=0
+	if a.nproc>1:
+		#Subprocesses each run a subshard with a share of threads
+		n=a.nproc
+		args=[sys.executable,'-m','findr','run',name]+a.inputs+['-o',a.output,'--nrow',str(nrow),'--nproc','1','--no-merge',
+			'--nth',str(max(1,(a.nth if a.nth>0 else (os.cpu_count() or 1))//n)),'--loglv',str(a.loglv),'--rs',str(a.rs)]
+		for k in ['ns','na','memlimit','lib','backend']:
+			if getattr(a,k) is not None:
+				args+=['--'+k,str(getattr(a,k))]
+		if a.nodiag:
+			args.append('--nodiag')
+		ps=[subprocess.Popen(args+['--shard','{}/{}'.format(shard[0]*n+i,shard[1]*n)],stdout=subprocess.DEVNULL) for i in range(n)]
+		for p in ps:
+			if p.wait()!=0 and ret==0:
+				ret=p.returncode
+		ans['computed']=len(todo)
+	else:
+		l=_lib(a)
+		nrows=sum(x[1]-x[0] for x in todo)
+		k=0
+		ans['computed']=0
+		for start,stop,v in iterblocks(l,name,*data,nrow=nrow,blocks=todo,**ka):
+			if int(v['ret'])!=0:
+				ret=int(v['ret'])
+				break
+			_save(_blockfile(a.output,start,stop),v)
+			ans['computed']+=1
+			k+=stop-start
+			if a.progress:
+				t=time.time()-t0
+				printprogress({'done':k,'total':nrows,'elapsed':t,'rate':k/t if t>0 else 0.,'eta':(nrows-k)*t/k if k>0 else None})
+	if ret==0 and not a.no_merge and a.shard is None:
+		r,files=assemble(a.output,name,data,ka,nrow,fmt=a.format,out_dtype=a.out_dtype)
+		ans['files']=files
+	ans['ret']=ret
+	ans['elapsed']=time.time()-t0
+	return ans
+
+def cmd_merge(a):
+	import time
+	from .blocks import assemble,_fixka
+	from .io import loadinputs
+	t0=time.time()
+	data=loadinputs(a.inputs,a.method,a.ns)
+	ka=_fixka(a.method,data,_ka(a))
+	ret,files=assemble(a.output,a.method,data,ka,a.nrow,fmt=a.format,out_dtype=a.out_dtype)
+	return {'ret':ret,'files':files,'elapsed':time.time()-t0}
+
+def cmd_netr(a):
+	import time
+	import numpy as np
+	from .io import load,save
+	t0=time.time()
+	d=load(a.input) if a.input.endswith('.npy') or a.nt is None else load(a.input,dtype='f4',shape=(-1,a.nt))
+	l=_lib(a)
+	t1=time.time()
+	v=l.netr_one_greedy(d,namax=a.namax,nimax=a.nimax,nomax=a.nomax)
+	t2=time.time()
+	#netr_one_greedy reports success as ret=True
+	ret=0 if v['ret'] is True else 1
+	if ret==0:
+		save(a.output,np.asarray(v['net']).astype('B'))
+	return {'ret':ret,'nt':int(d.shape[0]),'nedge':int(np.asarray(v['net']).sum()),'files':[a.output],
+		'elapsed':time.time()-t0,'compute':t2-t1}
+
+def cmd_plan(a):
+	from .plan import estimate,maxnrow
+	ans=estimate(a.method,a.nt,a.nt2,a.ns,memlimit=a.memlimit if a.memlimit is not None else -1,nth=a.nth,nrow=a.nrow,backend=a.backend)
+	if a.memory is not None and a.method!='netr_one_greedy':
+		ans['maxnrow']=maxnrow(a.method,a.nt,a.nt2,a.ns,a.memory,memlimit=a.memlimit if a.memlimit is not None else -1,backend=a.backend)
+	return ans
+
+def cmd_publish(a):
+	from .dist import publish
+	return publish(a.output,a.method,a.inputs,nrow=a.nrow,memory=a.memory,ns=a.ns,fmt=a.format,out_dtype=a.out_dtype,backend=a.backend,**_ka(a))
+
+def cmd_work(a):
+	from .dist import work
+	from .blocks import printprogress
+	return work(_lib(a),a.path,worker=a.worker,lease=a.lease,ntile=a.ntile,maxattempt=a.maxattempt,
+		progress=printprogress if a.progress else None)
+
+def cmd_status(a):
+	from .dist import status
+	return status(a.path)
+
+def cmd_collect(a):
+	import time
+	from .dist import collect
+	t0=time.time()
+	ans=collect(a.path,fmt=a.format,out_dtype=a.out_dtype)
+	ans['elapsed']=time.time()-t0
+	return ans
+
+def parser():
+	"""Argument parser of command line interface."""
+	import argparse
+	from .blocks import methods
+	from .plan import methods as pmethods
+	p=argparse.ArgumentParser(prog='python -m findr',description='Findr command line interface.')
+	sp=p.add_subparsers(dest='command')
+	def common(q):
+		q.add_argument('--nth',type=int,default=0,help='Number of threads. Default: 0 for number of cores.')
+		q.add_argument('--loglv',type=int,default=6,help='Log level of library. Default: 6.')
+		q.add_argument('--rs',type=int,default=0,help='Random seed. Default: 0 for current time.')
+		q.add_argument('--lib',default=None,help='Path of library.')
+		q.add_argument('--backend',choices=['c','numpy','auto'],default='c',help='Engine of findr functions. Default: c.')
+	def inputs(q):
+		q.add_argument('method',choices=sorted(methods),help='Name of pij function.')
+		q.add_argument('inputs',nargs='+',help='Input files, in the order of function inputs.')
+		q.add_argument('-o','--output',required=True,help='Output directory.')
+		q.add_argument('--ns',type=int,default=None,help='Number of samples, for raw binary inputs without sidecar metadata.')
+		q.add_argument('--nodiag',action='store_true',help='Set nodiag of the function.')
+		q.add_argument('--na',type=int,default=None,help='Number of alleles. Default: maximum of genotypes.')
+		q.add_argument('--memlimit',type=int,default=None,help='Memory limit of the library in bytes.')
+		q.add_argument('--format',choices=['npy','bin'],default='npy',help='Format of assembled outputs. Default: npy.')
+		q.add_argument('--out-dtype',choices=['f2','u2','u1'],default=None,help='Reduced precision of assembled probabilities. Not supported for P-values. See findr.quant.')
+	q=sp.add_parser('run',help='Run a pij function in row blocks.')
+	inputs(q)
+	common(q)
+	q.add_argument('--nrow',type=int,default=None,help='Rows per block. Default: planned from --memory or automatically.')
+	q.add_argument('--memory',type=int,default=None,help='Memory budget in bytes for planning rows per block.')
+	q.add_argument('--shard',default=None,help='Shard to run as i/n, for 0<=i<n, as contiguous blocks. Outputs are not assembled.')
+	q.add_argument('--nproc',type=int,default=1,help='Number of local processes, each running a share of blocks. Default: 1.')
+	q.add_argument('--no-merge',action='store_true',help='Do not assemble outputs.')
+	q.add_argument('--progress',action='store_true',help='Print progress to stderr.')
+	q=sp.add_parser('merge',help='Assemble outputs of completed blocks.')
+	inputs(q)
+	q.add_argument('--nrow',type=int,required=True,help='Rows per block of the run.')
+	q=sp.add_parser('netr',help='Run netr_one_greedy.')
+	common(q)
+	q.add_argument('input',help='Input file of edge significance.')
+	q.add_argument('-o','--output',required=True,help='Output file of network, as .npy or findr-bin binary.')
+	q.add_argument('--nt',type=int,default=None,help='Number of genes, for raw binary input without sidecar metadata.')
+	q.add_argument('--namax',type=int,default=None)
+	q.add_argument('--nimax',type=int,default=None)
+	q.add_argument('--nomax',type=int,default=None)
+	q=sp.add_parser('plan',help='Predict memory and runtime.')
+	q.add_argument('method',choices=sorted(pmethods),help='Name of function.')
+	q.add_argument('nt',type=int)
+	q.add_argument('nt2',type=int)
+	q.add_argument('ns',type=int)
+	q.add_argument('--nth',type=int,default=0)
+	q.add_argument('--nrow',type=int,default=None)
+	q.add_argument('--memlimit',type=int,default=None)
+	q.add_argument('--memory',type=int,default=None,help='Memory budget in bytes, to report the largest rows per block within it.')
+	q.add_argument('--backend',choices=['c','numpy'],default='c',help='Engine to plan for. Default: c.')
+	q=sp.add_parser('publish',help='Publish a run into a work queue for workers on multiple nodes.')
+	inputs(q)
+	q.add_argument('--nrow',type=int,default=None,help='Rows per tile. Default: planned from --memory or automatically.')
+	q.add_argument('--memory',type=int,default=None,help='Memory budget of each worker in bytes for planning rows per tile.')
+	q.add_argument('--backend',choices=['c','numpy'],default='c',help='Engine of workers, for planning rows per tile. Default: c.')
+	q=sp.add_parser('work',help='Compute tiles of a published run.')
+	common(q)
+	q.add_argument('path',help='Output directory of the published run.')
+	q.add_argument('--worker',default=None,help='Name of worker. Default: hostname:pid.')
+	q.add_argument('--lease',type=float,default=86400,help='Seconds after which unfinished tiles of other workers are claimed again. Default: 86400.')
+	q.add_argument('--ntile',type=int,default=None,help='Maximum number of tiles to compute.')
+	q.add_argument('--maxattempt',type=int,default=3,help='Attempts of each tile before it is marked as failed. Default: 3.')
+	q.add_argument('--progress',action='store_true',help='Print progress to stderr.')
+	q=sp.add_parser('status',help='Report progress of a published run.')
+	q.add_argument('path',help='Output directory of the published run.')
+	q=sp.add_parser('collect',help='Verify and assemble outputs of a published run.')
+	q.add_argument('path',help='Output directory of the published run.')
+	q.add_argument('--format',choices=['npy','bin'],default=None,help='Format of assembled outputs. Default: as published.')
+	q.add_argument('--out-dtype',choices=['f2','u2','u1'],default=None,help='Reduced precision of assembled probabilities. Not supported for P-values. Default: as published.')
+	return p
+
+def main(argv=None):
+	"""Runs command line interface.
+	argv:	List of arguments. Default (None) indicates sys.argv[1:].
+	Return:	Exit code."""
+	import sys
+	import json
+	p=parser()
+	a=p.parse_args(argv)
+	if a.command is None:
+		p.print_help()
+		return 2
+	try:
+		ans=globals()['cmd_'+a.command](a)
+	except (ValueError,OSError) as e:
+		sys.stderr.write('findr: '+str(e)+'\n')
+		return 1
+	sys.stdout.write(json.dumps(ans,sort_keys=True,default=str)+'\n')
+	return 1 if ans.get('ret',0)!=0 else 0
+
+if __name__=='__main__':
+	import sys
+	sys.exit(main())
@@ -0,0 +1,174 @@
+# Copyright 2016-2018, 2020 Lingfei Wang
+# 
+# This file is part of Findr.
+# 
+# Findr is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# Findr is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+# 
+# You should have received a copy of the GNU Affero General Public License
+# along with Findr.  If not, see <http://www.gnu.org/licenses/>.
+# 
+"""Selection of causal anchors from cis-eQTLs.
+The genotype assisted pij functions require genotype i to be the best (and significant) eQTL of gene i.
+findr.anchors.best scans cis-windows and produces dg and dt aligned for these functions.
+Example: a=findr.anchors.best(findr.plink.bed('chr1'),dt,None,(tchr,tpos)); l.pij_gassist(a['dg'],a['dt'],dt2)"""
+
+try: from exceptions import ValueError
+except ImportError: pass
+
+def _tile(g,zt,vpos,tpos,window,model,ns):
+	"""Computes the best anchor among a tile of variants for a tile of genes.
+	g:	numpy.ndarray(nv,ns,dtype=gtype) genotypes.
+	zt:	numpy.ndarray(ng,ns,dtype=ftype) standardized expression levels.
+	vpos,tpos:	Positions of variants and genes.
+	Return:	(p,r2,i) as numpy.ndarrays(ng) of P-value, variance explained, and index of best variant in the tile.
+		Genes without any variant in window have p=2."""
+	import numpy as np
+	from .stats import pv_r2
+	if model=='additive':
+		x=g.astype(zt.dtype)
+		x-=x.mean(axis=1,keepdims=True)
+		sd=np.sqrt((x**2).mean(axis=1))
+		valid=sd>0
+		x[valid]/=sd[valid,None]
+		r2=np.dot(x,zt.T)/ns
+		r2**=2
+		k=np.full(g.shape[0],2)
+	elif model=='categorical':
+		r2=np.zeros((g.shape[0],zt.shape[0]),dtype=zt.dtype)
+		k=np.zeros(g.shape[0],dtype=int)
+		for v in range(int(g.max())+1):
+			x=(g==v).astype(zt.dtype)
+			n=x.sum(axis=1)
+			t=n>0
+			if not t.any():
+				continue
+			s=np.dot(x[t],zt.T)
+			r2[t]+=s**2/n[t,None]
+			k+=t
+		r2/=ns
+		valid=k>=2
+	else:
+		raise ValueError('Unknown model: '+str(model))
+	mask=(np.abs(vpos[:,None]-tpos[None,:])<=window)&valid[:,None]
+	p=np.full(r2.shape,2.)
+	p[mask]=pv_r2(r2[mask],ns,np.broadcast_to(k[:,None],mask.shape)[mask])
+	pmin=p.min(axis=0)
+	i=np.argmax(np.where(p==pmin,r2,-1),axis=0)
+	t=np.arange(len(i))
+	return (p[i,t],r2[i,t],i)
+
+def best(dg,dt,gpos,tpos,window=1000000,pv=1E-5,adjust=True,model='additive',samples=None,memlimit=2**30,nth=0):
+	"""Finds the best cis-eQTL of each gene as its causal anchor, and keeps genes with significant anchors.
+	Association statistics are computed for tiles of variants and genes with matrix multiplications,
+	in parallel threads and within memory limit.
+	dg:	Genotype data of all variants, as one of
+		numpy.ndarray(nv,ns,dtype=gtype(='u1' by default)):	Entry dg[i,j] is variant i's genotype for sample j.
+		findr.plink.packedg:	Packed genotypes, unpacked per tile.
+		findr.plink.bed:	PLINK files. Positions are read from .bim and gpos should be None.
+	dt:	numpy.ndarray(ng,ns,dtype=ftype(='=f4' by default)) Gene expression data.
+		Entry dt[i,j] is gene i's expression level for sample j.
+	gpos:	(chromosome,position) of variants, as two sequences of length nv.
+	tpos:	(chromosome,position) of genes, e.g. of transcription start sites, as two sequences of length ng.
+	window:	Maximum distance in base pairs between a gene and its cis-variants.
+	pv:	P-value threshold for an anchor to be significant.
+	adjust:	Whether to apply Bonferroni correction on P-values by the number of variants in each gene's cis-window.
+	model:	Association model. 'additive' for linear regression on genotype values, or 'categorical' for
+		one-way ANOVA on genotype categories, as used in findr's tests.
+	samples:	Sample IDs or indices to use and in which order when dg is findr.plink.bed.
+	memlimit:	The approximate memory usage limit in bytes for all threads.
+	nth:	Number of parallel threads. Default (0) indicates to use the number of cores.
+	Return:	dictionary with following keys:
+	ret:0 iff execution succeeded.
+	gene:	numpy.ndarray(nt,dtype=int). Indices of genes with significant anchors, in increasing order.
+	snp:	numpy.ndarray(nt,dtype=int). Index of the best anchor of each gene in gene.
+	p:	numpy.ndarray(nt,dtype=float). P-value of each anchor.
+	padj:	numpy.ndarray(nt,dtype=float). Adjusted P-value of each anchor, or identical to p if adjust is False.
+	r2:	numpy.ndarray(nt,dtype=float). Fraction of expression variance explained by each anchor.
+	dg:	numpy.ndarray(nt,ns,dtype=gtype(='u1' by default)). Genotype data of anchors, as dg for pij_gassist.
+	dt:	numpy.ndarray(nt,ns,dtype=ftype(='=f4' by default)). Expression data of genes with anchors, as dt for pij_gassist.
+	ftype and gtype can be found in auto.py.
+	"""
+	import numpy as np
+	from concurrent.futures import ThreadPoolExecutor
+	from .auto import ftype_np,gtype_np
+	from .plink import bed
+	from .util import nthread
+	if isinstance(dg,bed):
+		if gpos is not None:
+			raise ValueError('gpos must be None when dg is findr.plink.bed.')
+		gpos=(dg.chrom,dg.pos)
+		dg=dg.select(samples=samples)
+	dt=np.asarray(dt).astype(ftype_np,copy=False)
+	if len(dg.shape)!=2 or len(dt.shape)!=2 or dg.shape[1]!=dt.shape[1]:
+		raise ValueError('Wrong input shape')
+	nv,ns=dg.shape
+	ng=dt.shape[0]
+	if len(gpos)!=2 or len(gpos[0])!=nv or len(gpos[1])!=nv:
+		raise ValueError('Wrong gpos shape')
+	if len(tpos)!=2 or len(tpos[0])!=ng or len(tpos[1])!=ng:
+		raise ValueError('Wrong tpos shape')
+	if window<0 or pv<=0 or memlimit<=0 or nth<0 or ns<3:
+		raise ValueError('Wrong input parameter')
+	if np.isnan(dt).sum()>0:
+		raise ValueError('NaN found.')
+	nth=nthread(nth)
+	gchr=np.array([str(x) for x in gpos[0]])
+	gp=np.asarray(gpos[1],dtype=int)
+	tchr=np.array([str(x) for x in tpos[0]])
+	tp=np.asarray(tpos[1],dtype=int)
+
+	zt=dt-dt.mean(axis=1,keepdims=True)
+	sd=np.sqrt((zt**2).mean(axis=1))
+	t=sd>0
+	zt[t]/=sd[t,None]
+	zt[~t]=0
+
+	tg=256
+	tv=max(16,int(memlimit//nth)//(ns*(1+2*zt.itemsize)+tg*zt.itemsize*8))
+	ncis=np.zeros(ng,dtype=int)
+	tasks=[]
+	for c in np.unique(tchr):
+		vi=np.nonzero(gchr==c)[0]
+		vi=vi[np.argsort(gp[vi],kind='stable')]
+		vp=gp[vi]
+		ti=np.nonzero(tchr==c)[0]
+		ti=ti[np.argsort(tp[ti],kind='stable')]
+		ncis[ti]=np.searchsorted(vp,tp[ti]+window,side='right')-np.searchsorted(vp,tp[ti]-window,side='left')
+		for x in range(0,len(ti),tg):
+			tis=ti[x:x+tg]
+			lo=np.searchsorted(vp,tp[tis].min()-window,side='left')
+			hi=np.searchsorted(vp,tp[tis].max()+window,side='right')
+			for y in range(lo,hi,tv):
+				tasks.append((tis,vi[y:min(y+tv,hi)]))
+
+	def run(task):
+		tis,vis=task
+		g=np.asarray(dg[vis]).astype(gtype_np,copy=False)
+		p,r2,i=_tile(g,zt[tis],gp[vis],tp[tis],window,model,ns)
+		return (tis,p,r2,vis[i])
+
+	bp=np.full(ng,2.)
+	br2=np.zeros(ng)
+	bv=np.full(ng,-1,dtype=int)
+	with ThreadPoolExecutor(max_workers=nth) as e:
+		for tis,p,r2,vis in e.map(run,tasks):
+			t=(p<bp[tis])|((p==bp[tis])&(r2>br2[tis]))
+			t&=p<=1
+			bp[tis[t]]=p[t]
+			br2[tis[t]]=r2[t]
+			bv[tis[t]]=vis[t]
+	padj=np.minimum(bp*np.maximum(ncis,1),1) if adjust else bp
+	gene=np.nonzero((bv>=0)&(padj<=pv))[0]
+	snp=bv[gene]
+	dgs=np.ascontiguousarray(np.asarray(dg[snp]).astype(gtype_np,copy=False)) if len(gene)>0 else np.zeros((0,ns),dtype=gtype_np)
+	ans={'ret':0,'gene':gene,'snp':snp,'p':bp[gene],'padj':padj[gene],'r2':br2[gene],
+		'dg':dgs,'dt':np.ascontiguousarray(dt[gene])}
+	return ans
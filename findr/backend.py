@@ -0,0 +1,224 @@
+# Copyright 2016-2018, 2020 Lingfei Wang
+# 
+# This file is part of Findr.
+# 
+# Findr is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# Findr is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+# 
+# You should have received a copy of the GNU Affero General Public License
+# along with Findr.  If not, see <http://www.gnu.org/licenses/>.
+# 
+"""NumPy reference engine of findr functions, as a backend of findr.lib that does not need the library.
+Use findr.lib(backend='numpy'), or backend='auto' to fall back to it when the library is not found.
+Pij functions compute LLRs with findr.llr.compute, whose correlations are blocked matrix products (BLAS),
+and convert them with findr.llr.convert. netr_one_greedy adds edges greedily while tracking reachability.
+Outputs follow the same format as the library. P-values agree with the library up to numerical precision,
+while probabilities may differ slightly due to details of histogram construction.
+Threads are those of the BLAS library, so nth of findr.lib is not used. memlimit is accepted and ignored.
+For comparing backends, see findr.backend.conformance."""
+
+try: from exceptions import ValueError
+except ImportError: pass
+
+def _pij(self,name,data,na=None,nodiag=False,memlimit=-1,autotype=True,return_llr=False,nsample=None,symmetric=False,packed=False):
+	import numpy as np
+	from .auto import ftype_np,gtype_np
+	from .panel import unwrap
+	from .llr import methods,compute,convert
+	family,kind=methods[name]
+	data=list(data)
+	dt2,pnl=unwrap(data[-1])
+	data[-1]=dt2
+	if autotype:
+		data=[x.astype(gtype_np if family=='gassist' and i==0 else ftype_np,copy=False) for i,x in enumerate(data)]
+		nodiag=bool(nodiag)
+		if na is not None:
+			na=int(na)
+	if any(len(x.shape)!=2 for x in data):
+		raise ValueError('Wrong input shape')
+	if family=='gassist' and data[0].dtype.char!=gtype_np:
+		raise ValueError('Wrong input dtype for genotype data: dg.dtype.char is '+data[0].dtype.char+'!='+gtype_np)
+	if any(x.dtype.char!=ftype_np for x in data[1 if family=='gassist' else 0:]):
+		raise ValueError('Wrong input dtype for gene expression data')
+	if type(nodiag) is not bool:
+		raise ValueError('Wrong nodiag type')
+	if na is not None and na<=0:
+		raise ValueError('Input requires na>0.')
+	dt=data[-2]
+	nt,ns=dt.shape
+	if dt2.shape[1]!=ns or any(x.shape!=dt.shape for x in data[:-2]):
+		raise ValueError('Wrong input shape')
+	if family=='gassist' and (na if na else data[0].max())<1:
+		raise ValueError('Invalid genotype values')
+	if sum(np.isnan(x).sum() for x in data[1 if family=='gassist' else 0:(-1 if pnl is not None else None)])>0:
+		raise ValueError('NaN found.')
+	if nodiag and kind!='pv':
+		if dt2.shape[0]<nt:
+			raise ValueError('Input requires nt2>=nt for nodiag.')
+	#Symmetric mode of rank functions as the library
+	if family!='rank' and (symmetric or packed):
+		raise ValueError('Symmetric mode is only supported for pij_rank and pij_rank_pv.')
+	if family=='rank':
+		symmetric=bool(symmetric)
+		if symmetric and data[-1].shape!=dt.shape:
+			raise ValueError('Input requires identical shapes of dt and dt2 for symmetric.')
+		if packed and not (symmetric and kind=='pv'):
+			raise ValueError('Input requires symmetric for packed.')
+		if symmetric:
+			from . import sym
+			if kind=='pv':
+				return sym.rank_pv(self,dt,return_llr=return_llr,packed=packed)
+			return sym.rank(self,dt,nodiag=nodiag,return_llr=return_llr,nsample=nsample)
+	if pnl is not None:
+		data[-1]=pnl
+	d=compute(name,*data,**({'na':na} if family=='gassist' else {}))
+	rs=getattr(self,'rs',0)
+	ans=convert(name,d,ns,nodiag=nodiag and kind!='pv',nsample=nsample,seed=rs if rs else None)
+	if return_llr:
+		ans.update(d)
+	return ans
+
+def _bind(name):
+	"""Creates numpy engine of a pij function with the same parameters."""
+	def f(self,*data,**ka):
+		return _pij(self,name,data,**ka)
+	f.__name__=name
+	f.__doc__='NumPy engine of findr.lib.'+name+'. Parameters and outputs are the same. See findr.backend.'
+	return f
+
+def one_greedy(self,dp,namax=None,nimax=None,nomax=None,autotype=True):
+	"""NumPy engine of findr.lib.netr_one_greedy. Parameters and outputs are the same.
+	Edges are introduced in decreasing order of significance, with ties in row-major order.
+	An edge i->j is skipped if j already reaches i, and reachability is updated for all ancestors of i after each edge.
+	Reduced precision priors of findr.quant are used as they are, without conversion."""
+	import numpy as np
+	from .auto import ftype_np
+	from .types import isint
+	from .quant import formats
+	if autotype:
+		if dp.dtype.str[1:] not in formats:
+			dp=dp.astype(ftype_np,copy=False)
+		namax=None if namax is None else int(namax)
+		nimax=None if nimax is None else int(nimax)
+		nomax=None if nomax is None else int(nomax)
+	if len(dp.shape)!=2:
+		raise ValueError('Wrong input shape')
+	for v,k in [(namax,'namax'),(nimax,'nimax'),(nomax,'nomax')]:
+		if not (v is None or isint(v)):
+			raise ValueError('Wrong '+k+' type')
+		if v is not None and v<=0:
+			raise ValueError('Input requires '+k+'>0.')
+	nt=dp.shape[0]
+	if nt==0:
+		raise ValueError('Invalid prior dimension')
+	if dp.shape[1]!=nt:
+		raise ValueError('Wrong input shape')
+	if np.isnan(dp).sum()>0:
+		raise ValueError('NaN found.')
+	namax=nt*(nt-1) if namax is None else namax
+	nimax=nt if nimax is None else nimax
+	nomax=nt if nomax is None else nomax
+	v=np.ascontiguousarray(dp).ravel()
+	#Descending order in the same data type: bitwise negation for unsigned integers
+	order=np.argsort(~v if v.dtype.kind=='u' else -v,kind='stable')
+	order=order[order%(nt+1)!=0]
+	net=np.zeros((nt,nt),dtype=bool)
+	#reach[i,j]: j is reachable from i, including i itself
+	reach=np.eye(nt,dtype=bool)
+	nin=np.zeros(nt,dtype=int)
+	nout=np.zeros(nt,dtype=int)
+	n=0
+	for x in order:
+		i,j=divmod(int(x),nt)
+		if reach[j,i] or nin[j]>=nimax or nout[i]>=nomax:
+			continue
+		net[i,j]=True
+		nin[j]+=1
+		nout[i]+=1
+		n+=1
+		if n>=namax:
+			break
+		if not reach[i,j]:
+			t=reach[:,i]
+			reach[t]|=reach[j]
+	#The library reports success as True for netr_one_greedy
+	return {'ret':True,'net':net}
+
+def methods():
+	"""Functions of findr.lib implemented by the numpy engine.
+	Return:	dictionary from name to function taking findr.lib instance as first parameter."""
+	from .llr import methods as m
+	ans=dict((k,_bind(k)) for k in m)
+	ans['netr_one_greedy']=one_greedy
+	return ans
+
+def conformance(a,b,names=None,nt=20,nt2=200,ns=100,na=2,nodiag=True,seed=0,atol=None,mtol=None):
+	"""Compares outputs of two findr.lib instances, e.g. of different backends, on random data.
+	a,b:	findr.lib instances.
+	names:	List of function names to compare. Default (None) indicates all functions of the numpy engine.
+	nt,nt2,ns:	Dimensions of random data. dt is the first nt rows of dt2.
+	na:	Number of alleles of random genotypes.
+	nodiag:	Whether to set nodiag for functions accepting it.
+	seed:	Random seed of data.
+	atol:	dictionary from function name to tolerated maximum absolute difference of outputs.
+		Default (None) tolerates 1E-4 for P-values and networks, and 0.02 for probabilities.
+	mtol:	dictionary from function name to tolerated mean absolute difference of outputs.
+		Default (None) tolerates 1E-5 for P-values and networks, and 1E-3 for probabilities.
+	Return:	dictionary with following keys:
+	ret:	0 iff all compared functions return the same ret, succeed, and agree within tolerance.
+	diff:	dictionary from function name to dictionary from output key to maximum absolute difference.
+	mean:	dictionary from function name to dictionary from output key to mean absolute difference.
+	passed:	dictionary from function name to whether it agrees within tolerance.
+	"""
+	import numpy as np
+	from .llr import methods as m
+	rs=np.random.RandomState(seed)
+	#Data with causal structure so that probabilities are not all near 0
+	dg=rs.randint(0,na+1,size=(nt2,ns)).astype('u1')
+	dt2=(dg*rs.rand(nt2,1)+rs.randn(nt2,ns)).astype('f4')
+	dt2[1:]+=0.5*dt2[:-1]
+	dt=dt2[:nt]
+	dc=(dg[:nt]+0.5*rs.randn(nt,ns)).astype('f4')
+	dp=rs.rand(nt,nt).astype('f4')
+	names=list(m)+['netr_one_greedy'] if names is None else names
+	atol={} if atol is None else atol
+	mtol={} if mtol is None else mtol
+	ans={'ret':0,'diff':{},'mean':{},'passed':{}}
+	for name in names:
+		if name=='netr_one_greedy':
+			data=[dp]
+			ka={'namax':nt*2}
+		else:
+			family,kind=m[name]
+			data=[dt,dt2] if family=='rank' else ([dg[:nt],dt,dt2] if family=='gassist' else [dc,dt,dt2])
+			ka={} if kind=='pv' or not nodiag else {'nodiag':True}
+			if family=='gassist':
+				ka['na']=na
+		va=getattr(a,name)(*data,**ka)
+		vb=getattr(b,name)(*data,**ka)
+		d={}
+		dm={}
+		for k in va:
+			if k=='ret':
+				continue
+			v=np.abs(np.asarray(va[k],dtype=float)-np.asarray(vb[k],dtype=float))
+			d[k]=float(v.max()) if v.size>0 else 0.
+			dm[k]=float(v.mean()) if v.size>0 else 0.
+		exact=name=='netr_one_greedy' or name.endswith('_pv')
+		tol=atol.get(name,1E-4 if exact else 0.02)
+		tolm=mtol.get(name,1E-5 if exact else 1E-3)
+		ans['diff'][name]=d
+		ans['mean'][name]=dm
+		#Success is ret=True for netr_one_greedy and ret=0 for pij functions
+		ok=va['ret'] is True if name=='netr_one_greedy' else va['ret']==0
+		ans['passed'][name]=bool(ok and va['ret']==vb['ret'] and all(x<=tol for x in d.values()) and all(x<=tolm for x in dm.values()))
+		if not ans['passed'][name]:
+			ans['ret']=1
+	return ans
@@ -0,0 +1,181 @@
+# Copyright 2016-2018, 2020 Lingfei Wang
+# 
+# This file is part of Findr.
+# 
+# Findr is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# Findr is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+# 
+# You should have received a copy of the GNU Affero General Public License
+# along with Findr.  If not, see <http://www.gnu.org/licenses/>.
+# 
+"""Batched execution of many small problems, e.g. separate runs for each tissue, cell type or time point.
+Problems are given as a list of inputs, or as one set of inputs with a group label for each sample.
+They are run concurrently in worker processes, with the largest problems started first (longest processing time scheduling)
+according to predicted runtimes from findr.plan. Each process initializes its own library with a share of the threads,
+since the library's number of threads is set per process, so concurrent problems do not oversubscribe cores
+and the library of the calling process is left unchanged.
+For usage, see findr.batch.run or lib.batch."""
+
+try: from exceptions import ValueError
+except ImportError: pass
+
+#findr.lib instance and shared state of a worker process, set by findr.batch._init
+_worker={}
+
+def _init(config,state=None):
+	"""Initializes a worker process with its own findr.lib instance. BLAS threads of the NumPy engine are also limited
+	to nth when threadpoolctl is installed.
+	config:	Keyword arguments of findr.lib.
+	state:	Data shared by all jobs of the process, e.g. inputs of findr.stability."""
+	from . import lib
+	try:
+		from threadpoolctl import threadpool_limits
+		_worker['limits']=threadpool_limits(limits=max(1,config['nth']))
+	except ImportError:
+		pass
+	_worker['lib']=lib(**config)
+	_worker['state']=state
+
+def _job(name,data,ka):
+	return getattr(_worker['lib'],name)(*data,**ka)
+
+def pool(self,njob,nth,state=None):
+	"""Process pool to run jobs concurrently, each process with its own findr.lib instance like self but with nth threads.
+	The library is initialized once per process, so the threads of self and of other concurrent calls are not affected.
+	self:	findr.lib instance.
+	njob:	Number of processes.
+	nth:	Number of threads of the library in each process.
+	state:	Data shared by all jobs of each process, passed once to each process. See findr.batch._init.
+	Return:	concurrent.futures.ProcessPoolExecutor."""
+	from concurrent.futures import ProcessPoolExecutor
+	config={'path':getattr(self,'path',None),'loglv':getattr(self,'loglv',6),'rs':getattr(self,'rs',0),'nth':int(nth),
+		'backend':getattr(self,'backend','c')}
+	return ProcessPoolExecutor(max_workers=njob,initializer=_init,initargs=(config,state))
+
+def jobnth(self,njob,nth=None):
+	"""Number of threads of the library for each of njob concurrent jobs.
+	nth:	Requested number, or None to split the threads of self (nth of findr.lib) between jobs.
+	Return:	Number of threads, at least 1."""
+	from .util import nthread
+	if nth is not None:
+		if int(nth)<0:
+			raise ValueError('Wrong number of threads')
+		return int(nth)
+	n=getattr(self,'nth',0)
+	return n if njob<=1 else max(1,nthread(n)//njob)
+
+def cost(name,data,nth=0,backend='c',version=None):
+	"""Predicted runtime of a problem for scheduling, from findr.plan.runtime.
+	name:	Name of pij function in findr.lib.
+	data:	Input data of the function.
+	nth:	Number of threads of the library.
+	backend,version:	Engine and library version, as in findr.plan.estimate.
+	Return:	Predicted runtime in seconds."""
+	from .plan import methods,runtime
+	nt=data[0].shape[0]
+	nt2,ns=data[-1].shape
+	if name not in methods:
+		return float(nt)*nt2*ns
+	return runtime(name,nt,nt2,ns,nth=nth,backend=backend,version=version)[0]
+
+def order(costs):
+	"""Order of problems to start, by decreasing cost.
+	costs:	Sequence of costs of problems.
+	Return:	List of problem indices."""
+	return sorted(range(len(costs)),key=lambda x:-costs[x])
+
+def split(data,groups,name=None):
+	"""Splits inputs into problems by sample group labels.
+	data:	Input data of the function, with samples as columns.
+	groups:	Sequence of group label of each sample.
+	name:	Name of pij function. If set, inputs are converted to the required data types once before splitting.
+	Return:	(labels,problems) where labels is the list of unique labels in order of first appearance, and problems is the list
+		of inputs of each label in the same order."""
+	import numpy as np
+	from .auto import ftype_np,gtype_np
+	groups=np.asarray(groups)
+	if len(data)==0 or any(len(x.shape)!=2 for x in data):
+		raise ValueError('Wrong input shape')
+	if groups.ndim!=1 or any(x.shape[1]!=len(groups) for x in data):
+		raise ValueError('Wrong groups shape')
+	if name is not None:
+		data=[np.asarray(x).astype(gtype_np if 'gassist' in name and i==0 else ftype_np,copy=False) for i,x in enumerate(data)]
+	u,first,inv=np.unique(groups,return_index=True,return_inverse=True)
+	labels=[]
+	problems=[]
+	for x in np.argsort(first):
+		t=np.nonzero(inv==x)[0]
+		labels.append(u[x].item() if hasattr(u[x],'item') else u[x])
+		problems.append(tuple(np.take(y,t,axis=1) for y in data))
+	return (labels,problems)
+
+def run(self,name,*data,**ka):
+	"""Runs a pij function on many problems concurrently.
+	self:	findr.lib instance.
+	name:	Name of pij function in findr.lib.
+	data:	Either a single list of problems, each as a tuple of input data of the function,
+		or input data of the function with samples as columns, split into problems by groups.
+	groups:	Sequence of group label of each sample. Required when and only when data are input data of the function.
+	njob:	Number of problems running concurrently, each in a worker process (findr.batch.pool). Default (0) indicates
+		the number of cores. With 1, problems run in this process with self, unless nth differs from that of self.
+	nth:	Number of threads of the library for each problem. Default (None) splits nth of self between njob problems.
+	progress:	Function called with the number of completed problems after each problem. Default (None) disables it.
+	ka:	Other keyword arguments passed to the function for all problems.
+		With groups, na is set from all genotypes unless specified, so all problems share the same number of alleles.
+	Return:	dictionary with following keys:
+	ret:	0 iff all problems succeeded, or the first nonzero return value otherwise.
+	results:	List of outputs of each problem, in the order of problems. With groups, dictionary from group label to output.
+	labels:	List of group labels in order of first appearance. Only with groups.
+
+	Example: a=l.batch('pij_gassist',dg,dt,dt2,groups=tissue,nodiag=True,njob=16); a['results']['liver']['p']
+	"""
+	from concurrent.futures import as_completed
+	from .util import nthread
+	groups=ka.pop('groups',None)
+	njob=nthread(int(ka.pop('njob',0)))
+	nth=jobnth(self,njob,ka.pop('nth',None))
+	progress=ka.pop('progress',None)
+	if groups is None:
+		if len(data)!=1:
+			raise ValueError('Input requires a list of problems, or groups.')
+		problems=[tuple(x) for x in data[0]]
+		labels=None
+	else:
+		labels,problems=split(data,groups,name=name)
+		if 'gassist' in name and ka.get('na') is None:
+			ka['na']=int(max(x[0].max() for x in problems if x[0].size>0))
+	costs=[cost(name,x,nth=nth,backend=getattr(self,'backend','c'),version=getattr(self,'version',None)) for x in problems]
+	results=[None]*len(problems)
+	state={'ret':0,'done':0}
+
+	def done(i,ans):
+		results[i]=ans
+		if state['ret']==0 and ans['ret']!=0:
+			state['ret']=int(ans['ret'])
+		state['done']+=1
+		if progress is not None:
+			progress(state['done'])
+
+	if njob==1 and nth==getattr(self,'nth',0):
+		f=getattr(self,name)
+		for i in order(costs):
+			done(i,f(*problems[i],**ka))
+	else:
+		with pool(self,min(njob,max(1,len(problems))),nth) as e:
+			fs=dict((e.submit(_job,name,problems[i],ka),i) for i in order(costs))
+			for x in as_completed(fs):
+				done(fs[x],x.result())
+	ans={'ret':state['ret']}
+	if labels is None:
+		ans['results']=results
+	else:
+		ans['results']=dict(zip(labels,results))
+		ans['labels']=labels
+	return ans
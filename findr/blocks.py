@@ -0,0 +1,399 @@
+# Copyright 2016-2018, 2020 Lingfei Wang
+# 
+# This file is part of Findr.
+# 
+# Findr is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# Findr is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+# 
+# You should have received a copy of the GNU Affero General Public License
+# along with Findr.  If not, see <http://www.gnu.org/licenses/>.
+# 
+"""Row block execution of pij functions.
+Regulators (A, rows of outputs) are split into blocks, each computed against all targets (B) with the engine of findr.lib:
+the function of the library on backend 'c', and findr.llr (as findr.backend) on backend 'numpy'.
+Outputs of each block are those of the function called with the block's rows. P-values of each A are independent of other A,
+so they do not depend on how rows are split. Probability conversion uses histograms whose upper bound is the maximum LLR
+of the rows in the call, so probabilities depend slightly on the block size (nrow), as they would for any call on a subset of rows.
+Completed blocks can be checkpointed to disk so interrupted runs resume from where they stopped.
+For usage, see findr.blocks.run and findr.blocks.iterblocks."""
+
+try: from exceptions import ValueError
+except ImportError: pass
+
+#Specification of each pij function as (number of inputs split by row, whether nodiag is accepted, vector outputs, matrix outputs)
+methods={
+	'pij_rank':(1,True,[],['p']),
+	'pij_rank_pv':(1,False,[],['p']),
+	'pij_gassist':(2,True,[],['p']),
+	'pij_gassist_trad':(2,True,[],['p']),
+	'pijs_gassist':(2,True,['p1'],['p2','p3','p4','p5']),
+	'pijs_gassist_pv':(2,False,['p1'],['p2','p3','p4','p5']),
+	'pij_cassist':(2,True,[],['p']),
+	'pij_cassist_trad':(2,True,[],['p']),
+	'pijs_cassist':(2,True,['p1'],['p2','p3','p4','p5']),
+	'pijs_cassist_pv':(2,False,['p1'],['p2','p3','p4','p5']),
+	}
+
+def spec(name,data):
+	"""Validates a pij function name and its inputs for row block execution.
+	name:	Name of pij function in findr.lib.
+	data:	Input data of the function.
+	Return:	(nt,nt2,specification) where specification is the entry of findr.blocks.methods."""
+	if name not in methods:
+		raise ValueError('Unsupported function for row blocks: '+str(name))
+	s=methods[name]
+	if len(data)!=s[0]+1:
+		raise ValueError('Wrong number of inputs')
+	if any(len(x.shape)!=2 for x in data):
+		raise ValueError('Wrong input shape')
+	nt=data[0].shape[0]
+	if any(x.shape[0]!=nt for x in data[:-1]):
+		raise ValueError('Wrong input shape')
+	return (nt,data[-1].shape[0],s)
+
+def bounds(nt,nrow):
+	"""Boundaries of row blocks as list of (start,stop)."""
+	return [(x,min(x+nrow,nt)) for x in range(0,nt,nrow)]
+
+def defaultnrow(name,nt,nt2,nbyte=2**26):
+	"""Default number of rows per block, for about nbyte bytes of outputs per block."""
+	return max(1,min(nt,nbyte//(4*max(nt2,1)*max(1,len(methods[name][3])))))
+
+def outkeys(name,ka):
+	"""Vector and matrix output keys of a pij function, including log likelihood ratios for return_llr=True.
+	Return:	(vector keys,matrix keys)"""
+	s=methods[name]
+	if not ka.get('return_llr',False):
+		return (s[2],s[3])
+	from .llr import keys
+	k=keys(name)
+	return (s[2]+k[0],s[3]+k[1])
+
+def _fixka(name,data,ka):
+	"""Fixes parameters that would otherwise be determined separately for each block."""
+	if 'gassist' in name and ka.get('na') is None:
+		na=int(data[0].max())
+		if na<=0:
+			raise ValueError('Invalid genotype values')
+		ka['na']=na
+	return ka
+
+def _seed(ka,path=None,rs=0):
+	"""Fixes the random seed of target sampling (nsample) for a whole run as ka['seed'], so all blocks, resumed runs
+	and workers sample the same targets. It is rs of findr.lib if nonzero, that of an existing checkpoint in path,
+	or a new random seed otherwise. It is then stored with the other parameters in the checkpoint manifest."""
+	import os
+	import json
+	import numpy as np
+	if ka.get('nsample') is None or ka.get('seed') is not None:
+		return ka
+	fm=None if path is None else os.path.join(path,'manifest.json')
+	if rs:
+		ka['seed']=int(rs)
+	elif fm is not None and os.path.isfile(fm):
+		with open(fm,'r') as f:
+			ka['seed']=json.load(f)['parameters'].get('seed')
+	if ka.get('seed') is None:
+		ka['seed']=int(np.random.randint(1,2**31))
+	return ka
+
+def _convert(name,d,pnl,rows,lmax,seed,nodiag=False,na=None,memlimit=-1,autotype=True,return_llr=False,nsample=None):
+	"""Computes rows of a probability function with findr.llr, as the NumPy engine does.
+	d:	Inputs of A for the rows.
+	pnl:	Targets as findr.panel.panel, or numpy.ndarray including memory maps, which are standardized in each call.
+	rows:	Indices of the rows among all A, to locate diagonal entries for nodiag without reordering targets.
+	lmax:	Histogram bounds as in findr.llr.convert. None takes them from the rows computed."""
+	import numpy as np
+	from .auto import ftype_np,gtype_np
+	from .llr import methods as lmethods,compute,convert
+	from .panel import panel
+	family=lmethods[name][0]
+	ge=family=='gassist'
+	if autotype:
+		d=[np.asarray(x).astype(gtype_np if ge and i==0 else ftype_np,copy=False) for i,x in enumerate(d)]
+	if ge and d[0].dtype.char!=gtype_np:
+		raise ValueError('Wrong input dtype for genotype data: dg.dtype.char is '+d[0].dtype.char+'!='+gtype_np)
+	if any(x.dtype.char!=ftype_np for x in d[1 if ge else 0:]):
+		raise ValueError('Wrong input dtype for gene expression data')
+	if sum(np.isnan(x).sum() for x in d[1 if ge else 0:])>0 or (not isinstance(pnl,panel) and np.isnan(pnl).any()):
+		raise ValueError('NaN found.')
+	v=compute(name,*(d+[pnl]),**({'na':na} if ge else {}))
+	ans=convert(name,v,pnl.shape[1],nodiag=bool(nodiag),lmax=lmax,nsample=nsample,seed=seed,rows=rows)
+	if return_llr:
+		ans.update(v)
+	return ans
+
+def _call(self,name,d,dt2,rows,ka,buf=None):
+	"""Runs a pij function for a subset of rows of A with the engine of findr.lib.
+	d:	Inputs of A for the rows.
+	dt2:	Targets, as numpy.ndarray, memory map or findr.panel.panel.
+	rows:	numpy.ndarray of indices of the rows among all A, distinct for nodiag.
+	ka:	Keyword arguments of the function.
+	buf:	numpy.ndarray of the shape and dtype of dt2, reused across calls for targets reordered for nodiag on backend 'c'.
+		Default (None) allocates one.
+	Return:	Output of the function for the rows."""
+	import numpy as np
+	from .panel import unwrap
+	from .llr import methods as lmethods
+	ka=dict(ka)
+	seed=ka.pop('seed',None)
+	if getattr(self,'backend','c')=='numpy' and lmethods[name][1]!='pv':
+		rs=getattr(self,'rs',0)
+		return _convert(name,d,dt2,rows,None,seed if seed is not None else (rs if rs else None),**ka)
+	f=getattr(self,name)
+	if not (methods[name][1] and bool(ka.get('nodiag',False))):
+		return f(*(d+[dt2]),**ka)
+	#The engine excludes target i for row i, so targets of the rows are moved to the front and outputs moved back
+	dt2=unwrap(dt2)[0]
+	nt2=dt2.shape[0]
+	order=np.r_[rows,np.setdiff1d(np.arange(nt2),rows)]
+	if len(order)!=nt2:
+		raise ValueError('Rows must be distinct and below nt2 for nodiag.')
+	if buf is None:
+		buf=np.empty(dt2.shape,dtype=dt2.dtype)
+	np.take(dt2,order,axis=0,out=buf)
+	ans=f(*(d+[buf]),**ka)
+	for k in outkeys(name,ka)[1]:
+		v=np.empty_like(ans[k])
+		v[:,order]=ans[k]
+		ans[k]=v
+	return ans
+
+def iterblocks(self,name,*data,**ka):
+	"""Runs a pij function in row blocks and yields outputs of each block.
+	Each block is computed with the engine of findr.lib, and probabilities are converted with histogram bounds
+	from the block's own LLRs (see findr.blocks). For nodiag on backend 'c', targets (dt2) are reordered for each block
+	into one reused buffer so its own regulators come first, and reordered back in outputs. On backend 'numpy',
+	diagonal entries are located from row indices instead, and memory-mapped targets are standardized for each block
+	rather than copied.
+	name:	Name of pij function in findr.lib, as keys of findr.blocks.methods.
+	data:	Input data of the function. Inputs of A (e.g. dg and dt) are split by row, and can be memory maps
+		or findr.plink.packedg, in which case only one block is read or unpacked at a time.
+	nrow:	Number of rows per block. Default (None) chooses automatically.
+	blocks:	List of (start,stop) to compute, as a subset of the blocks determined by nrow. Default (None) computes all blocks.
+	cancel:	Cancellation token, as any object with method is_set(), e.g. threading.Event. It is checked before each block
+		and iteration stops once it is set. Default (None) disables cancellation.
+	ka:	Other keyword arguments passed to the function.
+	Yield:	(start,stop,ans) where ans is the output of the function for rows start to stop.
+	"""
+	import numpy as np
+	nrow=ka.pop('nrow',None)
+	blocks=ka.pop('blocks',None)
+	cancel=ka.pop('cancel',None)
+	nt,nt2,s=spec(name,data)
+	ka=_fixka(name,data,dict(ka))
+	nodiag=s[1] and bool(ka.get('nodiag',False))
+	if nodiag and nt2<nt:
+		raise ValueError('Input requires nt2>=nt for nodiag.')
+	if nrow is None:
+		nrow=defaultnrow(name,nt,nt2)
+	if nrow<=0:
+		raise ValueError('Wrong nrow')
+	if blocks is None:
+		blocks=bounds(nt,nrow)
+	#Targets sampled with nsample are the same for all blocks
+	ka=_seed(ka,rs=getattr(self,'rs',0))
+	dt2=data[-1]
+	buf=None
+	for start,stop in blocks:
+		if cancel is not None and cancel.is_set():
+			return
+		if nodiag and buf is None and getattr(self,'backend','c')!='numpy':
+			from .panel import unwrap
+			buf=np.empty(dt2.shape,dtype=unwrap(dt2)[0].dtype)
+		yield (start,stop,_call(self,name,[x[start:stop] for x in data[:-1]],dt2,np.arange(start,stop),ka,buf=buf))
+
+def _manifest(name,data,ka,nrow):
+	import json
+	from .util import inputhash
+	from .auto import version
+	return json.loads(json.dumps({'name':name,'version':version,'nrow':nrow,
+		'shapes':[list(x.shape) for x in data],'hashes':[inputhash(x) for x in data],
+		'parameters':ka},sort_keys=True,default=str))
+
+def _blockfile(path,start,stop):
+	import os
+	return os.path.join(path,'block-{}-{}.npz'.format(start,stop))
+
+def _save(fname,ans):
+	"""Saves block outputs atomically, so partially written files are never seen as completed blocks."""
+	import os
+	import numpy as np
+	ftmp=fname+'.'+str(os.getpid())+'.tmp'
+	with open(ftmp,'wb') as f:
+		np.savez(f,**ans)
+		f.flush()
+		os.fsync(f.fileno())
+	os.replace(ftmp,fname)
+
+def checkpoint(path,name,data,ka,nrow):
+	"""Opens or creates a checkpoint directory for a row block run.
+	path:	Checkpoint directory.
+	name,data,ka,nrow:	Function name, inputs, keyword arguments and rows per block of the run.
+	Return:	list of (start,stop) of completed blocks.
+	Raises ValueError if the directory holds a checkpoint of a different run, as determined by input hashes (findr.util.inputhash)
+	and parameters."""
+	import os
+	import json
+	m=_manifest(name,data,ka,nrow)
+	fm=os.path.join(path,'manifest.json')
+	if os.path.isfile(fm):
+		with open(fm,'r') as f:
+			m0=json.load(f)
+		if m0!=m:
+			raise ValueError('Checkpoint at '+path+' belongs to a different run.')
+	else:
+		if not os.path.isdir(path):
+			os.makedirs(path)
+		ftmp=fm+'.'+str(os.getpid())+'.tmp'
+		with open(ftmp,'w') as f:
+			json.dump(m,f,sort_keys=True,indent=1)
+		os.replace(ftmp,fm)
+	nt=data[0].shape[0]
+	return [x for x in bounds(nt,nrow) if os.path.isfile(_blockfile(path,*x))]
+
+def run(self,name,*data,**ka):
+	"""Runs a pij function in row blocks, optionally checkpointing completed blocks to resume interrupted runs.
+	With a checkpoint directory, each completed block is saved atomically, together with a manifest of input hashes
+	and parameters. Rerunning with the same directory, inputs and parameters skips completed blocks.
+	name:	Name of pij function in findr.lib, as keys of findr.blocks.methods.
+	data:	Input data of the function. See findr.blocks.iterblocks.
+	nrow:	Number of rows per block. Default (None) chooses automatically.
+	path:	Checkpoint directory. Default (None) disables checkpointing.
+	progress:	Function called with a dictionary of progress information after each block, with keys
+		done:	Number of rows completed, including those loaded from checkpoint.
+		total:	Total number of rows.
+		elapsed:	Time elapsed in seconds.
+		rate:	Throughput in rows per second in this run.
+		eta:	Estimated remaining time in seconds, or None before the first block completes.
+		For printing progress in terminals or notebooks, use findr.blocks.printprogress. Default (None) disables reporting.
+	cancel:	Cancellation token, as any object with method is_set(), e.g. threading.Event. It is checked before each block.
+		Once set, the run stops cleanly, keeping completed (and checkpointed) blocks. Default (None) disables cancellation.
+		To run in background, e.g. from asyncio, call this function in a thread (e.g. with loop.run_in_executor)
+		and set the token from any thread.
+	out_dtype:	Reduced precision format of assembled probability outputs, as one of findr.quant.formats
+		(e.g. 'f2', 'u2' or 'u1'). Each block is converted as it completes, so full outputs are never held in ftype.
+		Log likelihood ratios are kept in ftype. Checkpoints are kept in ftype. Default (None) indicates ftype.
+	ka:	Other keyword arguments passed to the function. With nsample (NumPy engine only), all blocks sample the same targets
+		with one seed for the run, from rs of findr.lib or at random, which is stored in the checkpoint manifest for resumed runs.
+	Return:	dictionary with the same keys as the function's output, assembled from all blocks.
+		ret is 0 iff all blocks succeeded, -1 if cancelled, or the first nonzero return value otherwise.
+		With out_dtype, use findr.quant.dequantize to recover values.
+		When cancelled, key done is additionally provided as numpy.ndarray(nt,dtype=bool) to mark completed rows.
+
+	Example: l.blocks('pijs_gassist',dg,dt,dt2,path='checkpoint',progress=findr.blocks.printprogress)
+	"""
+	import numpy as np
+	import time
+	from .auto import ftype_np
+	nrow=ka.pop('nrow',None)
+	path=ka.pop('path',None)
+	progress=ka.pop('progress',None)
+	cancel=ka.pop('cancel',None)
+	out_dtype=ka.pop('out_dtype',None)
+	t0=time.time()
+	nt,nt2,s=spec(name,data)
+	ka=_seed(_fixka(name,data,dict(ka)),path,getattr(self,'rs',0))
+	if nrow is None:
+		nrow=defaultnrow(name,nt,nt2)
+	vk,mk=outkeys(name,ka)
+	if out_dtype is not None:
+		from .quant import quantize,quantizable,check,_format
+		check(name,out_dtype)
+		qtype=_format(out_dtype)[0]
+	dtype=lambda k:qtype if out_dtype is not None and quantizable(k,name) else ftype_np
+	ans={'ret':0}
+	for k in vk:
+		ans[k]=np.zeros(nt,dtype=dtype(k))
+	for k in mk:
+		ans[k]=np.zeros((nt,nt2),dtype=dtype(k))
+
+	def merge(start,stop,v):
+		if ans['ret']==0 and int(v['ret'])!=0:
+			ans['ret']=int(v['ret'])
+		for k in vk+mk:
+			if ans[k].dtype!=ftype_np:
+				quantize(v[k],out_dtype,out=ans[k][start:stop])
+			else:
+				ans[k][start:stop]=v[k]
+
+	todo=bounds(nt,nrow)
+	done=np.zeros(nt,dtype=bool)
+	if path is not None:
+		for x in checkpoint(path,name,data,ka,nrow):
+			with np.load(_blockfile(path,*x)) as v:
+				merge(x[0],x[1],v)
+			done[x[0]:x[1]]=True
+		todo=[x for x in todo if not done[x[0]]]
+	n0=int(done.sum())
+	def report():
+		if progress is None:
+			return
+		t=time.time()-t0
+		n=int(done.sum())
+		rate=(n-n0)/t if t>0 else 0.
+		progress({'done':n,'total':nt,'elapsed':t,'rate':rate,'eta':(nt-n)/rate if rate>0 else None})
+	report()
+	for start,stop,v in iterblocks(self,name,*data,nrow=nrow,blocks=todo,cancel=cancel,**ka):
+		if path is not None and int(v['ret'])==0:
+			_save(_blockfile(path,start,stop),v)
+		merge(start,stop,v)
+		done[start:stop]=True
+		report()
+	if not done.all():
+		ans['ret']=-1
+		ans['done']=done
+	return ans
+
+def assemble(path,name,data,ka,nrow,fmt='npy',out_dtype=None):
+	"""Assembles outputs of completed blocks into one file per output key in the output directory.
+	path:	Output directory.
+	name,data,ka,nrow:	Function name, inputs, keyword arguments and rows per block of the run.
+	fmt:	Output format, as 'npy' for .npy files or 'bin' for findr-bin binary files with sidecar metadata.
+	out_dtype:	Reduced precision format of probabilities. Not supported for P-values. See findr.quant. Default (None) indicates ftype.
+	Return:	(ret,files) where ret is 0 iff all blocks are completed, and files is the list of written files."""
+	import os
+	import numpy as np
+	from .io import create
+	from .quant import quantize,quantizable,check,_format
+	nt,nt2,s=spec(name,data)
+	check(name,out_dtype)
+	ka=_seed(_fixka(name,data,dict(ka)),path)
+	done=checkpoint(path,name,data,ka,nrow)
+	if len(done)<len(bounds(nt,nrow)):
+		return (1,[])
+	vk,mk=outkeys(name,ka)
+	files=[os.path.join(path,k+('.npy' if fmt=='npy' else '.dat')) for k in vk+mk]
+	q=[out_dtype is not None and quantizable(k,name) for k in vk+mk]
+	outs=[create(f,(nt,) if k in vk else (nt,nt2),dtype=_format(out_dtype)[0] if t else None) for f,k,t in zip(files,vk+mk,q)]
+	for x in done:
+		with np.load(_blockfile(path,*x)) as v:
+			for k,o,t in zip(vk+mk,outs,q):
+				if t:
+					quantize(v[k],out_dtype,out=o[x[0]:x[1]])
+				else:
+					o[x[0]:x[1]]=v[k]
+	for o in outs:
+		if hasattr(o,'flush'):
+			o.flush()
+	return (0,files)
+
+def printprogress(info,file=None):
+	"""Prints progress information from findr.blocks.run on one updating line, for terminals and notebooks.
+	info:	Progress information dictionary.
+	file:	Output file. Default (None) indicates sys.stderr."""
+	import sys
+	f=sys.stderr if file is None else file
+	eta='?' if info['eta'] is None else '{:.0f}s'.format(info['eta'])
+	f.write('\r{}/{} rows ({:.1f}%), {:.0f}s elapsed, {:.3g} rows/s, ETA {}'.format(info['done'],info['total'],
+		100.*info['done']/max(info['total'],1),info['elapsed'],info['rate'],eta))
+	if info['done']>=info['total']:
+		f.write('\n')
+	f.flush()
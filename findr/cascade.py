@@ -0,0 +1,204 @@
+# Copyright 2016-2018, 2020 Lingfei Wang
+# 
+# This file is part of Findr.
+# 
+# Findr is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# Findr is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+# 
+# You should have received a copy of the GNU Affero General Public License
+# along with Findr.  If not, see <http://www.gnu.org/licenses/>.
+# 
+"""Cascading evaluation of the tests of pijs_gassist and pijs_cassist.
+Tests are evaluated in a user defined order with a cutoff for each. Pairs failing a test are pruned
+before later tests are evaluated, and only pairs passing all tests are returned, in sparse (COO) format.
+The first test is evaluated for all pairs in blocks of rows. Later tests only compute the correlation between A and B,
+and the covariance of their parts explained by the anchor, for remaining pairs, and convert their LLRs into probabilities
+with null distributions estimated from a sample of targets (see findr.llr.prob). LLRs are computed as in findr.llr.
+Histogram bounds of probability conversion are approximated within each block of rows without an extra pass:
+the first test uses the maximum of its LLRs over all pairs of the block, and each later test the maximum over
+the sampled targets of the block and its remaining pairs. LLRs of pairs that are evaluated therefore never exceed the bounds.
+Probabilities then depend slightly on the block size (nbyte), and differ slightly from those of pijs functions.
+For usage, see findr.cascade.run or lib.cascade."""
+
+try: from exceptions import ValueError
+except ImportError: pass
+
+methods=['pijs_gassist','pijs_gassist_pv','pijs_cassist','pijs_cassist_pv']
+
+def _pass(p,test,cutoff,pvmode):
+	"""Whether each pair passes a test. Test 3 prefers its null hypothesis."""
+	if pvmode:
+		return p>=cutoff if test==3 else p<=cutoff
+	return p>=cutoff
+
+def _pairdot(za,zb,ri,cj,nbyte):
+	"""Dot products of rows ri of za and rows cj of zb, in pieces of about nbyte bytes."""
+	import numpy as np
+	ans=np.empty(len(ri),dtype=float)
+	n=max(1,nbyte//(8*za.shape[1]))
+	for x in range(0,len(ri),n):
+		ans[x:x+n]=np.einsum('ij,ij->i',za[ri[x:x+n]],zb[cj[x:x+n]])
+	return ans
+
+def _fit(e,za,continuous,nvx):
+	"""Standardized A explained by the anchor of each A, so the covariance of explained parts of A and B is its product with B."""
+	import numpy as np
+	from .llr import _std
+	ns=za.shape[1]
+	if continuous:
+		ze=_std(e)
+		return ze*((ze*za).sum(axis=1)/ns)[:,None]
+	ans=np.zeros(za.shape)
+	for v in range(nvx):
+		x=(e==v).astype(float)
+		c=x.sum(axis=1)
+		ans+=x*((x*za).sum(axis=1)/np.where(c>0,c,1))[:,None]
+	return ans
+
+def run(self,name,*data,**ka):
+	"""Evaluates tests of pijs_gassist or pijs_cassist in sequence, pruning pairs that fail earlier tests.
+	self:	findr.lib instance. Sampling of targets is seeded by its rs.
+	name:	Name of function whose tests are evaluated, as one of findr.cascade.methods. For _pv functions,
+		P-values are used instead of probabilities.
+	data:	Input data of the function, as (dg,dt,dt2) for gassist or (dc,dt,dt2) for cassist. dt2 can be findr.panel.panel.
+	tests:	Sequence of (test,cutoff) in order of evaluation, with test among 2,3,4,5. A pair passes a test if its
+		probability (or P-value for test 3 in _pv functions) is at least cutoff, or its P-value is at most cutoff for
+		tests 2,4,5 in _pv functions. Note probabilities of test 3 are of its null hypothesis, which is preferred.
+		Default (None) indicates ((2,0.75),(4,0.75),(5,0.75)) for probabilities. Required for P-values.
+	nodiag:	Whether to skip diagonal pairs (A=B). See pijs_gassist.
+	na:	Number of alleles for gassist. Default (None) indicates the maximum of dg.
+	nsample:	Number of sampled targets to estimate null distributions of later tests. Default: 1000.
+	nbin:	Number of histogram bins. Default (None) indicates findr.llr.defaultnbin(nt2) for the first test and of nsample for later tests.
+	nbyte:	Approximate memory usage in bytes of temporary matrices. Default: 2**26.
+	Return:	dictionary with following keys:
+	ret:	0 iff execution succeeded.
+	row,col:	numpy.ndarray(n,dtype=int). Indices of A and B of pairs passing all tests.
+	p2,p3,p4,p5:	numpy.ndarray(n,dtype=ftype(='=f4' by default)). Probabilities (or P-values) of pairs passing all tests,
+		for each evaluated test.
+	npass:	numpy.ndarray(len(tests),dtype=int). Number of pairs remaining after each test.
+	shape:	(nt,nt2) as shape of the dense output.
+	ftype can be found in auto.py.
+
+	Example: a=l.cascade('pijs_gassist',dg,dt,dt2,tests=[(2,0.9),(5,0.5)]); scipy.sparse.coo_matrix((a['p5'],(a['row'],a['col'])),shape=a['shape'])
+	"""
+	import numpy as np
+	from .auto import ftype_np
+	from .llr import _std,_stdb,_anchor,_llr,_curve,_apply,_random,pv,defaultnbin
+	from .panel import unwrap
+	if name not in methods:
+		raise ValueError('Unsupported function for cascade: '+str(name))
+	pvmode=name.endswith('_pv')
+	family='gassist' if 'gassist' in name else 'cassist'
+	tests=ka.pop('tests',None)
+	nodiag=bool(ka.pop('nodiag',False))
+	na=ka.pop('na',None)
+	nsample=int(ka.pop('nsample',1000))
+	nbin=ka.pop('nbin',None)
+	nbyte=ka.pop('nbyte',2**26)
+	if len(ka)>0:
+		raise ValueError('Unknown parameters: '+','.join(ka))
+	if tests is None:
+		if pvmode:
+			raise ValueError('tests are required for P-values.')
+		tests=((2,0.75),(4,0.75),(5,0.75))
+	tests=[(int(x[0]),float(x[1])) for x in tests]
+	if len(tests)==0 or any(x[0] not in [2,3,4,5] for x in tests) or len(set(x[0] for x in tests))!=len(tests):
+		raise ValueError('Wrong tests')
+	if len(data)!=3:
+		raise ValueError('Wrong number of inputs')
+	de,dt,pnl=data
+	dt2,pnl=unwrap(pnl)
+	if len(dt.shape)!=2 or len(dt2.shape)!=2 or dt.shape[1]!=dt2.shape[1] or de.shape!=dt.shape:
+		raise ValueError('Wrong input shape')
+	nt,ns=dt.shape
+	nt2=dt2.shape[0]
+	if nodiag and nt2<nt:
+		raise ValueError('Input requires nt2>=nt for nodiag.')
+	if nsample<=0:
+		raise ValueError('Wrong nsample')
+	if np.isnan(dt).sum()+(np.isnan(dt2).sum() if pnl is None else 0)>0 or (family=='cassist' and np.isnan(de).sum()>0):
+		raise ValueError('NaN found.')
+	nvx=(int(na)+1 if na is not None else int(np.asarray(de).max())+1) if family=='gassist' else 0
+	rs=getattr(self,'rs',0)
+	cols=np.arange(nt2) if nsample>=nt2 else np.sort(_random(rs if rs else None).choice(nt2,nsample,replace=False))
+	nbin0=defaultnbin(nt2) if nbin is None else int(nbin)
+	nbins=defaultnbin(len(cols)) if nbin is None else int(nbin)
+	zb=_stdb(dt2 if pnl is None else pnl)
+	zbs=zb[cols]
+	nrow=max(1,nbyte//(8*max(nt2,1)*6))
+	ans={'ret':0,'npass':np.zeros(len(tests),dtype=int),'shape':(nt,nt2)}
+	outs=[[] for x in range(len(tests)+2)]
+	for x in range(0,nt,nrow):
+		m=min(x+nrow,nt)-x
+		rows=np.arange(m)
+		za=_std(dt[x:x+m])
+		e=np.asarray(de[x:x+m])
+		t,c=tests[0]
+		#Test 2 does not need the covariance of explained parts, which is then only computed for remaining pairs
+		ra2,rb2,cross,nv=_anchor(e,za,zb,family=='cassist',nvx,withcross=t!=2)
+		fa=None
+		sa=1-ra2
+		sb=1-rb2
+		valid=np.ones((m,nt2),dtype=bool)
+		if nodiag:
+			valid[rows,rows+x]=False
+		#First test for all pairs
+		rho=np.dot(za,zb.T)/ns if t!=2 else None
+		l=_llr(t,ns,sa[:,None],sb,rho,cross)
+		if pvmode:
+			p=pv(l,t,ns,nv[:,None])
+		else:
+			#Bound from the first test over all pairs of the block
+			edges,palt=_curve(l,valid,t,ns,nv,nbin0,l[valid].max(initial=0))
+			p=_apply(l,rows[:,None],edges,palt)
+			if t==3:
+				p=1-p
+		ri,cj=np.nonzero(_pass(p,t,c,pvmode)&valid)
+		vals=[p[ri,cj]]
+		ans['npass'][0]+=len(ri)
+		#Later tests for remaining pairs
+		rhos=None
+		crosss=None
+		for k in range(1,len(tests)):
+			t,c=tests[k]
+			if len(ri)==0:
+				vals.append(np.zeros(0,dtype=ftype_np))
+				continue
+			if cross is None and fa is None:
+				fa=_fit(e,za,family=='cassist',nvx)
+			r=rho[ri,cj] if rho is not None else _pairdot(za,zb,ri,cj,nbyte)/ns
+			cr=cross[ri,cj] if cross is not None else _pairdot(fa,zb,ri,cj,nbyte)/ns
+			l=_llr(t,ns,sa[ri],sb[ri,cj],r,cr)
+			if pvmode:
+				p=pv(l,t,ns,nv[ri])
+			else:
+				if rhos is None:
+					rhos=rho[:,cols] if rho is not None else np.dot(za,zbs.T)/ns
+					crosss=cross[:,cols] if cross is not None else np.dot(fa,zbs.T)/ns
+				ls=_llr(t,ns,sa[:,None],sb[:,cols],rhos,crosss)
+				vs=valid[:,cols]
+				#Bound from sampled targets and remaining pairs of the block
+				edges,palt=_curve(ls,vs,t,ns,nv,nbins,max(ls[vs].max(initial=0),l.max(initial=0)))
+				p=_apply(l,ri,edges,palt)
+				if t==3:
+					p=1-p
+			ok=_pass(p,t,c,pvmode)
+			ri,cj=ri[ok],cj[ok]
+			vals=[v[ok] for v in vals]+[p[ok]]
+			ans['npass'][k]+=len(ri)
+		outs[0].append(ri+x)
+		outs[1].append(cj)
+		for k in range(len(tests)):
+			outs[k+2].append(np.asarray(vals[k],dtype=ftype_np))
+	ans['row']=np.concatenate(outs[0]) if nt>0 else np.zeros(0,dtype=int)
+	ans['col']=np.concatenate(outs[1]) if nt>0 else np.zeros(0,dtype=int)
+	for k in range(len(tests)):
+		ans['p'+str(tests[k][0])]=np.concatenate(outs[k+2]) if nt>0 else np.zeros(0,dtype=ftype_np)
+	return ans
@@ -18,6 +18,7 @@
 """Python interface for this library."""
 
 from .auto import *
+import os
 import ctypes as c
 ftype=getattr(c,ftype_c)
 gtype=getattr(c,gtype_c)
@@ -25,3 +26,6 @@ gtype=getattr(c,gtype_c)
 ftype_p=c.POINTER(ftype)
 gtype_p=c.POINTER(gtype)
 c_ubyte_p=c.POINTER(c.c_ubyte)
+
+#Profile of calibrated runtime predictions. See findr.plan.calibrate.
+profilepath=os.path.expanduser("~")+"/.local/share/findr/profile.json"
@@ -0,0 +1,311 @@
+# Copyright 2016-2018, 2020 Lingfei Wang
+# 
+# This file is part of Findr.
+# 
+# Findr is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# Findr is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+# 
+# You should have received a copy of the GNU Affero General Public License
+# along with Findr.  If not, see <http://www.gnu.org/licenses/>.
+# 
+"""Distribution of row block runs over multiple nodes with a work queue on a shared filesystem.
+A run is published into an output directory as tiles (row blocks of findr.blocks), listed in an SQLite database
+in the same directory, without any external service. Workers on any node sharing the directory claim tiles
+in transactions, compute them and save each as a block file of findr.blocks checkpoints. Tiles of workers that stop
+responding are claimed again after a lease time. Outputs are finally verified for completeness and assembled
+into memory mapped files, one per output key.
+Tiles span all targets (B), because probability conversion of each A uses the distribution over all its targets.
+Each tile is computed as a row block of findr.blocks, so probabilities depend slightly on the tile size (nrow).
+The shared filesystem must support file locking (e.g. local disks, NFSv4 or Lustre with locking enabled) for SQLite.
+For usage, see findr.dist.publish, lib.dist_work, findr.dist.collect, or python -m findr publish|work|status|collect."""
+
+try: from exceptions import ValueError
+except ImportError: pass
+
+dbname='queue.sqlite'
+
+def _connect(path,timeout=600):
+	"""Opens the queue database of an output directory, in autocommit mode for explicit transactions."""
+	import os
+	import sqlite3
+	return sqlite3.connect(os.path.join(path,dbname),timeout=timeout,isolation_level=None)
+
+def config(path):
+	"""Reads configuration of a published run.
+	path:	Output directory.
+	Return:	dictionary of name, inputs, stat (size and modification time of inputs), ns, ka, nrow, nt, nt2, format and out_dtype,
+		as published."""
+	import os
+	import json
+	if not os.path.isfile(os.path.join(path,dbname)):
+		raise ValueError('No published run at '+path)
+	con=_connect(path)
+	try:
+		v=con.execute("SELECT value FROM config WHERE key='run'").fetchone()
+	finally:
+		con.close()
+	if v is None:
+		raise ValueError('No published run at '+path)
+	return json.loads(v[0])
+
+def _stat(inputs):
+	"""Cheap metadata of input files, as [size,modification time in ns] of each, to verify them without reading."""
+	import os
+	return [[os.stat(x).st_size,os.stat(x).st_mtime_ns] for x in inputs]
+
+def _open(path,c=None):
+	"""Loads inputs of a published run as memory maps and verifies them against metadata stored at publication.
+	Return:	(configuration,inputs,list of (start,stop) of completed blocks)"""
+	import os
+	from .io import loadinputs
+	from .blocks import bounds,_blockfile
+	if c is None:
+		c=config(path)
+	for x,m in zip(c['inputs'],c['stat']):
+		if not os.path.isfile(x) or _stat([x])[0]!=m:
+			raise ValueError('Input changed since publication: '+x)
+	data=loadinputs(c['inputs'],c['name'],c['ns'])
+	return (c,data,[x for x in bounds(c['nt'],c['nrow']) if os.path.isfile(_blockfile(path,*x))])
+
+def publish(path,name,inputs,nrow=None,memory=None,ns=None,fmt='npy',out_dtype=None,backend='c',**ka):
+	"""Publishes a row block run of a pij function into a work queue of tiles, for workers on any node.
+	Publishing again with the same parameters only adds tiles not yet listed, and marks those with block files as done.
+	path:	Output directory on a filesystem shared by all workers.
+	name:	Name of pij function in findr.lib, as keys of findr.blocks.methods.
+	inputs:	List of input files of the function, as in python -m findr run. They must be readable by all workers
+		at the same paths, and are stored as absolute paths.
+	nrow:	Number of rows per tile. Default (None) chooses from memory, or automatically.
+	memory:	Memory budget of each worker in bytes to choose nrow, with findr.plan.maxnrow. Default (None) disables it.
+	ns:	Number of samples, for raw binary inputs without sidecar metadata.
+	fmt:	Format of assembled outputs for findr.dist.collect, as 'npy' or 'bin'.
+	out_dtype:	Reduced precision format of assembled probabilities for findr.dist.collect. Not supported for P-values. See findr.quant.
+	backend:	Engine of workers, as backend of findr.lib, for the memory model of findr.plan.maxnrow.
+	ka:	Other keyword arguments passed to the function, e.g. nodiag, na, memlimit.
+	Return:	dictionary with following keys:
+	ret:	0 iff execution succeeded.
+	ntile:	Number of tiles.
+	ndone:	Number of tiles already completed.
+	nrow,nt,nt2:	Rows per tile, and numbers of A and B.
+
+	Example: findr.dist.publish('/shared/out','pijs_gassist',['dg.npy','dt.npy','dt2.npy'],memory=2**34,nodiag=True)
+	"""
+	import os
+	import json
+	from .io import loadinputs
+	from .blocks import spec,bounds,defaultnrow,_fixka,_seed,checkpoint
+	from .quant import check
+	check(name,out_dtype)
+	inputs=[os.path.abspath(x) for x in inputs]
+	data=loadinputs(inputs,name,ns)
+	nt,nt2,_=spec(name,data)
+	ka=_seed(_fixka(name,data,dict(ka)),path)
+	if nrow is None:
+		if memory is not None:
+			from .plan import maxnrow
+			nrow=maxnrow(name,nt,nt2,data[-1].shape[1],memory,memlimit=ka.get('memlimit',-1),backend=backend)
+			if nrow==0:
+				raise ValueError('Memory budget too small for a single row.')
+		else:
+			nrow=defaultnrow(name,nt,nt2)
+	nrow=int(nrow)
+	if nrow<=0:
+		raise ValueError('Wrong nrow')
+	done=set(checkpoint(path,name,data,ka,nrow))
+	c=json.loads(json.dumps({'name':name,'inputs':inputs,'stat':_stat(inputs),'ns':ns,'ka':ka,'nrow':nrow,'nt':nt,'nt2':nt2,
+		'format':fmt,'out_dtype':out_dtype},sort_keys=True,default=str))
+	con=_connect(path)
+	try:
+		con.execute('BEGIN IMMEDIATE')
+		con.execute('CREATE TABLE IF NOT EXISTS config(key TEXT PRIMARY KEY,value TEXT)')
+		con.execute('CREATE TABLE IF NOT EXISTS tiles(start INTEGER PRIMARY KEY,stop INTEGER,state TEXT,worker TEXT,'
+			'claimed REAL,finished REAL,attempts INTEGER,error TEXT)')
+		v=con.execute("SELECT value FROM config WHERE key='run'").fetchone()
+		if v is not None and json.loads(v[0])!=c:
+			con.execute('ROLLBACK')
+			raise ValueError('Queue at '+path+' belongs to a different run.')
+		con.execute("INSERT OR IGNORE INTO config VALUES('run',?)",(json.dumps(c,sort_keys=True),))
+		t=bounds(nt,nrow)
+		con.executemany("INSERT OR IGNORE INTO tiles VALUES(?,?,'todo',NULL,NULL,NULL,0,NULL)",t)
+		con.executemany("UPDATE tiles SET state='done' WHERE start=?",[(x[0],) for x in done])
+		#Tiles whose block files were removed are computed again
+		con.executemany("UPDATE tiles SET state='todo',attempts=0 WHERE start=? AND state='done'",[(x[0],) for x in t if x not in done])
+		con.execute('COMMIT')
+	finally:
+		con.close()
+	return {'ret':0,'ntile':len(t),'ndone':len(done),'nrow':nrow,'nt':nt,'nt2':nt2}
+
+def _claim(con,worker,lease):
+	"""Claims the first tile that is pending, or held by another worker beyond the lease time, in one transaction.
+	Return:	(start,stop), or None if no tile is available."""
+	import time
+	now=time.time()
+	con.execute('BEGIN IMMEDIATE')
+	try:
+		v=con.execute("SELECT start,stop FROM tiles WHERE state='todo' OR (state='running' AND claimed<?) ORDER BY start LIMIT 1",
+			(now-lease,)).fetchone()
+		if v is not None:
+			con.execute("UPDATE tiles SET state='running',worker=?,claimed=?,attempts=attempts+1 WHERE start=?",(worker,now,v[0]))
+		con.execute('COMMIT')
+	except BaseException:
+		con.execute('ROLLBACK')
+		raise
+	return v
+
+def _finish(con,start,state,error=None,maxattempt=None):
+	"""Marks a tile as done, or as failed and returned to the queue until maxattempt attempts."""
+	import time
+	if state=='done':
+		con.execute("UPDATE tiles SET state='done',finished=?,error=NULL WHERE start=?",(time.time(),start))
+	else:
+		con.execute("UPDATE tiles SET state=CASE WHEN attempts>=? THEN 'failed' ELSE 'todo' END,error=? WHERE start=? AND state!='done'",
+			(maxattempt,error,start))
+
+def work(self,path,worker=None,lease=86400,ntile=None,maxattempt=3,progress=None):
+	"""Runs a worker that claims and computes tiles of a published run until none is left.
+	Any number of workers can run on any nodes sharing the output directory. Each tile is saved atomically as a block file
+	before it is marked as done, so tiles computed twice (e.g. after lease expiry) are harmless.
+	self:	findr.lib instance.
+	path:	Output directory of the published run.
+	worker:	Name of worker recorded for claimed tiles. Default (None) indicates hostname:pid.
+	lease:	Time in seconds after which tiles claimed by a worker that has not finished them can be claimed by others.
+		It should exceed the time of the slowest tile.
+	ntile:	Maximum number of tiles to compute. Default (None) indicates no limit.
+	maxattempt:	Number of attempts of each tile before it is marked as failed.
+	progress:	Function called with a dictionary of progress information after each tile, with keys start and stop of the tile,
+		computed as tiles computed by this worker, and done, total, elapsed, rate and eta as in findr.blocks.run,
+		where done counts rows completed by all workers and rate is that of this worker.
+		For printing, use findr.blocks.printprogress. Default (None) disables it.
+	Return:	dictionary with following keys:
+	ret:	0 iff all computed tiles succeeded, or the first nonzero return value or -1 for exceptions otherwise.
+	worker:	Name of worker.
+	computed:	Number of tiles computed.
+	failed:	Number of tiles that failed.
+	rows:	Number of rows computed.
+	elapsed:	Time elapsed in seconds.
+
+	Example: l.dist_work('/shared/out')
+	"""
+	import os
+	import time
+	import socket
+	import traceback
+	from .blocks import iterblocks,_blockfile,_save
+	t0=time.time()
+	if worker is None:
+		worker=socket.gethostname()+':'+str(os.getpid())
+	if lease<=0 or maxattempt<=0:
+		raise ValueError('Wrong input parameter')
+	c,data,_=_open(path)
+	ans={'ret':0,'worker':worker,'computed':0,'failed':0,'rows':0}
+	con=_connect(path)
+	try:
+		while ntile is None or ans['computed']+ans['failed']<ntile:
+			v=_claim(con,worker,lease)
+			if v is None:
+				break
+			start,stop=v
+			try:
+				r=list(iterblocks(self,c['name'],*data,nrow=c['nrow'],blocks=[(start,stop)],**c['ka']))[0][2]
+				ret=int(r['ret'])
+				if ret==0:
+					_save(_blockfile(path,start,stop),r)
+			except Exception:
+				ret=-1
+				err=traceback.format_exc()
+			except BaseException:
+				#Returns the tile to the queue on interruption
+				con.execute("UPDATE tiles SET state='todo',attempts=attempts-1 WHERE start=? AND state='running' AND worker=?",
+					(start,worker))
+				raise
+			else:
+				err='Return value '+str(ret)
+			if ret==0:
+				_finish(con,start,'done')
+				ans['computed']+=1
+				ans['rows']+=stop-start
+			else:
+				_finish(con,start,'failed',error=err,maxattempt=maxattempt)
+				ans['failed']+=1
+				if ans['ret']==0:
+					ans['ret']=ret
+			if progress is not None:
+				t=time.time()-t0
+				n=con.execute("SELECT COALESCE(SUM(stop-start),0) FROM tiles WHERE state='done'").fetchone()[0]
+				rate=ans['rows']/t if t>0 else 0.
+				progress({'start':start,'stop':stop,'computed':ans['computed'],'done':n,'total':c['nt'],'elapsed':t,
+					'rate':rate,'eta':(c['nt']-n)/rate if rate>0 else None})
+	finally:
+		con.close()
+	ans['elapsed']=time.time()-t0
+	return ans
+
+def status(path):
+	"""Progress of a published run.
+	path:	Output directory of the published run.
+	Return:	dictionary with following keys:
+	ntile:	Number of tiles.
+	todo,running,done,failed:	Numbers of tiles in each state.
+	rows:	Number of rows in completed tiles.
+	workers:	Dictionary of number of completed tiles by each worker.
+	errors:	List of (start,stop,error) of tiles that have failed at least once.
+	"""
+	con=_connect(path)
+	try:
+		ans={'ntile':0,'todo':0,'running':0,'done':0,'failed':0,'rows':0,'workers':{}}
+		for s,n in con.execute('SELECT state,COUNT(*) FROM tiles GROUP BY state'):
+			ans[s]=n
+			ans['ntile']+=n
+		ans['rows']=con.execute("SELECT COALESCE(SUM(stop-start),0) FROM tiles WHERE state='done'").fetchone()[0]
+		for w,n in con.execute("SELECT worker,COUNT(*) FROM tiles WHERE state='done' AND worker IS NOT NULL GROUP BY worker"):
+			ans['workers'][w]=n
+		ans['errors']=[tuple(x) for x in con.execute('SELECT start,stop,error FROM tiles WHERE error IS NOT NULL ORDER BY start')]
+	finally:
+		con.close()
+	return ans
+
+def collect(path,fmt=None,out_dtype=None):
+	"""Verifies completeness of a published run and assembles outputs into one memory mapped file per output key.
+	Every tile must be marked as done, with a block file of the expected output keys and shapes.
+	path:	Output directory of the published run.
+	fmt:	Output format, as 'npy' or 'bin'. Default (None) indicates that of publication.
+	out_dtype:	Reduced precision format of probabilities. Not supported for P-values. See findr.quant. Default (None) indicates that of publication.
+	Return:	dictionary with following keys:
+	ret:	0 iff the run is complete and outputs are assembled.
+	files:	List of written files.
+	missing:	List of (start,stop) of tiles that are not done or whose block files are missing or incomplete.
+	"""
+	import numpy as np
+	from .blocks import assemble
+	from .blocks import outkeys,bounds,_blockfile
+	c,data,done=_open(path)
+	done=set(done)
+	con=_connect(path)
+	try:
+		marked=set(tuple(x) for x in con.execute("SELECT start,stop FROM tiles WHERE state='done'"))
+	finally:
+		con.close()
+	vk,mk=outkeys(c['name'],c['ka'])
+	missing=[]
+	for x in bounds(c['nt'],c['nrow']):
+		ok=x in done and x in marked
+		if ok:
+			try:
+				with np.load(_blockfile(path,*x)) as v:
+					ok=all(k in v.files for k in vk+mk)
+					ok=ok and all(v[k].shape==((x[1]-x[0],) if k in vk else (x[1]-x[0],c['nt2'])) for k in vk+mk)
+			except (OSError,ValueError):
+				ok=False
+		if not ok:
+			missing.append(x)
+	if len(missing)>0:
+		return {'ret':1,'files':[],'missing':missing}
+	ret,files=assemble(path,c['name'],data,c['ka'],c['nrow'],fmt=c['format'] if fmt is None else fmt,
+		out_dtype=c['out_dtype'] if out_dtype is None else out_dtype)
+	return {'ret':ret,'files':files,'missing':[]}
@@ -28,24 +28,18 @@ def load_geuvadis_data():
 	namest.txt:	3000 gene names"""
 	from os.path import dirname,join
 	from .auto import gtype_np,ftype_np
-	import numpy as np
-	def getdata(name,dtype,shape):
-		d=join(dirname(__file__),'data','geuvadis',name)
-		d=np.fromfile(d,dtype=dtype)
-		d=d.reshape(*shape)
-		return d
+	from .io import load,loadnames
+	def getdata(name,dtype,ns=360):
+		return load(join(dirname(__file__),'data','geuvadis',name),dtype=dtype,shape=(-1,ns),mode='c')
 	
-	ans={'dc':getdata('dc.dat',ftype_np,(10,360)),
-	'dgmi':getdata('dgmi.dat',gtype_np,(10,360)),
-	'dmi':getdata('dmi.dat',ftype_np,(10,360)),
-	'dgt':getdata('dgt.dat',gtype_np,(1000,360)),
-	'dt':getdata('dt.dat',ftype_np,(1000,360)),
-	'dt2':getdata('dt2.dat',ftype_np,(3000,360))}
+	ans={'dc':getdata('dc.dat',ftype_np),
+	'dgmi':getdata('dgmi.dat',gtype_np),
+	'dmi':getdata('dmi.dat',ftype_np),
+	'dgt':getdata('dgt.dat',gtype_np),
+	'dt':getdata('dt.dat',ftype_np),
+	'dt2':getdata('dt2.dat',ftype_np)}
 	
-	f=open(join(dirname(__file__),'data','geuvadis','namest.txt'),'r')
-	namest=[x.strip('\r\n') for x in f.readlines()]
-	f.close()
-	ans['namest']=namest
+	ans['namest']=loadnames(join(dirname(__file__),'data','geuvadis','namest.txt'))
 	return ans
 
 def runcode(code):
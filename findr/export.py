@@ -0,0 +1,180 @@
+# Copyright 2016-2018, 2020 Lingfei Wang
+# 
+# This file is part of Findr.
+# 
+# Findr is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# Findr is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+# 
+# You should have received a copy of the GNU Affero General Public License
+# along with Findr.  If not, see <http://www.gnu.org/licenses/>.
+# 
+"""Export of pij outputs as edge lists.
+Edges above a cutoff are selected and formatted in blocks of rows with vectorized operations.
+Text output is tab separated (A, B, value), compressed according to file extension: .gz as multi-member gzip
+and .zst as multi-frame zstandard (requires the zstandard package), with blocks compressed in parallel threads.
+Both can be read by standard tools as single streams.
+Binary output is a raw array of records of edges with sidecar metadata, loadable with findr.io.load.
+For usage, see findr.export.edges."""
+
+try: from exceptions import ValueError
+except ImportError: pass
+
+def dtype():
+	"""Data type of records in binary output. Fields are row (A), col (B) and p (value)."""
+	return [('row','<u4'),('col','<u4'),('p','<f4')]
+
+def _rows(d,key,nrow):
+	"""Iterates (start,block) of 2-dimensional blocks of rows."""
+	import numpy as np
+	if isinstance(d,dict):
+		d=d[key]
+	if hasattr(d,'shape') and hasattr(d,'__getitem__'):
+		if len(d.shape)!=2:
+			raise ValueError('Wrong input shape')
+		n=nrow if nrow is not None else max(1,2**22//max(1,d.shape[1]))
+		for x in range(0,d.shape[0],n):
+			yield (x,d[x:x+n])
+		return
+	for v in d:
+		if type(v) is not tuple or len(v)!=3:
+			raise ValueError('Blocks must be (start,stop,ans) as from findr.blocks.iterblocks.')
+		if v[2]['ret']!=0:
+			raise ValueError('Block of rows {} to {} failed.'.format(v[0],v[1]))
+		b=v[2][key]
+		if b.shape[0]!=v[1]-v[0]:
+			raise ValueError('Wrong block shape')
+		yield (v[0],b)
+
+def select(block,start,cutoff,nodiag=False,below=False):
+	"""Selects edges of a block of rows.
+	block:	numpy.ndarray(nrow,nt2) of values of rows [start,start+nrow).
+	start:	Index of first row.
+	cutoff:	Edges with values at least cutoff are selected, or at most cutoff if below.
+	nodiag:	Whether to exclude diagonal edges (A=B).
+	below:	Whether to select values at most cutoff, e.g. for P-values.
+	Return:	(row,col,value) as numpy.ndarray of selected edges, in row-major order."""
+	import numpy as np
+	block=np.asarray(block)
+	t=block<=cutoff if below else block>=cutoff
+	if nodiag:
+		n=min(block.shape[0],max(block.shape[1]-start,0))
+		r=np.arange(n)
+		t[r,r+start]=False
+	r,c=np.nonzero(t)
+	return (r+start,c,block[r,c])
+
+def lines(row,col,value,names=None,names2=None,fmt='%.6g'):
+	"""Formats edges as tab separated text lines.
+	row,col,value:	Edges as from findr.export.select.
+	names:	numpy.ndarray of names of A. Default (None) uses indices.
+	names2:	numpy.ndarray of names of B. Default (None) uses indices.
+	fmt:	printf-style format of values.
+	Return:	Text as str."""
+	import numpy as np
+	if len(row)==0:
+		return ''
+	a=names[row] if names is not None else row.astype(str)
+	b=names2[col] if names2 is not None else col.astype(str)
+	v=np.char.mod(fmt,value)
+	s=np.char.add(np.char.add(np.char.add(np.char.add(a,'\t'),b),'\t'),v)
+	return '\n'.join(s.tolist())+'\n'
+
+def _compressor(path,level):
+	"""Function compressing bytes according to file extension."""
+	if path.endswith('.gz'):
+		import gzip
+		if hasattr(gzip,'compress'):
+			return lambda x:gzip.compress(x,compresslevel=level)
+		import io
+		def f(x):
+			s=io.BytesIO()
+			with gzip.GzipFile(fileobj=s,mode='wb',compresslevel=level) as g:
+				g.write(x)
+			return s.getvalue()
+		return f
+	if path.endswith('.zst'):
+		try:
+			import zstandard
+		except ImportError:
+			raise ValueError('zstandard package is required for .zst output.')
+		return lambda x:zstandard.ZstdCompressor(level=level).compress(x)
+	return lambda x:x
+
+def edges(path,d,cutoff,key='p',names=None,names2=None,nodiag=False,below=False,fmt='%.6g',header=True,binary=False,level=6,nrow=None,nth=0):
+	"""Writes edges of pij outputs with values above a cutoff.
+	path:	Output file. Text output is compressed by extension: .gz for gzip and .zst for zstandard, or uncompressed otherwise.
+	d:	pij output as numpy.ndarray(nt,nt2) (including memory maps), dictionary output of a pij function,
+		or iterable of (start,stop,ans) of row blocks from findr.blocks.iterblocks.
+	cutoff:	Edges with values at least cutoff are written, or at most cutoff if below.
+	key:	Key of values in dictionary outputs, e.g. 'p' or 'p2'.
+	names:	Names of A (rows). Default (None) uses indices.
+	names2:	Names of B (columns). Default (None) uses names, or indices if names is None.
+	nodiag:	Whether to exclude diagonal edges (A=B).
+	below:	Whether to select values at most cutoff, e.g. for P-values.
+	fmt:	printf-style format of values in text output.
+	header:	Whether to write a header line in text output.
+	binary:	Whether to write binary records of type findr.export.dtype() instead of text, with sidecar metadata.
+		Names are not written in binary output.
+	level:	Compression level.
+	nrow:	Number of rows per block for array inputs. Default (None) chooses automatically.
+	nth:	Number of parallel threads for formatting and compression. Default (0) indicates to use the number of cores.
+	Return:	Number of edges written."""
+	import numpy as np
+	from itertools import islice
+	from concurrent.futures import ThreadPoolExecutor
+	from .util import nthread
+	from .io import _writemeta
+	nth=nthread(nth)
+	if names is not None:
+		names=np.asarray(names,dtype=str)
+	if names2 is None and names is not None:
+		names2=names
+	elif names2 is not None:
+		names2=np.asarray(names2,dtype=str)
+	if binary:
+		dt=np.dtype(dtype())
+		n=0
+		with open(path,'wb') as f:
+			for start,b in _rows(d,key,nrow):
+				r,c,v=select(b,start,cutoff,nodiag=nodiag,below=below)
+				a=np.empty(len(r),dtype=dt)
+				a['row']=r
+				a['col']=c
+				a['p']=v
+				a.tofile(f)
+				n+=len(r)
+		_writemeta(path,(n,),dt)
+		return n
+	comp=_compressor(path,level)
+
+	def one(x):
+		start,b=x
+		r,c,v=select(b,start,cutoff,nodiag=nodiag,below=below)
+		if names2 is not None and len(c)>0 and c.max()>=len(names2):
+			raise ValueError('Not enough names of B.')
+		if names is not None and len(r)>0 and r.max()>=len(names):
+			raise ValueError('Not enough names of A.')
+		return (len(r),comp(lines(r,c,v,names=names,names2=names2,fmt=fmt).encode('utf-8')))
+
+	n=0
+	it=_rows(d,key,nrow)
+	with open(path,'wb') as f:
+		if header:
+			f.write(comp(('A\tB\t'+key+'\n').encode('utf-8')))
+		with ThreadPoolExecutor(max_workers=nth) as e:
+			while True:
+				vs=[e.submit(one,x) for x in islice(it,2*nth)]
+				if len(vs)==0:
+					break
+				for v in vs:
+					k,s=v.result()
+					n+=k
+					f.write(s)
+	return n
@@ -0,0 +1,254 @@
+# Copyright 2016-2018, 2020 Lingfei Wang
+# 
+# This file is part of Findr.
+# 
+# Findr is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# Findr is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+# 
+# You should have received a copy of the GNU Affero General Public License
+# along with Findr.  If not, see <http://www.gnu.org/licenses/>.
+# 
+"""Memory-bounded Benjamini-Hochberg multiple testing correction for P-values from _pv functions.
+P-values are read in blocks and counted in a histogram over the bit patterns of their single precision
+representations, with relative bin width 2**-11. The histogram gives approximate results with error bounds in one pass.
+Exact results are then obtained by sorting only the P-values of relevant bins in further passes.
+Inputs can be arrays (including memory maps), functions returning iterables of blocks, or
+iterables of blocks, e.g. from findr.blocks.iterblocks. Iterables can only be read once, so
+exact q-values require arrays or functions instead.
+For usage, see findr.fdr.threshold and findr.fdr.qvalues."""
+
+try: from exceptions import ValueError
+except ImportError: pass
+
+shift=12
+nbin=(0x3F800000>>shift)+1
+
+def edges():
+	"""Edges of histogram bins as numpy.ndarray(nbin+1,dtype=float). Bin i includes values in [edges[i],edges[i+1])."""
+	import numpy as np
+	return (np.arange(nbin+1,dtype='u4')<<shift).view('f4').astype(float)
+
+def _blocks(p,key,nrow):
+	"""Returns function that creates iterators of (offset,block) where block is 1-dimensional numpy.ndarray of float32."""
+	import numpy as np
+	from .auto import ftype_np
+	def conv(v):
+		if type(v) is tuple and len(v)==3:
+			v=v[2]
+		if isinstance(v,dict):
+			v=v[key]
+		v=np.asarray(v).astype(ftype_np,copy=False).ravel()
+		if np.isnan(v).any():
+			raise ValueError('NaN found.')
+		if len(v)>0 and (v.min()<0 or v.max()>1):
+			raise ValueError('P-values must be within [0,1].')
+		return v
+	def gen(it):
+		n=0
+		for v in it:
+			v=conv(v)
+			yield (n,v)
+			n+=len(v)
+	if isinstance(p,dict):
+		p=p[key]
+	if hasattr(p,'shape') and hasattr(p,'__getitem__'):
+		if len(p.shape)==0:
+			raise ValueError('Wrong input shape')
+		n=nrow if nrow is not None else max(1,2**24//max(1,int(np.prod(p.shape[1:]))))
+		return (lambda:gen(p[x:x+n] for x in range(0,p.shape[0],n)),True)
+	if callable(p):
+		return (lambda:gen(p()),True)
+	it=iter(p)
+	state=[False]
+	def once():
+		if state[0]:
+			raise ValueError('Iterable input can only be read once. Use an array or a function returning iterables instead.')
+		state[0]=True
+		return gen(it)
+	return (once,False)
+
+def _bin(v):
+	return v.view('u4')>>shift
+
+def hist(p,key='p',nrow=None,nth=0):
+	"""Computes histogram of P-values in one pass.
+	p:	P-values as numpy.ndarray (including memory maps), dictionary output of a _pv function,
+		function returning an iterable of blocks, or iterable of blocks. Each block can be numpy.ndarray,
+		dictionary output of a _pv function, or (start,stop,ans) from findr.blocks.iterblocks.
+	key:	Key of P-values in dictionary outputs, e.g. 'p' or 'p2'.
+	nrow:	Number of rows per block for array inputs. Default (None) chooses automatically.
+	nth:	Number of parallel threads. Default (0) indicates to use the number of cores.
+	Return:	numpy.ndarray(nbin,dtype=int) of counts per bin. See findr.fdr.edges for bin edges."""
+	return _hist(_blocks(p,key,nrow)[0],nth)
+
+def _hist(f,nth):
+	"""Computes histogram from function of findr.fdr._blocks, reading at most 2*nth blocks ahead."""
+	import numpy as np
+	from itertools import islice
+	from concurrent.futures import ThreadPoolExecutor
+	from .util import nthread
+	nth=nthread(nth)
+	ans=np.zeros(nbin,dtype=np.int64)
+	it=f()
+	with ThreadPoolExecutor(max_workers=nth) as e:
+		while True:
+			vs=[e.submit(lambda x:np.bincount(_bin(x[1]),minlength=nbin),x) for x in islice(it,2*nth)]
+			if len(vs)==0:
+				break
+			for v in vs:
+				ans+=v.result()
+	return ans
+
+def _gather(f,lo,hi):
+	"""Collects values in bins [lo,hi) and their flat positions in one pass."""
+	import numpy as np
+	vs=[]
+	ps=[]
+	for n,v in f():
+		b=_bin(v)
+		t=np.nonzero((b>=lo)&(b<hi))[0]
+		vs.append(v[t])
+		ps.append(t+n)
+	if len(vs)==0:
+		return (np.zeros(0,dtype='f4'),np.zeros(0,dtype=int))
+	return (np.concatenate(vs),np.concatenate(ps))
+
+def threshold(p,alpha=0.05,exact=True,key='p',memlimit=2**28,nrow=None,nth=0):
+	"""Finds the Benjamini-Hochberg P-value threshold for a given false discovery rate.
+	p,key,nrow,nth:	See findr.fdr.hist.
+	alpha:	False discovery rate.
+	exact:	Whether to compute the exact threshold with further passes over P-values near the threshold, one per group of bins
+		within memlimit (usually one). Otherwise, the threshold is approximated from the histogram in one pass, with bounds.
+	memlimit:	Approximate memory usage limit in bytes for each further pass in exact mode.
+	Return:	dictionary with following keys:
+	threshold:	P-value threshold. P-values no greater than the threshold are rejected (i.e. discoveries).
+		In approximate mode, a conservative threshold is returned: the P-values it rejects are discoveries of the exact threshold
+		too. Its value is not a lower bound and can exceed the exact threshold, but only where no P-values lie between them.
+	n:	Number of discoveries. In approximate mode, the lower bound of the number of discoveries.
+	nmax:	Upper bound of the number of discoveries. Identical to n in exact mode.
+	thresholdmax:	Upper bound of the threshold. Identical to threshold in exact mode.
+	m:	Total number of P-values.
+	"""
+	import numpy as np
+	if not (alpha>0 and alpha<=1):
+		raise ValueError('Wrong alpha')
+	f,reiter=_blocks(p,key,nrow)
+	if exact and not reiter:
+		raise ValueError('Exact threshold requires re-readable input. Use an array or a function returning iterables instead.')
+	h=_hist(f,nth)
+	m=int(h.sum())
+	e=edges()
+	c=np.cumsum(h)
+	t=h>0
+	#Largest bin whose largest value certainly (lo) or possibly (hi) satisfies the BH condition
+	lo=np.nonzero(t&(e[1:]<=alpha*c/max(m,1)))[0]
+	hi=np.nonzero(t&(e[:-1]<=alpha*c/max(m,1)))[0]
+	lo=lo[-1] if len(lo)>0 else -1
+	hi=hi[-1] if len(hi)>0 else -1
+	nlo=int(c[lo]) if lo>=0 else 0
+	nhi=int(c[hi]) if hi>=0 else 0
+	#Any P-value no greater than alpha*nlo/m is a discovery, as at least nlo P-values are no greater than it
+	thi=min(float(e[hi+1]),alpha*nhi/m) if hi>=0 else 0.
+	tlo=min(alpha*nlo/m,thi) if lo>=0 else 0.
+	if not exact or hi==lo:
+		if exact and lo>=0:
+			v=_gather(f,lo,lo+1)[0]
+			tlo=thi=float(v.max())
+		return {'threshold':tlo,'n':nlo,'nmax':nhi,'thresholdmax':thi,'m':m}
+	ans={'threshold':0.,'n':0}
+	start=lo+1 if lo>=0 else 0
+	for x in _groups(h,start,hi+1,memlimit//12)[::-1]:
+		v=np.sort(_gather(f,x[0],x[1])[0])
+		r=(c[x[0]-1] if x[0]>0 else 0)+np.searchsorted(v,v,side='right')
+		t=np.nonzero(v<=alpha*r/m)[0]
+		if len(t)>0:
+			ans={'threshold':float(v[t[-1]]),'n':int(r[t[-1]])}
+			break
+	if ans['n']==0 and lo>=0:
+		v=_gather(f,lo,lo+1)[0]
+		ans={'threshold':float(v.max()),'n':nlo}
+	ans.update({'nmax':ans['n'],'thresholdmax':ans['threshold'],'m':m})
+	return ans
+
+def _groups(h,start,stop,n):
+	"""Splits bins [start,stop) into consecutive groups with total counts within n where possible."""
+	ans=[]
+	x=start
+	while x<stop:
+		y=x
+		s=0
+		while y<stop and (y==x or s+h[y]<=n):
+			s+=h[y]
+			y+=1
+		ans.append((x,y))
+		x=y
+	return ans
+
+def qvalues(p,out=None,exact=True,key='p',memlimit=2**28,nrow=None,nth=0):
+	"""Computes Benjamini-Hochberg q-values (adjusted P-values) in bounded memory.
+	p,key,nrow,nth:	See findr.fdr.hist. Iterables are not accepted because multiple passes are needed.
+	out:	Output numpy.ndarray of the same total size as P-values, including memory maps. Default (None) creates a new array
+		of float32 in the same shape as p if p is an array, or 1-dimensional otherwise.
+	exact:	Whether to compute exact q-values. Exact mode sorts P-values in groups of bins, from the largest bins,
+		with one full pass over P-values for each group, i.e. about 24*m/memlimit passes after the histogram
+		(e.g. 36 passes for 4E8 P-values with the default memlimit). Increase memlimit to reduce them.
+		Otherwise, q-values are approximated in two passes from the histogram, with conservative (upper bound) estimates.
+	memlimit:	Approximate memory usage limit in bytes for each group in exact mode.
+	Return:	dictionary with following keys:
+	q:	q-values, as out.
+	bound:	Maximum error of q-values in approximate mode. 0 in exact mode.
+	m:	Total number of P-values.
+	"""
+	import numpy as np
+	from .auto import ftype_np
+	f,reiter=_blocks(p,key,nrow)
+	if not reiter:
+		raise ValueError('q-values require re-readable input. Use an array or a function returning iterables instead.')
+	h=_hist(f,nth)
+	m=int(h.sum())
+	if out is None:
+		if isinstance(p,dict):
+			p=p[key]
+		out=np.zeros(p.shape if hasattr(p,'shape') else m,dtype=ftype_np)
+	if int(np.prod(out.shape))!=m:
+		raise ValueError('Wrong output shape')
+	flat=out.reshape(-1)
+	if m==0:
+		return {'q':out,'bound':0.,'m':0}
+	e=edges()
+	c=np.cumsum(h)
+	t=h>0
+	cc=np.where(t,c,1).astype(float)
+	qhi=np.where(t,e[1:]*m/cc,np.inf)
+	qlo=np.where(t,e[:-1]*m/cc,np.inf)
+	qhi=np.minimum(np.minimum.accumulate(qhi[::-1])[::-1],1)
+	qlo=np.minimum(np.minimum.accumulate(qlo[::-1])[::-1],1)
+	if not exact:
+		for n,v in f():
+			flat[n:n+len(v)]=qhi[_bin(v)]
+		if hasattr(out,'flush'):
+			out.flush()
+		return {'q':out,'bound':float((qhi-qlo)[t].max()),'m':m}
+	qmin=1.
+	nz=np.nonzero(t)[0]
+	for x in _groups(h,nz[0],nz[-1]+1,memlimit//24)[::-1]:
+		v,pos=_gather(f,x[0],x[1])
+		if len(v)==0:
+			continue
+		o=np.argsort(v,kind='stable')
+		v=v[o]
+		pos=pos[o]
+		r=(c[x[0]-1] if x[0]>0 else 0)+np.searchsorted(v,v,side='right')
+		q=np.minimum(np.minimum.accumulate((v.astype(float)*m/r)[::-1])[::-1],qmin)
+		flat[pos]=q
+		qmin=float(q[0])
+	if hasattr(out,'flush'):
+		out.flush()
+	return {'q':out,'bound':0.,'m':m}
@@ -0,0 +1,198 @@
+# Copyright 2016-2018, 2020 Lingfei Wang
+# 
+# This file is part of Findr.
+# 
+# Findr is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# Findr is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+# 
+# You should have received a copy of the GNU Affero General Public License
+# along with Findr.  If not, see <http://www.gnu.org/licenses/>.
+# 
+"""Input and output of data files.
+The binary interface of findr (findr-bin) reads and writes matrices as raw row-major binary files without headers,
+of ftype for expression levels and probabilities, and of gtype for genotypes. Here such files carry an optional sidecar
+metadata file (path+'.json') with shape and data type, so they can be loaded without specifying them.
+Files are memory-mapped by default, so moving data between findr-bin and the python interface involves no parsing or copying.
+.npy files are also supported. Gene name lists are text files with one name per line.
+For usage, see findr.io.load, findr.io.save, findr.io.create, findr.io.writeblocks, findr.io.loadinputs and findr.io.loadnames."""
+
+try: from exceptions import ValueError
+except ImportError: pass
+
+def sidecar(path):
+	"""Path of sidecar metadata file of raw binary file."""
+	return path+'.json'
+
+def _isnpy(path):
+	return path.endswith('.npy')
+
+def _writemeta(path,shape,dtype):
+	import json
+	import numpy as np
+	with open(sidecar(path),'w') as f:
+		json.dump({'shape':[int(x) for x in shape],'dtype':np.lib.format.dtype_to_descr(np.dtype(dtype))},f)
+
+def meta(path):
+	"""Reads shape and data type of data file from .npy header or sidecar metadata.
+	path:	Data file.
+	Return:	(shape,dtype), or None if raw binary file has no sidecar metadata."""
+	import os
+	import json
+	import numpy as np
+	if _isnpy(path):
+		with open(path,'rb') as f:
+			v=np.lib.format.read_magic(f)
+			h=np.lib.format.read_array_header_1_0 if v==(1,0) else np.lib.format.read_array_header_2_0
+			shape,_,dtype=h(f)
+		return (tuple(shape),np.dtype(dtype))
+	if not os.path.isfile(sidecar(path)):
+		return None
+	with open(sidecar(path),'r') as f:
+		m=json.load(f)
+	d=m['dtype']
+	d=np.dtype(str(d)) if not isinstance(d,list) else np.dtype([tuple(str(y) for y in x) for x in d])
+	return (tuple(m['shape']),d)
+
+def load(path,dtype=None,shape=None,mode='r'):
+	"""Loads data file in findr-bin's binary format or .npy format.
+	path:	Data file. Files ending with .npy are read as .npy files, and others as raw binary files.
+	dtype:	Data type of raw binary file, e.g. findr.auto.ftype_np or findr.auto.gtype_np. Default (None) reads from sidecar metadata.
+	shape:	Shape of raw binary file. One dimension can be -1 to infer from file size, e.g. (-1,ns).
+		Default (None) reads from sidecar metadata.
+	mode:	Memory map mode as in numpy.memmap: 'r' for read-only, 'r+' for read-write, 'c' for copy-on-write.
+		None reads the whole file into memory instead.
+	Return:	numpy.memmap, or numpy.ndarray if mode is None."""
+	import os
+	import numpy as np
+	if _isnpy(path):
+		return np.load(path,mmap_mode=mode)
+	m=meta(path)
+	if dtype is None or shape is None:
+		if m is None:
+			raise ValueError('Sidecar metadata not found. Please specify dtype and shape.')
+		dtype=m[1] if dtype is None else dtype
+		shape=m[0] if shape is None else shape
+	dtype=np.dtype(dtype)
+	shape=tuple(int(x) for x in shape)
+	n=os.path.getsize(path)//dtype.itemsize
+	if shape.count(-1)>1:
+		raise ValueError('Wrong shape')
+	if -1 in shape:
+		k=int(np.prod([x for x in shape if x!=-1]))
+		if k==0 or n%k!=0:
+			raise ValueError('File size does not match shape.')
+		shape=tuple(n//k if x==-1 else x for x in shape)
+	if int(np.prod(shape))*dtype.itemsize!=os.path.getsize(path):
+		raise ValueError('File size does not match shape.')
+	if mode is None:
+		return np.fromfile(path,dtype=dtype).reshape(shape)
+	if n==0:
+		return np.zeros(shape,dtype=dtype)
+	return np.memmap(path,dtype=dtype,mode=mode,shape=shape)
+
+def create(path,shape,dtype=None):
+	"""Creates data file to be written in place, e.g. in blocks.
+	path:	Data file. Files ending with .npy are created as .npy files, and others as raw binary files with sidecar metadata.
+	shape:	Shape of data.
+	dtype:	Data type. Default (None) indicates findr.auto.ftype_np.
+	Return:	numpy.memmap of the file in read-write mode."""
+	import numpy as np
+	from .auto import ftype_np
+	dtype=np.dtype(ftype_np if dtype is None else dtype)
+	shape=tuple(int(x) for x in shape)
+	if _isnpy(path):
+		return np.lib.format.open_memmap(path,mode='w+',dtype=dtype,shape=shape)
+	_writemeta(path,shape,dtype)
+	if int(np.prod(shape))==0:
+		open(path,'wb').close()
+		return np.zeros(shape,dtype=dtype)
+	return np.memmap(path,dtype=dtype,mode='w+',shape=shape)
+
+def save(path,d,dtype=None,nbyte=2**26):
+	"""Saves data in findr-bin's binary format with sidecar metadata, or .npy format.
+	path:	Data file. Files ending with .npy are saved as .npy files, and others as raw binary files.
+	d:	Data as numpy.ndarray, including memory maps.
+	dtype:	Data type to save as. Default (None) indicates the data type of d.
+	nbyte:	Approximate number of bytes written at a time, for conversion in bounded memory."""
+	import numpy as np
+	dtype=np.dtype(d.dtype if dtype is None else dtype)
+	n=max(1,nbyte//max(1,dtype.itemsize*int(np.prod(d.shape[1:])))) if len(d.shape)>0 else 1
+	if len(d.shape)==0 or d.dtype==dtype and d.flags['C_CONTIGUOUS'] and d.nbytes<=nbyte:
+		d=np.ascontiguousarray(d).astype(dtype,copy=False)
+		if _isnpy(path):
+			np.save(path,d)
+		else:
+			_writemeta(path,d.shape,dtype)
+			d.tofile(path)
+		return
+	if _isnpy(path):
+		with open(path,'wb') as f:
+			np.lib.format.write_array_header_1_0(f,{'descr':np.lib.format.dtype_to_descr(dtype),'fortran_order':False,'shape':d.shape})
+			for x in range(0,d.shape[0],n):
+				np.ascontiguousarray(d[x:x+n]).astype(dtype,copy=False).tofile(f)
+		return
+	_writemeta(path,d.shape,dtype)
+	with open(path,'wb') as f:
+		for x in range(0,d.shape[0],n):
+			np.ascontiguousarray(d[x:x+n]).astype(dtype,copy=False).tofile(f)
+
+def writeblocks(it,path,shape,key='p',dtype=None):
+	"""Writes output of pij functions in row blocks into data file, without holding the whole output in memory.
+	it:	Iterable of (start,stop,ans) as from findr.blocks.iterblocks, where ans is the output dictionary of rows [start,stop).
+	path:	Data file, as in findr.io.create.
+	shape:	Shape of the whole output, e.g. (nt,nt2).
+	key:	Output to write, e.g. 'p' or 'p2'.
+	dtype:	Data type. Default (None) indicates findr.auto.ftype_np.
+	Return:	0 iff all blocks succeeded, or the first nonzero return value otherwise."""
+	out=create(path,shape,dtype=dtype)
+	ret=0
+	for start,stop,ans in it:
+		if ret==0 and ans['ret']!=0:
+			ret=int(ans['ret'])
+		out[start:stop]=ans[key]
+	if hasattr(out,'flush'):
+		out.flush()
+	del out
+	return ret
+
+def loadinputs(paths,name,ns=None):
+	"""Loads input files of a findr function as memory maps, as in python -m findr.
+	paths:	List of input files, as .npy files or raw binary files with or without sidecar metadata.
+	name:	Name of function in findr.lib, to determine data types of raw binary files without sidecar metadata.
+		Genotype data (the first input of gassist functions) are of gtype and others of ftype.
+	ns:	Number of samples (columns) of raw binary files without sidecar metadata.
+	Return:	list of numpy.ndarray or numpy.memmap. ftype and gtype can be found in auto.py."""
+	from .auto import ftype_np,gtype_np
+	ans=[]
+	for i,p in enumerate(paths):
+		if p.endswith('.npy') or meta(p) is not None:
+			ans.append(load(p))
+		elif ns is None:
+			raise ValueError('ns is required for raw binary input without sidecar metadata: '+p)
+		else:
+			ans.append(load(p,dtype=gtype_np if 'gassist' in name and i==0 else ftype_np,shape=(-1,ns)))
+	return ans
+
+def loadnames(path,encoding='utf-8'):
+	"""Reads a list of names (e.g. of genes) from text file with one name per line.
+	path:	Text file.
+	encoding:	Text encoding.
+	Return:	List of names."""
+	with open(path,'rb') as f:
+		s=f.read()
+	return s.decode(encoding).splitlines()
+
+def savenames(path,names,encoding='utf-8'):
+	"""Writes a list of names (e.g. of genes) into text file with one name per line.
+	path:	Text file.
+	names:	List of names.
+	encoding:	Text encoding."""
+	with open(path,'wb') as f:
+		f.write(''.join(str(x)+'\n' for x in names).encode(encoding))
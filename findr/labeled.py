@@ -0,0 +1,164 @@
+# Copyright 2016-2018, 2020 Lingfei Wang
+# 
+# This file is part of Findr.
+# 
+# Findr is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# Findr is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+# 
+# You should have received a copy of the GNU Affero General Public License
+# along with Findr.  If not, see <http://www.gnu.org/licenses/>.
+# 
+"""Labeled data interface.
+Accepts pandas.DataFrame, pyarrow.Table and AnnData-style objects in place of numpy.ndarray,
+aligns samples by their labels, and returns outputs labeled with gene names.
+For usage, see findr.labeled.run."""
+
+try: from exceptions import ValueError
+except ImportError: pass
+
+def matrix(d,dtype):
+	"""Obtains numpy.ndarray and labels of labeled data. numpy.ndarray data are not copied when the dtype allows.
+	d:	Input data of one of the following types. Rows are genes (or anchors) and columns are samples, unless stated otherwise.
+		numpy.ndarray:	used as is without labels.
+		findr.plink.packedg:	used as is without labels, so genotypes stay packed until the function unpacks them.
+		pandas.DataFrame:	index and columns provide row and sample names respectively. DataFrames store each column
+			(sample) contiguously, so data are copied once here into the row-major layout required by the library.
+		pyarrow.Table:	each numeric column is a sample. The first string column, if present, provides row names.
+		AnnData-style object (with attributes X, obs_names and var_names):	X has samples as rows and genes as columns,
+			following AnnData convention, and is transposed.
+	dtype:	Output dtype. Conversion is skipped when the data already have this dtype.
+	Return:	(data,rows,cols)
+	data:	numpy.ndarray(nrow,ns,dtype=dtype).
+	rows:	list of row names or None if unavailable.
+	cols:	list of sample names or None if unavailable.
+	"""
+	import numpy as np
+	from .plink import packedg
+	if isinstance(d,np.ndarray):
+		return (d.astype(dtype,copy=False),None,None)
+	if isinstance(d,packedg):
+		return (d,None,None)
+	if hasattr(d,'X') and hasattr(d,'obs_names') and hasattr(d,'var_names'):
+		x=d.X
+		if hasattr(x,'toarray'):
+			x=x.toarray()
+		x=np.asarray(x).T.astype(dtype,copy=False)
+		return (x,list(d.var_names),list(d.obs_names))
+	if hasattr(d,'schema') and hasattr(d,'column_names') and hasattr(d,'num_rows'):
+		import pyarrow as pa
+		rows=None
+		cols=[]
+		for x in d.schema:
+			if pa.types.is_integer(x.type) or pa.types.is_floating(x.type):
+				cols.append(x.name)
+			elif rows is None and (pa.types.is_string(x.type) or pa.types.is_large_string(x.type)):
+				rows=[str(y) for y in d.column(x.name).to_pylist()]
+		ans=np.empty((d.num_rows,len(cols)),dtype=dtype)
+		for xi in range(len(cols)):
+			x=d.column(cols[xi])
+			if x.null_count>0:
+				raise ValueError('Null found in column '+cols[xi]+'.')
+			ans[:,xi]=x.to_numpy()
+		return (ans,rows,cols)
+	if hasattr(d,'to_numpy') and hasattr(d,'index') and hasattr(d,'columns'):
+		return (np.ascontiguousarray(d.to_numpy(dtype=dtype,copy=False)),list(d.index),list(d.columns))
+	raise ValueError('Unsupported input type: '+str(type(d)))
+
+def align(*ds):
+	"""Aligns samples of multiple labeled matrices with an inner join on sample names.
+	Samples are kept in the order of the first input with sample names. Unlabeled inputs must already be aligned.
+	When all labeled inputs share the same samples in the same order, data are not copied and unlabeled inputs are
+	kept as they are. Unlabeled inputs cannot be aligned with labeled inputs of different samples.
+	ds:	Outputs of findr.labeled.matrix as (data,rows,cols).
+	Return:	list of (data,rows,cols) with aligned samples.
+	"""
+	import numpy as np
+	names=[x[2] for x in ds if x[2] is not None]
+	if len(names)==0 or all(x==names[0] for x in names[1:]):
+		ns=set(x[0].shape[1] for x in ds)
+		if len(ns)>1:
+			raise ValueError('Wrong input shape')
+		return list(ds)
+	if any(x[2] is None for x in ds):
+		raise ValueError('Cannot align labeled with unlabeled samples.')
+	common=set(names[0])
+	for x in names[1:]:
+		common&=set(x)
+	common=[x for x in names[0] if x in common]
+	if len(common)==0:
+		raise ValueError('No common samples found.')
+	ans=[]
+	for x in ds:
+		if len(set(x[2]))!=len(x[2]):
+			raise ValueError('Duplicate sample names found.')
+		if x[2]==common:
+			ans.append(x)
+			continue
+		d=dict(zip(x[2],range(len(x[2]))))
+		ids=np.array([d[y] for y in common],dtype=int)
+		ans.append((np.take(x[0],ids,axis=1),x[1],common))
+	return ans
+
+def wrap(d,rows=None,cols=None):
+	"""Wraps numpy.ndarray output with labels without copying data.
+	d:	numpy.ndarray with 1 or 2 dimensions.
+	rows:	Row names or None.
+	cols:	Column names or None. Ignored for 1-dimensional data.
+	Return:	pandas.Series or pandas.DataFrame sharing memory with d. If pandas is unavailable, d is returned.
+	"""
+	try:
+		import pandas as pd
+	except ImportError:
+		return d
+	if len(d.shape)==1:
+		return pd.Series(d,index=rows,copy=False)
+	return pd.DataFrame(d,index=rows,columns=cols,copy=False)
+
+def run(self,name,*data,**ka):
+	"""Runs a function of findr.lib on labeled data and returns labeled outputs.
+	name:	Name of function in findr.lib, e.g. 'pij_gassist'.
+	data:	Input data in the same order as the function's positional arguments, in any type accepted by findr.labeled.matrix.
+		For pij functions, samples are aligned across all inputs by name with an inner join.
+		Rows of the anchor (dg or dc) and expression data of A (dt) are matched by position and are not aligned.
+		For netr_one_greedy, dp must have identical row and column names.
+	ka:	Keyword arguments passed to the function.
+	Return:	dictionary returned by the function, in which every matrix output is a pandas.DataFrame
+		with rows = regulators (A) and columns = targets (B), and every vector output is a pandas.Series
+		indexed by regulators. Outputs share memory with the function's own outputs.
+		If pandas is unavailable, outputs remain numpy.ndarray. Packed outputs of packed=True (see findr.sym)
+		remain numpy.ndarray, as they are not indexed by rows and columns.
+		Keys 'rows' and 'cols' provide the row and column names in either case.
+
+	Example: l.labeled('pij_rank',dfmi,dft) for pandas.DataFrame dfmi and dft.
+	"""
+	from .auto import ftype_np,gtype_np
+	import numpy as np
+	f=getattr(self,name)
+	if name=='netr_one_greedy':
+		if len(data)!=1:
+			raise ValueError('Wrong number of inputs')
+		d,rows,cols=matrix(data[0],ftype_np)
+		if rows!=cols:
+			raise ValueError('Prior must have identical row and column names.')
+		ans=f(d,**ka)
+	else:
+		dtypes=[ftype_np]*len(data)
+		if 'gassist' in name:
+			dtypes[0]=gtype_np
+		ds=align(*[matrix(data[x],dtypes[x]) for x in range(len(data))])
+		rows=ds[-2][1] if len(ds)>=2 else None
+		cols=ds[-1][1]
+		ans=f(*[x[0] for x in ds],**ka)
+	for k in list(ans):
+		if isinstance(ans[k],np.ndarray) and not ka.get('packed',False):
+			ans[k]=wrap(ans[k],rows,cols)
+	ans['rows']=rows
+	ans['cols']=cols
+	return ans
@@ -0,0 +1,453 @@
+# Copyright 2016-2018, 2020 Lingfei Wang
+# 
+# This file is part of Findr.
+# 
+# Findr is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# Findr is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+# 
+# You should have received a copy of the GNU Affero General Public License
+# along with Findr.  If not, see <http://www.gnu.org/licenses/>.
+# 
+"""Log likelihood ratios (LLRs) of findr's tests and their conversion into P-values and probabilities.
+LLRs can be stored (e.g. with return_llr=True of pij functions) and converted again with different
+histogram granularity or combination of tests, without recomputing them from data.
+For each pair (A,B), with E(A) as the anchor of A, LLRs are computed from
+linear models on standardized data:
+	rank:	A--B v.s. A  B.
+	test 1:	E(A)->A v.s. E(A)  A.
+	test 2:	E(A)->A--B with E(A)->B v.s. E(A)->A<-B.
+	test 3:	E(A)->A--B with E(A)->B v.s. E(A)->A->B.
+	test 4:	E(A)->A--B with E(A)->B v.s. E(A)->A  B.
+	test 5:	E(A)->A--B with E(A)->B v.s. B<-E(A)->A.
+Genotype anchors are modelled with one mean per genotype value, and continuous anchors linearly.
+Under the null hypothesis, exp(-2*LLR/ns) follows a Beta distribution, which gives P-values.
+Probabilities are converted from LLRs separately for each A, by comparing the histogram of LLRs for all B
+with the null distribution.
+Parameters of pij functions:
+	return_llr:	Whether to additionally return LLRs computed in python by findr.llr.compute. On the C engine,
+		they are recomputed by this python reimplementation after the library call, which about doubles the cost.
+		They can be converted again into outputs by findr.llr.convert, e.g. with different combinations of tests,
+		without rerunning inference. Probabilities from findr.llr.convert use its own histograms and null fraction estimator,
+		so they do not reproduce those of the library exactly.
+	nsample:	Number of targets (B) sampled to estimate null distributions for probability conversion, in approximate fast mode.
+		Only the NumPy engine (findr.lib(backend='numpy')) supports it, with sampling seeded by rs of findr.lib.
+		Default (None) indicates exact mode.
+For usage, see findr.llr.compute and findr.llr.convert."""
+
+try: from exceptions import ValueError
+except ImportError: pass
+
+#Per function: (family, output type)
+methods={
+	'pij_rank':('rank','p'),
+	'pij_rank_pv':('rank','pv'),
+	'pij_gassist':('gassist','p'),
+	'pij_gassist_trad':('gassist','trad'),
+	'pijs_gassist':('gassist','ps'),
+	'pijs_gassist_pv':('gassist','pv'),
+	'pij_cassist':('cassist','p'),
+	'pij_cassist_trad':('cassist','trad'),
+	'pijs_cassist':('cassist','ps'),
+	'pijs_cassist_pv':('cassist','pv'),
+	}
+
+def keys(name):
+	"""Output keys of LLRs of a function.
+	name:	Name of pij function in findr.lib.
+	Return:	(vector keys,matrix keys)"""
+	if methods[name][0]=='rank':
+		return ([],['llr'])
+	return (['llr1','nv'],['llr2','llr3','llr4','llr5'])
+
+def null(test,ns,nv=2):
+	"""Parameters of the null distribution of exp(-2*LLR/ns) as Beta(a,b).
+	test:	Test as one of 'rank',1,2,3,4,5.
+	ns:	Number of samples.
+	nv:	Number of parameters of the anchor model including intercept, i.e. number of genotype values present,
+		or 2 for continuous anchors. Can be numpy.ndarray.
+	Return:	(a,b)"""
+	import numpy as np
+	nv=np.asarray(nv,dtype=float)
+	if test=='rank':
+		return ((ns-2)/2.,0.5)
+	if test in [1,2]:
+		return ((ns-nv)/2.,(nv-1)/2.)
+	if test==3:
+		return ((ns-nv-1)/2.,(nv-1)/2.)
+	if test==4:
+		return ((ns-nv-1)/2.,nv/2.)
+	if test==5:
+		return ((ns-nv-1)/2.,0.5+0*nv)
+	raise ValueError('Unknown test: '+str(test))
+
+def _cdf(l,test,ns,nv):
+	"""Null cumulative distribution function of LLR, elementwise with broadcasting."""
+	import numpy as np
+	from .stats import betainc
+	a,b=null(test,ns,nv)
+	a,b,l=np.broadcast_arrays(a,b,np.asarray(l,dtype=float))
+	ans=np.ones(l.shape,dtype=float)
+	t=(a>0)&(b>0)
+	ans[t]=1-betainc(a[t],b[t],np.exp(-2*np.clip(l[t],0,None)/ns))
+	return ans
+
+def pv(l,test,ns,nv=2):
+	"""P-values of LLRs from their null distribution.
+	l:	LLRs as numpy.ndarray.
+	test,ns,nv:	See findr.llr.null. nv should broadcast with l, e.g. nv[:,None] for LLR matrices of tests 2-5.
+	Return:	numpy.ndarray of P-values in float64."""
+	return 1-_cdf(l,test,ns,nv)
+
+def _std(d):
+	"""Standardizes each row to zero mean and unit variance in float64. Constant rows become 0."""
+	import numpy as np
+	d=np.array(d,dtype=float)
+	d-=d.mean(axis=1,keepdims=True)
+	sd=np.sqrt((d**2).mean(axis=1))
+	t=sd>0
+	d[t]/=sd[t,None]
+	d[~t]=0
+	return d
+
+def _stdb(dt2):
+	"""Standardized targets, reusing those of findr.panel.panel."""
+	from .panel import panel
+	return dt2.std() if isinstance(dt2,panel) else _std(dt2)
+
+def _log(x):
+	import numpy as np
+	return np.log(np.clip(x,1E-300,None))
+
+def _llr(test,ns,sa,sb,rho,cross):
+	"""LLR of a test from unexplained variance of A by anchor (sa), of B by anchor (sb), correlation of A and B (rho),
+	and covariance of parts of A and B explained by anchor (cross), elementwise with broadcasting."""
+	import numpy as np
+	if test==1:
+		return -ns/2.*_log(sa)
+	if test==2:
+		return -ns/2.*_log(sb)
+	sba=sb-(rho-cross)**2/np.clip(sa,1E-300,None)
+	if test==3:
+		return -ns/2.*(_log(sba)-_log(1-rho**2))
+	if test==4:
+		return -ns/2.*_log(sba)
+	if test==5:
+		return -ns/2.*(_log(sba)-_log(sb))
+	raise ValueError('Unknown test: '+str(test))
+
+def _anchor(e,za,zb,continuous,nvx,withcross=True):
+	"""Projections of standardized A and B onto the anchor model space of each A, excluding intercept.
+	withcross:	Whether to compute cross. Otherwise it is returned as None.
+	Return:	(ra2,rb2,cross,nv) as variance of A explained by anchor, variance of B explained by anchor,
+		covariance of their explained parts, and number of parameters of anchor models."""
+	import numpy as np
+	ns=za.shape[1]
+	if continuous:
+		ze=_std(e)
+		ua=(ze*za).sum(axis=1)/np.sqrt(ns)
+		ub=np.dot(ze,zb.T)/np.sqrt(ns)
+		nv=np.where((ze!=0).any(axis=1),2.,1.)
+		return (ua**2/ns,ub**2/ns,ua[:,None]*ub/ns if withcross else None,nv)
+	ra2=np.zeros(za.shape[0])
+	rb2=np.zeros((za.shape[0],zb.shape[0]))
+	cross=np.zeros((za.shape[0],zb.shape[0])) if withcross else None
+	nv=np.zeros(za.shape[0])
+	for v in range(nvx):
+		x=(e==v).astype(float)
+		c=x.sum(axis=1)
+		t=c>0
+		if not t.any():
+			continue
+		nv+=t
+		w=np.where(t,1/np.sqrt(np.where(t,c,1)),0)
+		ua=(x*za).sum(axis=1)*w
+		ub=np.dot(x,zb.T)*w[:,None]
+		ra2+=ua**2
+		rb2+=ub**2
+		if withcross:
+			cross+=ua[:,None]*ub
+	return (ra2/ns,rb2/ns,cross/ns if withcross else None,nv)
+
+def compute(name,*data,**ka):
+	"""Computes LLRs of all tests used by a pij function, in blocks of rows.
+	name:	Name of pij function in findr.lib.
+	data:	Input data of the function, as (dt,dt2) for rank, (dg,dt,dt2) for gassist, or (dc,dt,dt2) for cassist functions.
+		dt2 can be findr.panel.panel to reuse its standardized targets.
+		Expression data are standardized internally and should otherwise be preprocessed (e.g. supernormalized) as for the function.
+	na:	Number of alleles for gassist functions. Default (None) indicates the maximum of dg.
+	nbyte:	Approximate memory usage in bytes of temporary matrices. Default: 2**26.
+	Return:	dictionary with following keys:
+	llr:	numpy.ndarray((nt,nt2),dtype=ftype(='=f4' by default)). LLRs of A--B, for rank functions only.
+	llr1:	numpy.ndarray(nt,dtype=ftype(='=f4' by default)). LLRs of test 1, for gassist and cassist functions.
+	llr2,llr3,llr4,llr5:	numpy.ndarray((nt,nt2),dtype=ftype(='=f4' by default)). LLRs of tests 2-5, for gassist and cassist functions.
+	nv:	numpy.ndarray(nt,dtype=ftype(='=f4' by default)). Number of parameters of each anchor model including intercept,
+		for gassist and cassist functions. See findr.llr.null.
+	ftype can be found in auto.py.
+	"""
+	import numpy as np
+	from .auto import ftype_np
+	if name not in methods:
+		raise ValueError('Unknown function: '+str(name))
+	family=methods[name][0]
+	na=ka.pop('na',None)
+	nbyte=ka.pop('nbyte',2**26)
+	if len(ka)>0:
+		raise ValueError('Unknown parameters: '+','.join(ka))
+	if len(data)!=(2 if family=='rank' else 3):
+		raise ValueError('Wrong number of inputs')
+	dt,dt2=data[-2:]
+	if len(dt.shape)!=2 or len(dt2.shape)!=2 or dt.shape[1]!=dt2.shape[1] or any(x.shape!=dt.shape for x in data[:-2]):
+		raise ValueError('Wrong input shape')
+	nt,ns=dt.shape
+	nt2=dt2.shape[0]
+	zb=_stdb(dt2)
+	nrow=max(1,nbyte//(8*max(nt2,1)*6))
+	vk,mk=keys(name)
+	ans=dict((k,np.zeros(nt,dtype=ftype_np)) for k in vk)
+	ans.update(dict((k,np.zeros((nt,nt2),dtype=ftype_np)) for k in mk))
+	if family=='gassist':
+		nvx=int(na)+1 if na is not None else int(np.asarray(data[0]).max())+1
+	for x in range(0,nt,nrow):
+		s=slice(x,min(x+nrow,nt))
+		za=_std(dt[s])
+		rho=np.dot(za,zb.T)/ns
+		if family=='rank':
+			ans['llr'][s]=-ns/2.*_log(1-rho**2)
+			continue
+		ra2,rb2,cross,nv=_anchor(np.asarray(data[0][s]),za,zb,family=='cassist',nvx if family=='gassist' else 0)
+		sa=1-ra2
+		sb=1-rb2
+		ans['nv'][s]=nv
+		ans['llr1'][s]=_llr(1,ns,sa,sb,rho,cross)
+		for i in range(2,6):
+			ans['llr'+str(i)][s]=_llr(i,ns,sa[:,None],sb,rho,cross)
+	for k in ans:
+		if k!='nv':
+			np.clip(ans[k],0,None,out=ans[k])
+	return ans
+
+def defaultnbin(nt2):
+	"""Default number of histogram bins for conversion into probabilities."""
+	return max(2,min(1000,int(nt2**0.5)))
+
+def _diag(nt,nt2,nodiag,rows=None):
+	"""Column of the diagonal entry (A=B) of each row, or -1 if none.
+	rows:	Indices of rows among all A, for a subset of rows. Default (None) indicates 0 to nt-1."""
+	import numpy as np
+	ans=np.full(nt,-1,dtype=int)
+	if nodiag:
+		r=np.arange(nt) if rows is None else np.asarray(rows,dtype=int)
+		t=r<nt2
+		ans[t]=r[t]
+	return ans
+
+def _lmax(l,dcol):
+	"""Maximum of LLRs excluding column dcol[i] of row i."""
+	import numpy as np
+	v=l.max(axis=1)
+	r=np.nonzero((dcol>=0)&(l.argmax(axis=1)==dcol))[0]
+	for i in r:
+		v[i]=max(l[i,:dcol[i]].max(initial=0),l[i,dcol[i]+1:].max(initial=0))
+	return float(v.max()) if len(v)>0 else 0.
+
+def _curve(sub,valid,test,ns,nv,nbin,lmax):
+	"""Probabilities of the alternative hypothesis for each histogram bin of each row.
+	sub:	numpy.ndarray((nt,n)) LLRs to build histograms from, where valid is True.
+	Return:	(edges,palt) as bin edges and numpy.ndarray((nt,nbin)) of probabilities."""
+	import numpy as np
+	nt=sub.shape[0]
+	lmax=max(float(lmax),1E-6)
+	edges=np.linspace(0,lmax,nbin+1)
+	idx=np.clip(np.searchsorted(edges,sub,side='right')-1,0,nbin-1)
+	rows=np.broadcast_to(np.arange(nt)[:,None],sub.shape)
+	h=np.bincount((rows*nbin+idx)[valid],minlength=nt*nbin).reshape(nt,nbin).astype(float)
+	cnt=h.sum(axis=1)
+	#Null CDF at bin edges, with the last bin open-ended
+	nv=np.broadcast_to(np.asarray(nv,dtype=float),(nt,))
+	f0=np.ones((nt,nbin+1))
+	f0[:,0]=0
+	u,ids=np.unique(nv,return_inverse=True)
+	for i in range(len(u)):
+		f0[ids==i,1:-1]=_cdf(edges[1:-1],test,ns,u[i])
+	e0=cnt[:,None]*np.diff(f0,axis=1)
+	low=f0[:,1:]<=0.5
+	low[:,0]=True
+	pi0=np.clip((h*low).sum(axis=1)/np.clip((e0*low).sum(axis=1),1E-300,None),0,1)
+	palt=np.where(h>0,1-pi0[:,None]*e0/np.where(h>0,h,1),-np.inf)
+	#Empty bins, e.g. between or above sampled targets in approximate mode, take the nearest nonempty bin above,
+	#and bins above the largest LLR are in the tail where null density vanishes.
+	nxt=np.minimum.accumulate(np.where(h>0,np.arange(nbin)[None,:],nbin)[:,::-1],axis=1)[:,::-1]
+	palt=np.take_along_axis(np.concatenate([palt,np.where(cnt>0,1.,-np.inf)[:,None]],axis=1),nxt,axis=1)
+	palt=np.clip(np.maximum.accumulate(palt,axis=1),0,1)
+	return (edges,palt)
+
+def _apply(l,rows,edges,palt):
+	"""Looks up probabilities of LLRs l in rows of histogram curves."""
+	import numpy as np
+	from .auto import ftype_np
+	idx=np.clip(np.searchsorted(edges,l,side='right')-1,0,len(edges)-2)
+	return palt[rows,idx].astype(ftype_np)
+
+def _prob(l,test,ns,nv,dcol,nbin,lmax,cols):
+	"""Converts LLRs into probabilities with histograms of sampled columns cols (or all if None),
+	excluding column dcol[i] of row i."""
+	import numpy as np
+	nt,nt2=l.shape
+	sub=l if cols is None else l[:,cols]
+	valid=np.ones(sub.shape,dtype=bool)
+	r=np.nonzero(dcol>=0)[0]
+	if cols is None:
+		valid[r,dcol[r]]=False
+	elif len(cols)>0:
+		pos=np.searchsorted(cols,dcol[r])
+		t=pos<len(cols)
+		t[t]=cols[pos[t]]==dcol[r[t]]
+		valid[r[t],pos[t]]=False
+	if lmax is None:
+		lmax=_lmax(l,dcol)
+	edges,palt=_curve(sub,valid,test,ns,nv,nbin,lmax)
+	return _apply(l,np.arange(nt)[:,None],edges,palt)
+
+def _random(seed):
+	import numpy as np
+	return seed if isinstance(seed,np.random.RandomState) else np.random.RandomState(seed)
+
+def _sample(nt2,nsample,seed):
+	"""Sorted column indices of sampled targets, or None for all."""
+	import numpy as np
+	if nsample is None or nsample>=nt2:
+		return None
+	if nsample<=0:
+		raise ValueError('Wrong nsample')
+	return np.sort(_random(seed).choice(nt2,int(nsample),replace=False))
+
+def prob(l,test,ns,nv=2,nodiag=False,nbin=None,lmax=None,nsample=None,seed=None):
+	"""Converts LLRs into probabilities of the alternative hypothesis separately for each A (row).
+	For each row, LLRs are binned into a histogram and compared with the null distribution. The null fraction is
+	estimated from the lower half of the null distribution. Probabilities are made non-decreasing in LLR.
+	l:	numpy.ndarray((nt,nt2)) LLRs.
+	test,ns:	See findr.llr.null.
+	nv:	numpy.ndarray(nt) or number. See findr.llr.null.
+	nodiag:	Whether to exclude diagonal entries (A=B) from histograms.
+	nbin:	Number of histogram bins. Default (None) indicates findr.llr.defaultnbin(nt2), or of nsample in approximate mode.
+	lmax:	Upper bound of histograms. Default (None) indicates the maximum of l, excluding diagonal entries for nodiag.
+		Set it to the maximum over all rows when converting in blocks, for identical outputs.
+	nsample:	Number of targets (B, columns) to sample for histograms in approximate mode. The same targets are sampled for all rows.
+		All entries are then converted from these histograms. Default (None) uses all targets.
+	seed:	Random seed or numpy.random.RandomState for sampling.
+	Return:	numpy.ndarray((nt,nt2),dtype=ftype(='=f4' by default)) of probabilities.
+	"""
+	import numpy as np
+	from .auto import ftype_np
+	l=np.asarray(l)
+	if len(l.shape)!=2:
+		raise ValueError('Wrong input shape')
+	nt,nt2=l.shape
+	if nt==0 or nt2==0:
+		return np.zeros(l.shape,dtype=ftype_np)
+	cols=_sample(nt2,nsample,seed)
+	nbin=defaultnbin(nt2 if cols is None else len(cols)) if nbin is None else int(nbin)
+	if nbin<=0:
+		raise ValueError('Wrong nbin')
+	return _prob(l,test,ns,nv,_diag(nt,nt2,nodiag),nbin,lmax,cols)
+
+#Tests converted into probabilities for each output type
+_tests={'p':[2,4,5],'trad':[2,3],'ps':[2,3,4,5]}
+
+def _convert(name,d,ns,dcol,nbin,lmax,cols):
+	import numpy as np
+	from .auto import ftype_np
+	family,kind=methods[name]
+	def lm(k):
+		return lmax.get(k) if isinstance(lmax,dict) else lmax
+	if family=='rank':
+		if kind=='pv':
+			return {'ret':0,'p':pv(d['llr'],'rank',ns).astype(ftype_np)}
+		return {'ret':0,'p':_prob(d['llr'],'rank',ns,2,dcol,nbin,lm('llr'),cols)}
+	nv=np.asarray(d['nv'],dtype=float)
+	if kind=='pv':
+		ans={'ret':0,'p1':pv(d['llr1'],1,ns,nv).astype(ftype_np)}
+		for i in range(2,6):
+			ans['p'+str(i)]=pv(d['llr'+str(i)],i,ns,nv[:,None]).astype(ftype_np)
+		return ans
+	p=dict(('p'+str(i),_prob(d['llr'+str(i)],i,ns,nv,dcol,nbin,lm('llr'+str(i)),cols)) for i in _tests[kind])
+	if 'p3' in p:
+		p['p3']=1-p['p3']
+	if kind=='p':
+		return {'ret':0,'p':((p['p2']*p['p5']+p['p4'])/2).astype(ftype_np)}
+	if kind=='trad':
+		return {'ret':0,'p':(p['p2']*p['p3']).astype(ftype_np)}
+	p1=np.ones(nv.shape[0],dtype=ftype_np)
+	r=np.nonzero(dcol>=0)[0]
+	p1[r]=p['p2'][r,dcol[r]]
+	p['p1']=p1
+	p['ret']=0
+	return p
+
+def convert(name,d,ns,nodiag=False,nbin=None,lmax=None,nsample=None,seed=None,nerror=10,rows=None):
+	"""Converts stored LLRs into outputs of a pij function, without recomputing LLRs.
+	name:	Name of pij function in findr.lib, whose outputs are produced. Functions of the same family share LLRs,
+		so e.g. LLRs from pijs_gassist can be converted into outputs of pij_gassist, pij_gassist_trad or pijs_gassist_pv.
+	d:	dictionary of LLRs, as from findr.llr.compute or pij functions with return_llr=True.
+	ns:	Number of samples.
+	nodiag:	Whether A=B for diagonal entries. See findr.llr.prob.
+	nbin:	Number of histogram bins. See findr.llr.prob. In approximate mode, default (None) indicates findr.llr.defaultnbin(nsample).
+	lmax:	Upper bound of histograms, as a number or dictionary from LLR key to number. See findr.llr.prob.
+	nsample:	Number of sampled targets for approximate mode. See findr.llr.prob. Default (None) indicates exact mode.
+	seed:	Random seed or numpy.random.RandomState for sampling targets and rows to check.
+	nerror:	Number of randomly chosen rows to convert also in exact mode, to report the error of approximate mode.
+	rows:	Indices of rows of d among all A, to locate diagonal entries for nodiag when converting a subset of rows,
+		e.g. a row block. For outputs identical to converting all rows together, set lmax to the maximum LLRs of all rows,
+		excluding diagonal entries with nodiag.
+		Default (None) indicates all rows.
+	Return:	dictionary with following keys, as output of the function:
+	ret:	0.
+	p:	numpy.ndarray((nt,nt2),dtype=ftype(='=f4' by default)). Probability or P-value, for functions with a single output.
+		Recommended combination is (p2*p5+p4)/2, and traditional combination is p2*p3.
+	p1,p2,p3,p4,p5:	Probabilities or P-values of each test, for pijs functions.
+		Probability p3 is of the null hypothesis, as the latter one is preferred in test 3.
+	error:	Only in approximate mode. Mean absolute difference of outputs from exact mode in checked rows.
+	errormax:	Only in approximate mode. Maximum absolute difference of outputs from exact mode in checked rows.
+	ftype can be found in auto.py.
+	"""
+	import numpy as np
+	if name not in methods:
+		raise ValueError('Unknown function: '+str(name))
+	family,kind=methods[name]
+	vk,mk=keys(name)
+	nt,nt2=d[mk[0]].shape
+	if nbin is not None and nbin<=0:
+		raise ValueError('Wrong nbin')
+	dcol=_diag(nt,nt2,nodiag,rows)
+	if kind=='pv' or nt==0 or nt2==0:
+		nsample=None
+	rs=_random(seed)
+	cols=_sample(nt2,nsample,rs)
+	#Exact mode bins, and default bins for the sample size in approximate mode
+	nbin0=defaultnbin(nt2) if nbin is None else int(nbin)
+	if cols is None:
+		return _convert(name,d,ns,dcol,nbin0,lmax,None)
+	nbin=defaultnbin(len(cols)) if nbin is None else int(nbin)
+	#Histogram bounds from all targets as in exact mode, shared with exact conversion of checked rows
+	ks=['llr'] if family=='rank' else ['llr'+str(i) for i in _tests[kind]]
+	lmax=dict((k,lmax.get(k) if isinstance(lmax,dict) else lmax) for k in ks)
+	for k in ks:
+		if lmax[k] is None:
+			lmax[k]=_lmax(d[k],dcol)
+	ans=_convert(name,d,ns,dcol,nbin,lmax,cols)
+	rows=np.sort(rs.choice(nt,min(nt,int(nerror)),replace=False))
+	ans['error']=ans['errormax']=0.
+	if len(rows)>0:
+		d0=dict((k,d[k][rows]) for k in vk+mk)
+		a0=_convert(name,d0,ns,dcol[rows],nbin0,lmax,None)
+		v=np.concatenate([np.abs(a0[k]-ans[k][rows]).ravel() for k in a0 if k!='ret'])
+		ans['error']=float(v.mean())
+		ans['errormax']=float(v.max())
+	return ans
@@ -17,6 +17,9 @@
 # 
 """Python interface"""
 
+try: from exceptions import ValueError
+except ImportError: pass
+
 def one_greedy(self,dp,namax=None,nimax=None,nomax=None,autotype=True):
 	"""Reconstructs a directed acyclic graph according to prior information of edge significance.
 	This function first ranks all edges and introduce the most significant one by one, avoiding
@@ -26,6 +29,10 @@ def one_greedy(self,dp,namax=None,nimax=None,nomax=None,autotype=True):
 		Prior information of edge significance levels. Entry dp[i,j] is significance of edge i to j. 
 		A larger values indicates the edge's presence is more probable.
 		One option to obtain the prior information is to use pairwise inference methods in findr.
+		Reduced precision priors of findr.quant (e.g. uint8) are accepted and converted with autotype.
+		Only the order of significance matters, so they need not be dequantized. The library requires ftype, so this
+		creates a temporary ftype copy of the whole prior. findr.netr.greedy (lib.netr_one_greedy_parallel) and the NumPy
+		engine rank reduced precision priors as they are, without the copy.
 	dt2:numpy.ndarray(nt2,ns,dtype=ftype(='=f4' by default)) Gene expression data for B.
 		dt2 has the same format as dt, and can be identical with, different from, or a superset of dt.
 		When dt2 is a superset of (or identical with) dt, dt2 must be arranged
@@ -38,22 +45,20 @@ def one_greedy(self,dp,namax=None,nimax=None,nomax=None,autotype=True):
 		network.
 	autotype:	Whether to automatically convert input data types to meet requirement.
 	Return:	dictionary with following keys:
-	ret:0 iff execution succeeded.
+	ret:	True iff execution succeeded.
 	net:	numpy.ndarray((nt,nt),dtype=bool). The reconstructed direct acyclic graph or network
 		net[i,j]=True if an edge from i to j exists in the reconstructed network, and False otherwise.
 	ftype and gtype can be found in auto.py.
 	
 	Example: see findr.examples.geuvadis7
 	"""
-	try: from exceptions import ValueError
-	except ImportError: pass
 	if self.lib is None:
 		raise ValueError("Not initialized.")
 	import numpy as np
 	from .auto import ftype_np
 	from .types import isint
 	if autotype:
-		dp=dp.astype(ftype_np)
+		dp=dp.astype(ftype_np,copy=False)
 		if namax is not None:
 			namax=int(namax)
 		if nimax is not None:
@@ -90,9 +95,397 @@ def one_greedy(self,dp,namax=None,nimax=None,nomax=None,autotype=True):
 		raise ValueError('NaN found.')
 	func=self.cfunc('netr_one_greedy',rettype='size_t',argtypes=['const MATRIXF*','MATRIXUC*','size_t','size_t','size_t'])
 	d=np.require(np.zeros((nt,nt),dtype='u1'),requirements=['A','C','O','W'])
-	dpr=np.require(dp,requirements=['A','C','O','W'])
+	dpr=np.require(dp,requirements=['A','C'])
 	ret=func(dpr,d,namax,nimax,nomax)
 	d=d.astype(bool)
 	ret=(ret==0)
 	ans={'ret':ret,'net':d}
 	return ans
+
+def _children(net):
+	"""Children of each node in compressed sparse row format, as (indptr,indices)."""
+	import numpy as np
+	r,c=np.nonzero(net)
+	return (np.searchsorted(r,np.arange(net.shape[0]+1)),c)
+
+def _check(net):
+	import numpy as np
+	net=np.asarray(net)
+	if len(net.shape)!=2 or net.shape[0]!=net.shape[1]:
+		raise ValueError('Wrong input shape')
+	return net
+
+def toposort(net):
+	"""Topological order of a directed acyclic graph, such as from netr_one_greedy.
+	net:	numpy.ndarray((nt,nt),dtype=bool). net[i,j]=True if an edge from i to j exists.
+	Return:	numpy.ndarray(nt,dtype=int) of nodes, where every edge goes from an earlier node to a later one.
+		Nodes are processed in layers of nodes whose parents are all in earlier layers.
+	Raises ValueError if the graph has cycles."""
+	import numpy as np
+	net=_check(net)
+	nt=net.shape[0]
+	indptr,c=_children(net)
+	nin=np.bincount(c,minlength=nt)
+	f=np.nonzero(nin==0)[0]
+	ans=[]
+	while len(f)>0:
+		ans.append(f)
+		ch=np.concatenate([c[indptr[i]:indptr[i+1]] for i in f]) if len(c)>0 else c
+		nin-=np.bincount(ch,minlength=nt)
+		t=np.unique(ch)
+		f=t[nin[t]==0]
+	ans=np.concatenate(ans) if len(ans)>0 else np.zeros(0,dtype=int)
+	if len(ans)<nt:
+		raise ValueError('Network has cycles.')
+	return ans
+
+def reach(net,reverse=False,order=None):
+	"""Reachability of all nodes of a directed acyclic graph, as packed bitsets.
+	Descendants of each node are the union of its children and their descendants, computed in reverse topological order
+	with vectorized bitwise OR of rows.
+	net:	numpy.ndarray((nt,nt),dtype=bool). net[i,j]=True if an edge from i to j exists.
+	reverse:	Whether to compute ancestors instead of descendants.
+	order:	Topological order from findr.netr.toposort of net. Default (None) computes it.
+	Return:	numpy.ndarray((nt,(nt+7)//8),dtype='u1') of bitsets from numpy.packbits, where bit j of row i is set
+		iff j is a descendant (or ancestor if reverse) of i, excluding i itself. Use findr.netr.members to unpack a row."""
+	import numpy as np
+	net=_check(net)
+	nt=net.shape[0]
+	if order is None:
+		order=toposort(net)
+	if reverse:
+		net=net.T
+	else:
+		order=order[::-1]
+	indptr,c=_children(net)
+	nb=(nt+7)//8
+	ans=np.zeros((nt,nb),dtype='u1')
+	bit=(np.uint8(128)>>(np.arange(nt)%8).astype('u1')).astype('u1')
+	byte=np.arange(nt)//8
+	for i in order:
+		ch=c[indptr[i]:indptr[i+1]]
+		if len(ch)==0:
+			continue
+		v=np.bitwise_or.reduce(ans[ch],axis=0)
+		np.bitwise_or.at(v,byte[ch],bit[ch])
+		ans[i]=v
+	return ans
+
+def members(bits,i,nt):
+	"""Members of a bitset from findr.netr.reach, e.g. descendants or ancestors of node i.
+	bits:	Bitsets from findr.netr.reach.
+	i:	Node.
+	nt:	Number of nodes.
+	Return:	numpy.ndarray of nodes in increasing order."""
+	import numpy as np
+	return np.nonzero(np.unpackbits(bits[i])[:nt])[0]
+
+def counts(bits,nbyte=2**26):
+	"""Sizes of bitsets from findr.netr.reach, e.g. number of downstream targets of each node.
+	bits:	Bitsets from findr.netr.reach.
+	nbyte:	Approximate memory usage in bytes of temporary matrices.
+	Return:	numpy.ndarray(nt,dtype=int)."""
+	import numpy as np
+	table=np.array([bin(x).count('1') for x in range(256)],dtype=np.int64)
+	ans=np.zeros(bits.shape[0],dtype=np.int64)
+	n=max(1,nbyte//max(1,8*bits.shape[1]))
+	for x in range(0,bits.shape[0],n):
+		ans[x:x+n]=table[bits[x:x+n]].sum(axis=1)
+	return ans
+
+def reduction(net,bits=None,order=None,nbyte=2**26):
+	"""Transitive reduction of a directed acyclic graph.
+	An edge i->j is removed iff j is also a descendant of another child of i.
+	net:	numpy.ndarray((nt,nt),dtype=bool). net[i,j]=True if an edge from i to j exists.
+	bits:	Descendants of net from findr.netr.reach. Default (None) computes them.
+	order:	Topological order from findr.netr.toposort of net. Default (None) computes it if needed.
+	nbyte:	Approximate memory usage in bytes of temporary matrices.
+	Return:	numpy.ndarray((nt,nt),dtype=bool) of the transitive reduction."""
+	import numpy as np
+	net=_check(net)
+	nt=net.shape[0]
+	if bits is None:
+		bits=reach(net,order=order)
+	r,c=np.nonzero(net)
+	ans=np.zeros(net.shape,dtype=bool)
+	indptr=np.searchsorted(r,np.arange(nt+1))
+	n=max(1,nbyte//max(1,bits.shape[1]))
+	x=0
+	while x<nt:
+		#Rows whose edges fit in memory, with at least one row
+		y=max(x+1,int(np.searchsorted(indptr,indptr[x]+n,side='right'))-1)
+		rr=r[indptr[x]:indptr[y]]
+		cc=c[indptr[x]:indptr[y]]
+		x=y
+		if len(rr)==0:
+			continue
+		#Union of descendants of all children of each node
+		t=np.r_[True,rr[1:]!=rr[:-1]]
+		g=np.bitwise_or.reduceat(bits[cc],np.nonzero(t)[0],axis=0)
+		gi=np.cumsum(t)-1
+		keep=((g[gi,cc//8]>>(7-cc%8).astype('u1'))&1)==0
+		ans[rr[keep],cc[keep]]=True
+	return ans
+
+def _merge(a,b,ka,kb):
+	"""Merges two sorted runs of indices a and b with sort keys ka and kb, where all of a precede b in ties."""
+	import numpy as np
+	n=len(a)+len(b)
+	ans=np.empty(n,dtype=a.dtype)
+	key=np.empty(n,dtype=ka.dtype)
+	pa=np.arange(len(a))+np.searchsorted(kb,ka,side='left')
+	pb=np.arange(len(b))+np.searchsorted(ka,kb,side='right')
+	ans[pa]=a
+	ans[pb]=b
+	key[pa]=ka
+	key[pb]=kb
+	return (ans,key)
+
+def argsort(key,nth=0):
+	"""Stable argsort of a 1-dimensional array in parallel threads, by sorting chunks and merging them pairwise.
+	key:	numpy.ndarray to sort.
+	nth:	Number of parallel threads. Default (0) indicates to use the number of cores.
+	Return:	numpy.ndarray of indices, identical to numpy.argsort(key,kind='stable')."""
+	import numpy as np
+	from concurrent.futures import ThreadPoolExecutor
+	from .util import nthread
+	nth=nthread(nth)
+	n=len(key)
+	if nth==1 or n<2**16:
+		return np.argsort(key,kind='stable')
+	b=[n*x//nth for x in range(nth+1)]
+	def one(x):
+		i=np.argsort(key[b[x]:b[x+1]],kind='stable')
+		return (i+b[x],key[b[x]:b[x+1]][i])
+	with ThreadPoolExecutor(max_workers=nth) as e:
+		runs=list(e.map(one,range(nth)))
+		while len(runs)>1:
+			m=list(e.map(lambda x:_merge(runs[x][0],runs[x+1][0],runs[x][1],runs[x+1][1]),range(0,len(runs)-1,2)))
+			if len(runs)%2==1:
+				m.append(runs[-1])
+			runs=m
+	return runs[0][0]
+
+def greedy(dp,namax=None,nimax=None,nomax=None,nth=0,nbatch=4096):
+	"""Parallel greedy reconstruction of a directed acyclic graph, with output identical to sequential greedy reconstruction.
+	Edges are ranked by decreasing significance, with ties in row-major order, and introduced one by one unless they would
+	create a loop or exceed a constraint. Candidates are sorted in parallel threads, and processed in batches in the ranked order.
+	Each batch is first checked against the network at the start of the batch in a vectorized manner, which rejects most
+	candidates, because reachability and numbers of edges only grow. Candidates that are already implied by reachability and
+	independent of earlier candidates in the batch are then introduced together. Remaining candidates are resolved in ranked order
+	against reachability updated by each introduced edge, with bitset updates of ancestors split across threads.
+	dp:	numpy.ndarray((nt,nt)) of edge significance, as in netr_one_greedy, including reduced precision formats of findr.quant.
+	namax,nimax,nomax:	Constraints as in netr_one_greedy. Default (None) indicates no constraint.
+	nth:	Number of parallel threads. Default (0) indicates to use the number of cores.
+	nbatch:	Number of ranked candidates per batch.
+	Return:	dictionary with following keys:
+	ret:	0 iff execution succeeded.
+	net:	numpy.ndarray((nt,nt),dtype=bool). The reconstructed directed acyclic graph, as in netr_one_greedy.
+	"""
+	import numpy as np
+	order=ranked(dp,nth=nth)
+	_params(namax,nimax,nomax,nbatch)
+	return {'ret':0,'net':_greedy(order,np.shape(dp)[0],namax,nimax,nomax,nth,nbatch)[0]}
+
+def _params(namax,nimax,nomax,nbatch):
+	for v,k in [(namax,'namax'),(nimax,'nimax'),(nomax,'nomax')]:
+		if v is not None and int(v)<=0:
+			raise ValueError('Input requires '+k+'>0.')
+	if nbatch<=0:
+		raise ValueError('Wrong nbatch')
+
+def ranked(dp,nth=0):
+	"""Ranks candidate edges by decreasing significance, with ties in row-major order, using a parallel stable argsort.
+	dp:	numpy.ndarray((nt,nt)) of edge significance, as in netr_one_greedy, including reduced precision formats of findr.quant.
+	nth:	Number of parallel threads. Default (0) indicates to use the number of cores.
+	Return:	numpy.ndarray(nt*(nt-1),dtype=int) of flattened indices (i*nt+j) of edges i to j in ranked order, excluding self loops."""
+	import numpy as np
+	from .auto import ftype_np
+	from .quant import formats
+	dp=np.asarray(dp)
+	if dp.dtype.str[1:] not in formats:
+		dp=dp.astype(ftype_np,copy=False)
+	if len(dp.shape)!=2 or dp.shape[0]!=dp.shape[1] or dp.shape[0]==0:
+		raise ValueError('Wrong input shape')
+	if np.isnan(dp).sum()>0:
+		raise ValueError('NaN found.')
+	nt=dp.shape[0]
+	v=np.ascontiguousarray(dp).ravel()
+	order=argsort(~v if v.dtype.kind=='u' else -v,nth=nth)
+	return order[order%(nt+1)!=0]
+
+def _greedy(order,nt,namax,nimax,nomax,nth,nbatch):
+	"""Greedy reconstruction from ranked candidates of findr.netr.ranked. See findr.netr.greedy.
+	Return:	(net,pos) as the network and positions in order of introduced edges, in increasing order."""
+	import numpy as np
+	from concurrent.futures import ThreadPoolExecutor
+	from .util import nthread
+	nth=nthread(nth)
+	namax=nt*(nt-1) if namax is None else int(namax)
+	nimax=nt if nimax is None else int(nimax)
+	nomax=nt if nomax is None else int(nomax)
+	net=np.zeros((nt,nt),dtype=bool)
+	#bits[i]: descendants of i as packed bitset, excluding i
+	bits=np.zeros((nt,(nt+7)//8),dtype='u1')
+	mask=(np.uint8(128)>>(np.arange(nt)%8).astype('u1')).astype('u1')
+	byte=np.arange(nt)//8
+	nin=np.zeros(nt,dtype=int)
+	nout=np.zeros(nt,dtype=int)
+	n=0
+	pos=[]
+	e=ThreadPoolExecutor(max_workers=nth) if nth>1 else None
+	def update(rows,j):
+		bits[rows]|=bits[j]
+		bits[rows,byte[j]]|=mask[j]
+	try:
+		for x in range(0,len(order),nbatch):
+			if n>=namax:
+				break
+			b=order[x:x+nbatch]
+			i,j=b//nt,b%nt
+			#Rejections at the start of the batch are final
+			t=((bits[j,byte[i]]&mask[i])==0)&(nin[j]<nimax)&(nout[i]<nomax)
+			i,j,p=i[t],j[t],np.nonzero(t)[0]
+			if len(i)==0:
+				continue
+			ci=np.bincount(j,minlength=nt)
+			co=np.bincount(i,minlength=nt)
+			if n+len(i)<namax and (nin+ci).max()<=nimax and (nout+co).max()<=nomax:
+				#Constraints cannot reject any candidate. Candidates already implied by reachability, whose targets do not reach
+				#the source of any earlier candidate, are introduced together, as they neither change nor depend on reachability.
+				m=np.arange(len(i))
+				tails=np.zeros((len(i),bits.shape[1]),dtype='u1')
+				tails[m,byte[i]]=mask[i]
+				tails=np.bitwise_or.accumulate(tails,axis=0)
+				r=bits[j]
+				r[m,byte[j]]|=mask[j]
+				safe=np.ones(len(i),dtype=bool)
+				safe[1:]=~(r[1:]&tails[:-1]).any(axis=1)
+				t=safe&((bits[i,byte[j]]&mask[j])!=0)
+				net[i[t],j[t]]=True
+				pos.append(x+p[t])
+				nin+=np.bincount(j[t],minlength=nt)
+				nout+=np.bincount(i[t],minlength=nt)
+				n+=int(t.sum())
+				i,j,p=i[~t],j[~t],p[~t]
+			for i0,j0,p0 in zip(i.tolist(),j.tolist(),p.tolist()):
+				if bits[j0,byte[i0]]&mask[i0] or nin[j0]>=nimax or nout[i0]>=nomax:
+					continue
+				net[i0,j0]=True
+				pos.append([x+p0])
+				nin[j0]+=1
+				nout[i0]+=1
+				n+=1
+				if n>=namax:
+					break
+				if bits[i0,byte[j0]]&mask[j0]:
+					continue
+				#Ancestors of i0 and itself gain j0 and its descendants
+				rows=np.nonzero(bits[:,byte[i0]]&mask[i0])[0]
+				rows=np.r_[rows,i0]
+				if e is None or len(rows)*bits.shape[1]<2**20:
+					update(rows,j0)
+				else:
+					list(e.map(lambda r:update(r,j0),np.array_split(rows,nth)))
+	finally:
+		if e is not None:
+			e.shutdown()
+	pos=np.sort(np.concatenate(pos)) if len(pos)>0 else np.zeros(0,dtype=int)
+	return (net,pos)
+
+def record(dp,namax=None,nimax=None,nomax=None,nth=0,nbatch=4096,order=None):
+	"""Records the order in which greedy reconstruction introduces edges, so that networks of any namax can be obtained
+	afterwards with findr.netr.prefix, without ranking or reconstructing again. Greedy reconstruction with constraint namax
+	introduces exactly the first namax edges of that without, because namax only stops the reconstruction.
+	dp:	numpy.ndarray((nt,nt)) of edge significance, as in findr.netr.greedy.
+	namax:	Maximum number of edges to record. Default (None) indicates no limit.
+	nimax,nomax:	Constraints as in netr_one_greedy. Default (None) indicates no constraint.
+	nth:	Number of parallel threads. Default (0) indicates to use the number of cores.
+	nbatch:	Number of ranked candidates per batch. See findr.netr.greedy.
+	order:	Output of findr.netr.ranked for dp, to share ranking among records. Default (None) ranks dp.
+	Return:	dictionary with following keys:
+	ret:	0 iff execution succeeded.
+	row,col:	numpy.ndarray(n,dtype=int). Sources and targets of introduced edges, in order of introduction.
+	rank:	numpy.ndarray(n,dtype=int). Rank of each introduced edge among all candidate edges excluding self loops, starting from 0.
+	nt:	Number of nodes.
+
+	Example: r=findr.netr.record(dp,nimax=20); [findr.netr.prefix(r,x)['net'] for x in [1000,2000,5000]]
+	"""
+	import numpy as np
+	nt=np.shape(dp)[0]
+	if order is None:
+		order=ranked(dp,nth=nth)
+	elif len(np.shape(dp))!=2 or len(order)!=nt*(nt-1):
+		raise ValueError('Wrong input shape')
+	_params(namax,nimax,nomax,nbatch)
+	pos=_greedy(order,nt,namax,nimax,nomax,nth,nbatch)[1]
+	e=order[pos]
+	return {'ret':0,'row':e//nt,'col':e%nt,'rank':pos,'nt':nt}
+
+def prefix(rec,namax=None):
+	"""Network of greedy reconstruction with constraint namax, from the record of findr.netr.record, in O(namax) time apart from
+	allocating the output. Constraints nimax and nomax are those of the record.
+	rec:	Output of findr.netr.record.
+	namax:	Constraint on the maximum total number of edges. Default (None) indicates all recorded edges.
+		It should not exceed namax of the record.
+	Return:	dictionary with following keys:
+	ret:	0 iff execution succeeded.
+	net:	numpy.ndarray((nt,nt),dtype=bool). The reconstructed directed acyclic graph, as in netr_one_greedy.
+	"""
+	import numpy as np
+	n=len(rec['row']) if namax is None else int(namax)
+	if n<=0:
+		raise ValueError('Input requires namax>0.')
+	net=np.zeros((rec['nt'],rec['nt']),dtype=bool)
+	net[rec['row'][:n],rec['col'][:n]]=True
+	return {'ret':0,'net':net}
+
+def sweep(dp,namax=None,nimax=None,nomax=None,nth=0,nbatch=4096):
+	"""Greedy reconstruction for every combination of lists of constraints, ranking edges only once.
+	Each distinct pair of nimax and nomax takes one reconstruction up to the largest namax,
+	from which networks of all namax values are obtained as prefixes of its record.
+	dp:	numpy.ndarray((nt,nt)) of edge significance, as in findr.netr.greedy.
+	namax,nimax,nomax:	Constraint, or list of constraints, as in netr_one_greedy. None indicates no constraint.
+	nth:	Number of parallel threads. Default (0) indicates to use the number of cores.
+	nbatch:	Number of ranked candidates per batch. See findr.netr.greedy.
+	Return:	dictionary with following keys:
+	ret:	0 iff execution succeeded.
+	params:	List of (namax,nimax,nomax) for each network, with nimax and nomax outermost.
+	net:	List of numpy.ndarray((nt,nt),dtype=bool) as reconstructed networks for params.
+	"""
+	import numpy as np
+	def aslist(v):
+		return [None] if v is None else [(None if x is None else int(x)) for x in np.ravel(np.asarray(v,dtype=object))]
+	namax,nimax,nomax=[aslist(x) for x in [namax,nimax,nomax]]
+	if any(len(x)==0 for x in [namax,nimax,nomax]):
+		raise ValueError('Wrong input parameter')
+	for x in namax:
+		_params(x,None,None,nbatch)
+	top=None if None in namax else max(namax)
+	order=ranked(dp,nth=nth)
+	ans={'ret':0,'params':[],'net':[]}
+	for xi in nimax:
+		for xo in nomax:
+			r=record(dp,namax=top,nimax=xi,nomax=xo,nth=nth,nbatch=nbatch,order=order)
+			for xa in namax:
+				ans['params'].append((xa,xi,xo))
+				ans['net'].append(prefix(r,None if xa is None else min(xa,len(r['row'])))['net'] if len(r['row'])>0 else
+					np.zeros((r['nt'],r['nt']),dtype=bool))
+	return ans
+
+def one_greedy_parallel(self,dp,namax=None,nimax=None,nomax=None,nbatch=4096):
+	"""Reconstructs a directed acyclic graph as netr_one_greedy, in parallel threads with findr.netr.greedy.
+	Outputs are identical to sequential greedy reconstruction with ties in row-major order, as in the NumPy engine
+	of netr_one_greedy (findr.backend), and to netr_one_greedy of the library in the absence of ties.
+	Threads are limited by nth of findr.lib. For parameters and outputs, see netr_one_greedy and findr.netr.greedy."""
+	return greedy(dp,namax=namax,nimax=nimax,nomax=nomax,nth=getattr(self,'nth',0),nbatch=nbatch)
+
+def one_greedy_sweep(self,dp,namax=None,nimax=None,nomax=None,nbatch=4096):
+	"""Reconstructs directed acyclic graphs as netr_one_greedy for lists of constraints, with findr.netr.sweep.
+	Edges are ranked only once, and each distinct pair of nimax and nomax is reconstructed only once for all namax values,
+	so a sweep over namax costs about one reconstruction. Threads are limited by nth of findr.lib.
+	For parameters and outputs, see findr.netr.sweep.
+
+	Example: a=l.netr_one_greedy_sweep(dp,namax=[1000,2000,5000],nimax=[10,20])
+	"""
+	return sweep(dp,namax=namax,nimax=nimax,nomax=nomax,nth=getattr(self,'nth',0),nbatch=nbatch)
@@ -0,0 +1,71 @@
+# Copyright 2016-2018, 2020 Lingfei Wang
+# 
+# This file is part of Findr.
+# 
+# Findr is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# Findr is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+# 
+# You should have received a copy of the GNU Affero General Public License
+# along with Findr.  If not, see <http://www.gnu.org/licenses/>.
+# 
+"""Target panels (dt2) prepared once for repeated queries with changing regulators (dt, dg or dc).
+A panel holds dt2 converted to ftype in aligned C-contiguous memory, checked for NaNs, and made read-only so its
+cached per-target statistics remain valid. Pij functions, findr.llr and findr.cascade accept a panel in place of dt2,
+and then skip conversion and NaN checks of dt2 and reuse standardized targets, so the python overhead of each query
+only depends on the number of regulators.
+For usage, see findr.panel.panel."""
+
+try: from exceptions import ValueError
+except ImportError: pass
+
+class panel:
+	"""Target panel prepared from dt2 for repeated queries.
+
+	Example: p=findr.panel.panel(dt2); a=l.pij_gassist(dg[:10],dt[:10],p)
+	"""
+	def __init__(self,dt2):
+		"""Prepares target panel.
+		dt2:	numpy.ndarray(nt2,ns) Gene expression data for B. Any float type is converted to ftype once."""
+		import numpy as np
+		from .auto import ftype_np
+		d=np.require(np.asarray(dt2).astype(ftype_np,copy=False),requirements=['A','C'])
+		if len(d.shape)!=2:
+			raise ValueError('Wrong input shape')
+		if np.isnan(d).any():
+			raise ValueError('NaN found.')
+		if d is dt2 or d.base is not None:
+			d=d.copy()
+		d.flags.writeable=False
+		self.data=d
+		self.shape=d.shape
+		self.dtype=d.dtype
+		self._std=None
+	def __len__(self):
+		return self.shape[0]
+	def __array__(self,dtype=None,copy=None):
+		return self.data if dtype is None else self.data.astype(dtype)
+	def __getitem__(self,k):
+		return self.data[k]
+	def std(self):
+		"""Targets standardized to zero mean and unit variance per row in float64, computed once. See findr.llr.compute."""
+		if self._std is None:
+			from .llr import _std
+			z=_std(self.data)
+			z.flags.writeable=False
+			self._std=z
+		return self._std
+
+def unwrap(dt2):
+	"""Separates target panel from its data.
+	dt2:	dt2 as numpy.ndarray or findr.panel.panel.
+	Return:	(data,panel) where panel is None if dt2 is not a panel."""
+	if isinstance(dt2,panel):
+		return (dt2.data,dt2)
+	return (dt2,None)
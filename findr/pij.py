@@ -20,7 +20,7 @@
 try: from exceptions import ValueError
 except ImportError: pass
 
-def gassists_pv(self,dg,dt,dt2,na=None,memlimit=-1,autotype=True):
+def gassists_pv(self,dg,dt,dt2,na=None,memlimit=-1,autotype=True,return_llr=False):
 	"""Calculates p-values of gene i regulating gene j with genotype data assisted method with multiple tests.
 	dg:	numpy.ndarray(nt,ns,dtype=gtype(='u1' by default)) Genotype data.
 		Entry dg[i,j] is genotype i's value for sample j.
@@ -30,11 +30,13 @@ def gassists_pv(self,dg,dt,dt2,na=None,memlimit=-1,autotype=True):
 		Entry dt[i,j] is gene i's expression level for sample j.
 		Genotype i (in dg) must be best (and significant) eQTL of gene i.
 	dt2:numpy.ndarray(nt2,ns,dtype=ftype(='=f4' by default)) Gene expression data for B.
+		Can also be findr.panel.panel of dt2, prepared once for repeated queries.
 		dt2 has the same format as dt, and can be identical with, different from, or a superset of dt.
 	na:	Number of alleles the species have. It determintes the maximum number of values each genotype can take. When unspecified, it is automatically
 		determined as the maximum of dg.
 	memlimit:	The approximate memory usage limit in bytes for the library.  For datasets require a larger memory, calculation will be split into smaller chunks. If the memory limit is smaller than minimum required, calculation can fail with an error message. memlimit=0 defaults to unlimited memory usage.
 	autotype:	Whether to automatically convert input data types to meet requirement.
+	return_llr:	Whether to additionally return log likelihood ratios from findr.llr.compute. See findr.llr.
 	Return:	dictionary with following keys:
 	ret:0 iff execution succeeded.
 	p1:	numpy.ndarray(nt,dtype=ftype(='f4' by default)). P-values for LLR of test 1.
@@ -48,6 +50,8 @@ def gassists_pv(self,dg,dt,dt2,na=None,memlimit=-1,autotype=True):
 	p5:	numpy.ndarray((nt,nt2),dtype=ftype(='f4' by default)). P-values for LLR of test 5.
 		Test 5 calculates E(A)->A--B with E(A)->B v.s. B<-E(A)->A.
 	For more information on tests, see paper.
+	llr1,llr2,llr3,llr4,llr5,nv:	Log likelihood ratios of tests and numbers of anchor model parameters, only with return_llr=True.
+		See findr.llr.compute.
 	ftype and gtype can be found in auto.py.
 	
 	Example: see findr.examples.geuvadis6
@@ -55,12 +59,14 @@ def gassists_pv(self,dg,dt,dt2,na=None,memlimit=-1,autotype=True):
 	if self.lib is None:
 		raise ValueError("Not initialized.")
 	import numpy as np
+	from .panel import unwrap
+	dt2,pnl=unwrap(dt2)
 	from .auto import ftype_np,gtype_np
 	from .types import isint
 	if autotype:
-		dg=dg.astype(gtype_np)
-		dt=dt.astype(ftype_np)
-		dt2=dt2.astype(ftype_np)
+		dg=dg.astype(gtype_np,copy=False)
+		dt=dt.astype(ftype_np,copy=False)
+		dt2=dt2.astype(ftype_np,copy=False)
 		if memlimit is not None:
 			memlimit=int(memlimit)
 		if na is not None:
@@ -86,13 +92,13 @@ def gassists_pv(self,dg,dt,dt2,na=None,memlimit=-1,autotype=True):
 		raise ValueError('Invalid genotype values')
 	if dt.shape!=dg.shape or dt2.shape[1]!=ns:
 		raise ValueError('Wrong input shape')
-	if np.isnan(dt).sum()+np.isnan(dt2).sum()>0:
+	if np.isnan(dt).sum()+(np.isnan(dt2).sum() if pnl is None else 0)>0:
 		raise ValueError('NaN found.')
 	
 	arglist=['const MATRIXG*','const MATRIXF*','const MATRIXF*','VECTORF*','MATRIXF*','MATRIXF*','MATRIXF*','MATRIXF*','size_t','size_t']
-	dgr=np.require(dg,requirements=['A','C','O','W'])
-	dtr=np.require(dt,requirements=['A','C','O','W'])
-	dt2r=np.require(dt2,requirements=['A','C','O','W'])
+	dgr=np.require(dg,requirements=['A','C'])
+	dtr=np.require(dt,requirements=['A','C'])
+	dt2r=np.require(dt2,requirements=['A','C'])
 	d1=np.require(np.zeros(ng,dtype=dt.dtype),requirements=['A','C','O','W'])
 	d2=np.require(np.zeros((ng,nt),dtype=dt.dtype),requirements=['A','C','O','W'])
 	d3=np.require(np.zeros((ng,nt),dtype=dt.dtype),requirements=['A','C','O','W'])
@@ -102,9 +108,12 @@ def gassists_pv(self,dg,dt,dt2,na=None,memlimit=-1,autotype=True):
 	func=self.cfunc('pijs_gassist_pv',rettype='int',argtypes=arglist)
 	ret=func(*args)
 	ans={'ret':ret,'p1':d1,'p2':d2,'p3':d3,'p4':d4,'p5':d5}
+	if return_llr:
+		from .llr import compute
+		ans.update(compute('pijs_gassist_pv',dgr,dtr,dt2r if pnl is None else pnl,na=nvx-1))
 	return ans
 
-def gassists(self,dg,dt,dt2,na=None,nodiag=False,memlimit=-1,autotype=True):
+def gassists(self,dg,dt,dt2,na=None,nodiag=False,memlimit=-1,autotype=True,return_llr=False,nsample=None):
 	"""Calculates probability of gene i regulating gene j with genotype data assisted method,
 	with multiple tests, by converting log likelihoods into probabilities per A for all B.
 	Probabilities are converted from likelihood ratios separately for each A. This gives better
@@ -117,6 +126,7 @@ def gassists(self,dg,dt,dt2,na=None,nodiag=False,memlimit=-1,autotype=True):
 		Entry dt[i,j] is gene i's expression level for sample j.
 		Genotype i (in dg) must be best (and significant) eQTL of gene i.
 	dt2:numpy.ndarray(nt2,ns,dtype=ftype(='=f4' by default)) Gene expression data for B.
+		Can also be findr.panel.panel of dt2, prepared once for repeated queries.
 		dt2 has the same format as dt, and can be identical with, different from, or a superset of dt.
 		When dt2 is a superset of (or identical with) dt, dt2 must be arranged
 		to be identical with dt at its upper submatrix, i.e. dt2[:nt,:]=dt, and
@@ -127,6 +137,8 @@ def gassists(self,dg,dt,dt2,na=None,nodiag=False,memlimit=-1,autotype=True):
 		This should be set to True when A is a subset of B and aligned correspondingly.
 	memlimit:	The approximate memory usage limit in bytes for the library.  For datasets require a larger memory, calculation will be split into smaller chunks. If the memory limit is smaller than minimum required, calculation can fail with an error message. memlimit=0 defaults to unlimited memory usage.
 	autotype:	Whether to automatically convert input data types to meet requirement.
+	return_llr:	Whether to additionally return log likelihood ratios from findr.llr.compute. See findr.llr.
+	nsample:	Number of sampled targets (B) for approximate probability conversion, NumPy engine only. See findr.llr.
 	Return:	dictionary with following keys:
 	ret:0 iff execution succeeded.
 	p1:	numpy.ndarray(nt,dtype=ftype(='=f4' by default)). Probability for test 1.
@@ -143,19 +155,26 @@ def gassists(self,dg,dt,dt2,na=None,nodiag=False,memlimit=-1,autotype=True):
 	p5:	numpy.ndarray((nt,nt2),dtype=ftype(='=f4' by default)). Probability for test 5.
 		Test 5 calculates E(A)->A--B with E(A)->B v.s. B<-E(A)->A. The earlier one is preferred.
 	For more information on tests, see paper.
+	error,errormax:	Mean and maximum absolute differences from exact mode in a few checked rows, only with nsample set.
+	llr1,llr2,llr3,llr4,llr5,nv:	Log likelihood ratios of tests and numbers of anchor model parameters, only with return_llr=True.
+		See findr.llr.compute.
 	ftype and gtype can be found in auto.py.
 	
 	Example: see findr.examples.geuvadis4
 	"""
+	if nsample is not None:
+		raise ValueError("nsample is only supported by the NumPy engine. Use findr.lib(backend='numpy').")
 	if self.lib is None:
 		raise ValueError("Not initialized.")
 	import numpy as np
+	from .panel import unwrap
+	dt2,pnl=unwrap(dt2)
 	from .auto import ftype_np,gtype_np
 	from .types import isint
 	if autotype:
-		dg=dg.astype(gtype_np)
-		dt=dt.astype(ftype_np)
-		dt2=dt2.astype(ftype_np)
+		dg=dg.astype(gtype_np,copy=False)
+		dt=dt.astype(ftype_np,copy=False)
+		dt2=dt2.astype(ftype_np,copy=False)
 		nodiag=bool(nodiag)
 		if memlimit is not None:
 			memlimit=int(memlimit)
@@ -185,13 +204,13 @@ def gassists(self,dg,dt,dt2,na=None,nodiag=False,memlimit=-1,autotype=True):
 		raise ValueError('Invalid genotype values')
 	if dt.shape!=dg.shape or dt2.shape[1]!=ns:
 		raise ValueError('Wrong input shape')
-	if np.isnan(dt).sum()+np.isnan(dt2).sum()>0:
+	if np.isnan(dt).sum()+(np.isnan(dt2).sum() if pnl is None else 0)>0:
 		raise ValueError('NaN found.')
 	
 	arglist=['const MATRIXG*','const MATRIXF*','const MATRIXF*','VECTORF*','MATRIXF*','MATRIXF*','MATRIXF*','MATRIXF*','size_t','byte','size_t']
-	dgr=np.require(dg,requirements=['A','C','O','W'])
-	dtr=np.require(dt,requirements=['A','C','O','W'])
-	dt2r=np.require(dt2,requirements=['A','C','O','W'])
+	dgr=np.require(dg,requirements=['A','C'])
+	dtr=np.require(dt,requirements=['A','C'])
+	dt2r=np.require(dt2,requirements=['A','C'])
 	d1=np.require(np.zeros(ng,dtype=dt.dtype),requirements=['A','C','O','W'])
 	d2=np.require(np.zeros((ng,nt),dtype=dt.dtype),requirements=['A','C','O','W'])
 	d3=np.require(np.zeros((ng,nt),dtype=dt.dtype),requirements=['A','C','O','W'])
@@ -201,9 +220,12 @@ def gassists(self,dg,dt,dt2,na=None,nodiag=False,memlimit=-1,autotype=True):
 	func=self.cfunc("pijs_gassist",rettype='int',argtypes=arglist)
 	ret=func(*args)
 	ans={'ret':ret,'p1':d1,'p2':d2,'p3':d3,'p4':d4,'p5':d5}
+	if return_llr:
+		from .llr import compute
+		ans.update(compute('pijs_gassist',dgr,dtr,dt2r if pnl is None else pnl,na=nvx-1))
 	return ans
 
-def _gassist_any(self,dg,dt,dt2,name,na=None,nodiag=False,memlimit=-1,autotype=True):
+def _gassist_any(self,dg,dt,dt2,name,na=None,nodiag=False,memlimit=-1,autotype=True,return_llr=False,nsample=None):
 	"""Calculates probability of gene i regulating gene j with genotype data assisted method,
 	with the recommended combination of multiple tests.
 	dg:	numpy.ndarray(nt,ns,dtype=gtype(='u1' by default)) Genotype data.
@@ -214,6 +236,7 @@ def _gassist_any(self,dg,dt,dt2,name,na=None,nodiag=False,memlimit=-1,autotype=T
 		Entry dt[i,j] is gene i's expression level for sample j.
 		Genotype i (in dg) must be best (and significant) eQTL of gene i.
 	dt2:numpy.ndarray(nt2,ns,dtype=ftype(='=f4' by default)) Gene expression data for B.
+		Can also be findr.panel.panel of dt2, prepared once for repeated queries.
 		dt2 has the same format as dt, and can be identical with, different from, or a superset of dt.
 		When dt2 is a superset of (or identical with) dt, dt2 must be arranged
 		to be identical with dt at its upper submatrix, i.e. dt2[:nt,:]=dt, and
@@ -225,22 +248,31 @@ def _gassist_any(self,dg,dt,dt2,name,na=None,nodiag=False,memlimit=-1,autotype=T
 		This should be set to True when A is a subset of B and aligned correspondingly.
 	memlimit:	The approximate memory usage limit in bytes for the library.  For datasets require a larger memory, calculation will be split into smaller chunks. If the memory limit is smaller than minimum required, calculation can fail with an error message. memlimit=0 defaults to unlimited memory usage.
 	autotype:	Whether to automatically convert input data types to meet requirement.
+	return_llr:	Whether to additionally return log likelihood ratios from findr.llr.compute. See findr.llr.
+	nsample:	Number of sampled targets (B) for approximate probability conversion, NumPy engine only. See findr.llr.
 	Return:	dictionary with following keys:
 	ret:0 iff execution succeeded.
 	p:	numpy.ndarray((nt,nt2),dtype=ftype(='=f4' by default)).
 		Probability function from for recommended combination of multiple tests.
 	For more information on tests, see paper.
+	error,errormax:	Mean and maximum absolute differences from exact mode in a few checked rows, only with nsample set.
+	llr1,llr2,llr3,llr4,llr5,nv:	Log likelihood ratios of tests and numbers of anchor model parameters, only with return_llr=True.
+		See findr.llr.compute.
 	ftype and gtype can be found in auto.py.
 	"""
+	if nsample is not None:
+		raise ValueError("nsample is only supported by the NumPy engine. Use findr.lib(backend='numpy').")
 	if self.lib is None:
 		raise ValueError("Not initialized.")
 	import numpy as np
+	from .panel import unwrap
+	dt2,pnl=unwrap(dt2)
 	from .auto import ftype_np,gtype_np
 	from .types import isint
 	if autotype:
-		dg=dg.astype(gtype_np)
-		dt=dt.astype(ftype_np)
-		dt2=dt2.astype(ftype_np)
+		dg=dg.astype(gtype_np,copy=False)
+		dt=dt.astype(ftype_np,copy=False)
+		dt2=dt2.astype(ftype_np,copy=False)
 		nodiag=bool(nodiag)
 		if memlimit is not None:
 			memlimit=int(memlimit)
@@ -270,16 +302,19 @@ def _gassist_any(self,dg,dt,dt2,name,na=None,nodiag=False,memlimit=-1,autotype=T
 		raise ValueError('Invalid genotype values')
 	if dt.shape!=dg.shape or dt2.shape[1]!=ns:
 		raise ValueError('Wrong input shape')
-	if np.isnan(dt).sum()+np.isnan(dt2).sum()>0:
+	if np.isnan(dt).sum()+(np.isnan(dt2).sum() if pnl is None else 0)>0:
 		raise ValueError('NaN found.')
 
 	func=self.cfunc(name,rettype='int',argtypes=['const MATRIXG*','const MATRIXF*','const MATRIXF*','MATRIXF*','size_t','byte','size_t'])
 	d=np.require(np.zeros((ng,nt),dtype=dt.dtype),requirements=['A','C','O','W'])
-	dgr=np.require(dg,requirements=['A','C','O','W'])
-	dtr=np.require(dt,requirements=['A','C','O','W'])
-	dt2r=np.require(dt2,requirements=['A','C','O','W'])
+	dgr=np.require(dg,requirements=['A','C'])
+	dtr=np.require(dt,requirements=['A','C'])
+	dt2r=np.require(dt2,requirements=['A','C'])
 	ret=func(dgr,dtr,dt2r,d,nvx,nd,memlimit)
 	ans={'ret':ret,'p':d}
+	if return_llr:
+		from .llr import compute
+		ans.update(compute(name,dgr,dtr,dt2r if pnl is None else pnl,na=nvx-1))
 	return ans
 
 def gassist(self,dg,dt,dt2,na=None,nodiag=False,memlimit=-1,**ka):
@@ -295,6 +330,7 @@ def gassist(self,dg,dt,dt2,na=None,nodiag=False,memlimit=-1,**ka):
 		Entry dt[i,j] is gene i's expression level for sample j.
 		Genotype i (in dg) must be best (and significant) eQTL of gene i.
 	dt2:numpy.ndarray(nt2,ns,dtype=ftype(='=f4' by default)) Gene expression data for B.
+		Can also be findr.panel.panel of dt2, prepared once for repeated queries.
 		dt2 has the same format as dt, and can be identical with, different from, or a superset of dt.
 		When dt2 is a superset of (or identical with) dt, dt2 must be arranged
 		to be identical with dt at its upper submatrix, i.e. dt2[:nt,:]=dt, and
@@ -305,11 +341,16 @@ def gassist(self,dg,dt,dt2,na=None,nodiag=False,memlimit=-1,**ka):
 		This should be set to True when A is a subset of B and aligned correspondingly.
 	memlimit:	The approximate memory usage limit in bytes for the library.  For datasets require a larger memory, calculation will be split into smaller chunks. If the memory limit is smaller than minimum required, calculation can fail with an error message. memlimit=0 defaults to unlimited memory usage.
 	autotype:	Whether to automatically convert input data types to meet requirement.
+	return_llr:	Whether to additionally return log likelihood ratios from findr.llr.compute. See findr.llr.
+	nsample:	Number of sampled targets (B) for approximate probability conversion, NumPy engine only. See findr.llr.
 	Return:	dictionary with following keys:
 	ret:0 iff execution succeeded.
 	p:	numpy.ndarray((nt,nt2),dtype=ftype(='=f4' by default)).
 		Probability function from for recommended combination of multiple tests.
 	For more information on tests, see paper.
+	error,errormax:	Mean and maximum absolute differences from exact mode in a few checked rows, only with nsample set.
+	llr1,llr2,llr3,llr4,llr5,nv:	Log likelihood ratios of tests and numbers of anchor model parameters, only with return_llr=True.
+		See findr.llr.compute.
 	ftype and gtype can be found in auto.py.
 	
 	Example: see findr.examples.geuvadis2, findr.examples.geuvadis3
@@ -327,6 +368,7 @@ def gassist_trad(self,dg,dt,dt2,na=None,nodiag=False,memlimit=-1,**ka):
 		Entry dt[i,j] is gene i's expression level for sample j.
 		Genotype i (in dg) must be best (and significant) eQTL of gene i.
 	dt2:numpy.ndarray(nt2,ns,dtype=ftype(='=f4' by default)) Gene expression data for B.
+		Can also be findr.panel.panel of dt2, prepared once for repeated queries.
 		dt2 has the same format as dt, and can be identical with, different from, or a superset of dt.
 		When dt2 is a superset of (or identical with) dt, dt2 must be arranged
 		to be identical with dt at its upper submatrix, i.e. dt2[:nt,:]=dt, and
@@ -337,18 +379,23 @@ def gassist_trad(self,dg,dt,dt2,na=None,nodiag=False,memlimit=-1,**ka):
 		This should be set to True when A is a subset of B and aligned correspondingly.
 	memlimit:	The approximate memory usage limit in bytes for the library.  For datasets require a larger memory, calculation will be split into smaller chunks. If the memory limit is smaller than minimum required, calculation can fail with an error message. memlimit=0 defaults to unlimited memory usage.
 	autotype:	Whether to automatically convert input data types to meet requirement.
+	return_llr:	Whether to additionally return log likelihood ratios from findr.llr.compute. See findr.llr.
+	nsample:	Number of sampled targets (B) for approximate probability conversion, NumPy engine only. See findr.llr.
 	Return:	dictionary with following keys:
 	ret:0 iff execution succeeded.
 	p:	numpy.ndarray((nt,nt2),dtype=ftype(='=f4' by default)).
 		Probability function from for recommended combination of multiple tests.
 	For more information on tests, see paper.
+	error,errormax:	Mean and maximum absolute differences from exact mode in a few checked rows, only with nsample set.
+	llr1,llr2,llr3,llr4,llr5,nv:	Log likelihood ratios of tests and numbers of anchor model parameters, only with return_llr=True.
+		See findr.llr.compute.
 	ftype and gtype can be found in auto.py.
 	
 	Example: see findr.examples.geuvadis2, findr.examples.geuvadis3 (same format)
 	"""
 	return _gassist_any(self,dg,dt,dt2,"pij_gassist_trad",na=na,nodiag=nodiag,memlimit=memlimit,**ka)
 
-def cassists_pv(self,dc,dt,dt2,memlimit=-1,autotype=True):
+def cassists_pv(self,dc,dt,dt2,memlimit=-1,autotype=True,return_llr=False):
 	"""Calculates p-values of gene i regulating gene j with continuous anchor data assisted method with multiple tests.
 	dc:	numpy.ndarray(nt,ns,dtype=ftype(='f4' by default)) Continuous anchor data.
 		Entry dc[i,j] is anchor i's value for sample j.
@@ -356,9 +403,11 @@ def cassists_pv(self,dc,dt,dt2,memlimit=-1,autotype=True):
 	dt:	numpy.ndarray(nt,ns,dtype=ftype(='=f4' by default)) Gene expression data for A
 		Entry dt[i,j] is gene i's expression level for sample j.
 	dt2:numpy.ndarray(nt2,ns,dtype=ftype(='=f4' by default)) Gene expression data for B.
+		Can also be findr.panel.panel of dt2, prepared once for repeated queries.
 		dt2 has the same format as dt, and can be identical with, different from, or a superset of dt.
 	memlimit:	The approximate memory usage limit in bytes for the library. If the memory limit is smaller than minimum required, calculation can fail with an error message. memlimit=0 defaults to unlimited memory usage.
 	autotype:	Whether to automatically convert input data types to meet requirement.
+	return_llr:	Whether to additionally return log likelihood ratios from findr.llr.compute. See findr.llr.
 	Return:	dictionary with following keys:
 	ret:0 iff execution succeeded.
 	p1:	numpy.ndarray(nt,dtype=ftype(='f4' by default)). P-values for LLR of test 1.
@@ -372,6 +421,8 @@ def cassists_pv(self,dc,dt,dt2,memlimit=-1,autotype=True):
 	p5:	numpy.ndarray((nt,nt2),dtype=ftype(='f4' by default)). P-values for LLR of test 5.
 		Test 5 calculates E(A)->A--B with E(A)->B v.s. B<-E(A)->A.
 	For more information on tests, see paper.
+	llr1,llr2,llr3,llr4,llr5,nv:	Log likelihood ratios of tests and numbers of anchor model parameters, only with return_llr=True.
+		See findr.llr.compute.
 	ftype can be found in auto.py.
 	
 	Example: see findr.examples.geuvadis6 (similar format)
@@ -379,12 +430,14 @@ def cassists_pv(self,dc,dt,dt2,memlimit=-1,autotype=True):
 	if self.lib is None:
 		raise ValueError("Not initialized.")
 	import numpy as np
+	from .panel import unwrap
+	dt2,pnl=unwrap(dt2)
 	from .auto import ftype_np
 	from .types import isint
 	if autotype:
-		dc=dc.astype(ftype_np)
-		dt=dt.astype(ftype_np)
-		dt2=dt2.astype(ftype_np)
+		dc=dc.astype(ftype_np,copy=False)
+		dt=dt.astype(ftype_np,copy=False)
+		dt2=dt2.astype(ftype_np,copy=False)
 		if memlimit is not None:
 			memlimit=int(memlimit)
 	if dc.dtype.char!=ftype_np or dt.dtype.char!=ftype_np or dt2.dtype.char!=ftype_np:
@@ -399,14 +452,14 @@ def cassists_pv(self,dc,dt,dt2,memlimit=-1,autotype=True):
 	
 	if dt.shape!=dc.shape or dt2.shape[1]!=ns:
 		raise ValueError('Wrong input shape')
-	if np.isnan(dc).sum()+np.isnan(dt).sum()+np.isnan(dt2).sum()>0:
+	if np.isnan(dc).sum()+np.isnan(dt).sum()+(np.isnan(dt2).sum() if pnl is None else 0)>0:
 		raise ValueError('NaN found.')
 	
 	arglist=['const MATRIXF*','const MATRIXF*','const MATRIXF*','VECTORF*','MATRIXF*','MATRIXF*','MATRIXF*','MATRIXF*','size_t']
 
-	dcr=np.require(dc,requirements=['A','C','O','W'])
-	dtr=np.require(dt,requirements=['A','C','O','W'])
-	dt2r=np.require(dt2,requirements=['A','C','O','W'])
+	dcr=np.require(dc,requirements=['A','C'])
+	dtr=np.require(dt,requirements=['A','C'])
+	dt2r=np.require(dt2,requirements=['A','C'])
 	d1=np.require(np.zeros(ng,dtype=dt.dtype),requirements=['A','C','O','W'])
 	d2=np.require(np.zeros((ng,nt),dtype=dt.dtype),requirements=['A','C','O','W'])
 	d3=np.require(np.zeros((ng,nt),dtype=dt.dtype),requirements=['A','C','O','W'])
@@ -416,9 +469,12 @@ def cassists_pv(self,dc,dt,dt2,memlimit=-1,autotype=True):
 	func=self.cfunc('pijs_cassist_pv',rettype='int',argtypes=arglist)
 	ret=func(*args)
 	ans={'ret':ret,'p1':d1,'p2':d2,'p3':d3,'p4':d4,'p5':d5}
+	if return_llr:
+		from .llr import compute
+		ans.update(compute('pijs_cassist_pv',dcr,dtr,dt2r if pnl is None else pnl))
 	return ans
 	
-def _cassists_any(self,dc,dt,dt2,name,nodiag=False,memlimit=-1,autotype=True):
+def _cassists_any(self,dc,dt,dt2,name,nodiag=False,memlimit=-1,autotype=True,return_llr=False,nsample=None):
 	"""Calculates probability of gene i regulating gene j with continuous anchor data assisted method,
 	with multiple tests, by converting log likelihoods into probabilities per A for all B.
 	dc:	numpy.ndarray(nt,ns,dtype=ftype(='f4' by default)) Continuous anchor data.
@@ -427,6 +483,7 @@ def _cassists_any(self,dc,dt,dt2,name,nodiag=False,memlimit=-1,autotype=True):
 	dt:	numpy.ndarray(nt,ns,dtype=ftype(='=f4' by default)) Gene expression data for A
 		Entry dt[i,j] is gene i's expression level for sample j.
 	dt2:numpy.ndarray(nt2,ns,dtype=ftype(='=f4' by default)) Gene expression data for B.
+		Can also be findr.panel.panel of dt2, prepared once for repeated queries.
 		dt2 has the same format as dt, and can be identical with, different from, or a superset of dt.
 		When dt2 is a superset of (or identical with) dt, dt2 must be arranged
 		to be identical with dt at its upper submatrix, i.e. dt2[:nt,:]=dt, and
@@ -436,6 +493,8 @@ def _cassists_any(self,dc,dt,dt2,name,nodiag=False,memlimit=-1,autotype=True):
 		This should be set to True when A is a subset of B and aligned correspondingly.
 	memlimit:	The approximate memory usage limit in bytes for the library.  For datasets require a larger memory, calculation will be split into smaller chunks. If the memory limit is smaller than minimum required, calculation can fail with an error message. memlimit=0 defaults to unlimited memory usage.
 	autotype:	Whether to automatically convert input data types to meet requirement.
+	return_llr:	Whether to additionally return log likelihood ratios from findr.llr.compute. See findr.llr.
+	nsample:	Number of sampled targets (B) for approximate probability conversion, NumPy engine only. See findr.llr.
 	Return:	dictionary with following keys:
 	ret:0 iff execution succeeded.
 	p1:	numpy.ndarray(nt,dtype=ftype(='=f4' by default)). Probability for test 1.
@@ -451,17 +510,24 @@ def _cassists_any(self,dc,dt,dt2,name,nodiag=False,memlimit=-1,autotype=True):
 	p5:	numpy.ndarray((nt,nt2),dtype=ftype(='=f4' by default)). Probability for test 5.
 		Test 5 calculates E(A)->A--B with E(A)->B v.s. B<-E(A)->A. The earlier one is preferred.
 	For more information on tests, see paper.
+	error,errormax:	Mean and maximum absolute differences from exact mode in a few checked rows, only with nsample set.
+	llr1,llr2,llr3,llr4,llr5,nv:	Log likelihood ratios of tests and numbers of anchor model parameters, only with return_llr=True.
+		See findr.llr.compute.
 	ftype can be found in auto.py.
 	"""
+	if nsample is not None:
+		raise ValueError("nsample is only supported by the NumPy engine. Use findr.lib(backend='numpy').")
 	if self.lib is None:
 		raise ValueError("Not initialized.")
 	import numpy as np
+	from .panel import unwrap
+	dt2,pnl=unwrap(dt2)
 	from .auto import ftype_np
 	from .types import isint
 	if autotype:
-		dc=dc.astype(ftype_np)
-		dt=dt.astype(ftype_np)
-		dt2=dt2.astype(ftype_np)
+		dc=dc.astype(ftype_np,copy=False)
+		dt=dt.astype(ftype_np,copy=False)
+		dt2=dt2.astype(ftype_np,copy=False)
 		nodiag=bool(nodiag)
 		if memlimit is not None:
 			memlimit=int(memlimit)
@@ -480,14 +546,14 @@ def _cassists_any(self,dc,dt,dt2,name,nodiag=False,memlimit=-1,autotype=True):
 	
 	if dt.shape!=dc.shape or dt2.shape[1]!=ns:
 		raise ValueError('Wrong input shape')
-	if np.isnan(dc).sum()+np.isnan(dt).sum()+np.isnan(dt2).sum()>0:
+	if np.isnan(dc).sum()+np.isnan(dt).sum()+(np.isnan(dt2).sum() if pnl is None else 0)>0:
 		raise ValueError('NaN found.')
 	
 	arglist=['const MATRIXF*','const MATRIXF*','const MATRIXF*','VECTORF*','MATRIXF*','MATRIXF*','MATRIXF*','MATRIXF*','byte','size_t']
 	names=name
-	dcr=np.require(dc,requirements=['A','C','O','W'])
-	dtr=np.require(dt,requirements=['A','C','O','W'])
-	dt2r=np.require(dt2,requirements=['A','C','O','W'])
+	dcr=np.require(dc,requirements=['A','C'])
+	dtr=np.require(dt,requirements=['A','C'])
+	dt2r=np.require(dt2,requirements=['A','C'])
 	d1=np.require(np.zeros(ng,dtype=dt.dtype),requirements=['A','C','O','W'])
 	d2=np.require(np.zeros((ng,nt),dtype=dt.dtype),requirements=['A','C','O','W'])
 	d3=np.require(np.zeros((ng,nt),dtype=dt.dtype),requirements=['A','C','O','W'])
@@ -497,6 +563,9 @@ def _cassists_any(self,dc,dt,dt2,name,nodiag=False,memlimit=-1,autotype=True):
 	func=self.cfunc(names,rettype='int',argtypes=arglist)
 	ret=func(*args)
 	ans={'ret':ret,'p1':d1,'p2':d2,'p3':d3,'p4':d4,'p5':d5}
+	if return_llr:
+		from .llr import compute
+		ans.update(compute(name,dcr,dtr,dt2r if pnl is None else pnl))
 	return ans
 
 def cassists(self,dc,dt,dt2,nodiag=False,memlimit=-1,**ka):
@@ -510,6 +579,7 @@ def cassists(self,dc,dt,dt2,nodiag=False,memlimit=-1,**ka):
 	dt:	numpy.ndarray(nt,ns,dtype=ftype(='=f4' by default)) Gene expression data for A
 		Entry dt[i,j] is gene i's expression level for sample j.
 	dt2:numpy.ndarray(nt2,ns,dtype=ftype(='=f4' by default)) Gene expression data for B.
+		Can also be findr.panel.panel of dt2, prepared once for repeated queries.
 		dt2 has the same format as dt, and can be identical with, different from, or a superset of dt.
 		When dt2 is a superset of (or identical with) dt, dt2 must be arranged
 		to be identical with dt at its upper submatrix, i.e. dt2[:nt,:]=dt, and
@@ -518,6 +588,8 @@ def cassists(self,dc,dt,dt2,nodiag=False,memlimit=-1,**ka):
 		This should be set to True when A is a subset of B and aligned correspondingly.
 	memlimit:	The approximate memory usage limit in bytes for the library.  For datasets require a larger memory, calculation will be split into smaller chunks. If the memory limit is smaller than minimum required, calculation can fail with an error message. memlimit=0 defaults to unlimited memory usage.
 	autotype:	Whether to automatically convert input data types to meet requirement.
+	return_llr:	Whether to additionally return log likelihood ratios from findr.llr.compute. See findr.llr.
+	nsample:	Number of sampled targets (B) for approximate probability conversion, NumPy engine only. See findr.llr.
 	Return:	dictionary with following keys:
 	ret:0 iff execution succeeded.
 	p1:	numpy.ndarray(nt,dtype=ftype(='=f4' by default)). Probability for test 1.
@@ -533,13 +605,16 @@ def cassists(self,dc,dt,dt2,nodiag=False,memlimit=-1,**ka):
 	p5:	numpy.ndarray((nt,nt2),dtype=ftype(='=f4' by default)). Probability for test 5.
 		Test 5 calculates E(A)->A--B with E(A)->B v.s. B<-E(A)->A. The earlier one is preferred.
 	For more information on tests, see paper.
+	error,errormax:	Mean and maximum absolute differences from exact mode in a few checked rows, only with nsample set.
+	llr1,llr2,llr3,llr4,llr5,nv:	Log likelihood ratios of tests and numbers of anchor model parameters, only with return_llr=True.
+		See findr.llr.compute.
 	ftype can be found in auto.py.
 	
 	Example: see findr.examples.geuvadis4 (similar format)
 	"""
 	return _cassists_any(self,dc,dt,dt2,"pijs_cassist",nodiag=nodiag,memlimit=memlimit,**ka)
 
-def _cassist_any(self,dc,dt,dt2,name,nodiag=False,memlimit=-1,autotype=True):
+def _cassist_any(self,dc,dt,dt2,name,nodiag=False,memlimit=-1,autotype=True,return_llr=False,nsample=None):
 	"""Calculates probability of gene i regulating gene j with continuous data assisted method,
 	with the recommended combination of multiple tests.
 	dc:	numpy.ndarray(nt,ns,dtype=ftype(='f4' by default)) Continuous anchor data.
@@ -548,6 +623,7 @@ def _cassist_any(self,dc,dt,dt2,name,nodiag=False,memlimit=-1,autotype=True):
 	dt:	numpy.ndarray(nt,ns,dtype=ftype(='=f4' by default)) Gene expression data for A
 		Entry dt[i,j] is gene i's expression level for sample j.
 	dt2:numpy.ndarray(nt2,ns,dtype=ftype(='=f4' by default)) Gene expression data for B.
+		Can also be findr.panel.panel of dt2, prepared once for repeated queries.
 		dt2 has the same format as dt, and can be identical with, different from, or a superset of dt.
 		When dt2 is a superset of (or identical with) dt, dt2 must be arranged
 		to be identical with dt at its upper submatrix, i.e. dt2[:nt,:]=dt, and
@@ -557,22 +633,31 @@ def _cassist_any(self,dc,dt,dt2,name,nodiag=False,memlimit=-1,autotype=True):
 		This should be set to True when A is a subset of B and aligned correspondingly.
 	memlimit:	The approximate memory usage limit in bytes for the library.  For datasets require a larger memory, calculation will be split into smaller chunks. If the memory limit is smaller than minimum required, calculation can fail with an error message. memlimit=0 defaults to unlimited memory usage.
 	autotype:	Whether to automatically convert input data types to meet requirement.
+	return_llr:	Whether to additionally return log likelihood ratios from findr.llr.compute. See findr.llr.
+	nsample:	Number of sampled targets (B) for approximate probability conversion, NumPy engine only. See findr.llr.
 	Return:	dictionary with following keys:
 	ret:0 iff execution succeeded.
 	p:	numpy.ndarray((nt,nt2),dtype=ftype(='=f4' by default)).
 		Probability function from for recommended combination of multiple tests.
 	For more information on tests, see paper.
+	error,errormax:	Mean and maximum absolute differences from exact mode in a few checked rows, only with nsample set.
+	llr1,llr2,llr3,llr4,llr5,nv:	Log likelihood ratios of tests and numbers of anchor model parameters, only with return_llr=True.
+		See findr.llr.compute.
 	ftype can be found in auto.py.
 	"""
+	if nsample is not None:
+		raise ValueError("nsample is only supported by the NumPy engine. Use findr.lib(backend='numpy').")
 	if self.lib is None:
 		raise ValueError("Not initialized.")
 	import numpy as np
+	from .panel import unwrap
+	dt2,pnl=unwrap(dt2)
 	from .auto import ftype_np
 	from .types import isint
 	if autotype:
-		dc=dc.astype(ftype_np)
-		dt=dt.astype(ftype_np)
-		dt2=dt2.astype(ftype_np)
+		dc=dc.astype(ftype_np,copy=False)
+		dt=dt.astype(ftype_np,copy=False)
+		dt2=dt2.astype(ftype_np,copy=False)
 		nodiag=bool(nodiag)
 		if memlimit is not None:
 			memlimit=int(memlimit)
@@ -591,16 +676,19 @@ def _cassist_any(self,dc,dt,dt2,name,nodiag=False,memlimit=-1,autotype=True):
 	
 	if dt.shape!=dc.shape or dt2.shape[1]!=ns:
 		raise ValueError('Wrong input shape')
-	if np.isnan(dc).sum()+np.isnan(dt).sum()+np.isnan(dt2).sum()>0:
+	if np.isnan(dc).sum()+np.isnan(dt).sum()+(np.isnan(dt2).sum() if pnl is None else 0)>0:
 		raise ValueError('NaN found.')
 
 	func=self.cfunc(name,rettype='int',argtypes=['const MATRIXF*','const MATRIXF*','const MATRIXF*','MATRIXF*','byte','size_t'])
 	d=np.require(np.zeros((ng,nt),dtype=dt.dtype),requirements=['A','C','O','W'])
-	dcr=np.require(dc,requirements=['A','C','O','W'])
-	dtr=np.require(dt,requirements=['A','C','O','W'])
-	dt2r=np.require(dt2,requirements=['A','C','O','W'])
+	dcr=np.require(dc,requirements=['A','C'])
+	dtr=np.require(dt,requirements=['A','C'])
+	dt2r=np.require(dt2,requirements=['A','C'])
 	ret=func(dcr,dtr,dt2r,d,nd,memlimit)
 	ans={'ret':ret,'p':d}
+	if return_llr:
+		from .llr import compute
+		ans.update(compute(name,dcr,dtr,dt2r if pnl is None else pnl))
 	return ans
 
 def cassist(self,dc,dt,dt2,nodiag=False,memlimit=-1,**ka):
@@ -614,6 +702,7 @@ def cassist(self,dc,dt,dt2,nodiag=False,memlimit=-1,**ka):
 	dt:	numpy.ndarray(nt,ns,dtype=ftype(='=f4' by default)) Gene expression data for A
 		Entry dt[i,j] is gene i's expression level for sample j.
 	dt2:numpy.ndarray(nt2,ns,dtype=ftype(='=f4' by default)) Gene expression data for B.
+		Can also be findr.panel.panel of dt2, prepared once for repeated queries.
 		dt2 has the same format as dt, and can be identical with, different from, or a superset of dt.
 		When dt2 is a superset of (or identical with) dt, dt2 must be arranged
 		to be identical with dt at its upper submatrix, i.e. dt2[:nt,:]=dt, and
@@ -622,11 +711,16 @@ def cassist(self,dc,dt,dt2,nodiag=False,memlimit=-1,**ka):
 		This should be set to True when A is a subset of B and aligned correspondingly.
 	memlimit:	The approximate memory usage limit in bytes for the library.  For datasets require a larger memory, calculation will be split into smaller chunks. If the memory limit is smaller than minimum required, calculation can fail with an error message. memlimit=0 defaults to unlimited memory usage.
 	autotype:	Whether to automatically convert input data types to meet requirement.
+	return_llr:	Whether to additionally return log likelihood ratios from findr.llr.compute. See findr.llr.
+	nsample:	Number of sampled targets (B) for approximate probability conversion, NumPy engine only. See findr.llr.
 	Return:	dictionary with following keys:
 	ret:0 iff execution succeeded.
 	p:	numpy.ndarray((nt,nt2),dtype=ftype(='=f4' by default)).
 		Probability function from for recommended combination of multiple tests.
 	For more information on tests, see paper.
+	error,errormax:	Mean and maximum absolute differences from exact mode in a few checked rows, only with nsample set.
+	llr1,llr2,llr3,llr4,llr5,nv:	Log likelihood ratios of tests and numbers of anchor model parameters, only with return_llr=True.
+		See findr.llr.compute.
 	ftype can be found in auto.py.
 	
 	Example: see findr.examples.geuvadis5
@@ -641,6 +735,7 @@ def cassist_trad(self,dc,dt,dt2,nodiag=False,memlimit=-1,**ka):
 	dt:	numpy.ndarray(nt,ns,dtype=ftype(='=f4' by default)) Gene expression data for A
 		Entry dt[i,j] is gene i's expression level for sample j.
 	dt2:numpy.ndarray(nt2,ns,dtype=ftype(='=f4' by default)) Gene expression data for B.
+		Can also be findr.panel.panel of dt2, prepared once for repeated queries.
 		dt2 has the same format as dt, and can be identical with, different from, or a superset of dt.
 		When dt2 is a superset of (or identical with) dt, dt2 must be arranged
 		to be identical with dt at its upper submatrix, i.e. dt2[:nt,:]=dt, and
@@ -649,40 +744,57 @@ def cassist_trad(self,dc,dt,dt2,nodiag=False,memlimit=-1,**ka):
 		This should be set to True when A is a subset of B and aligned correspondingly.
 	memlimit:	The approximate memory usage limit in bytes for the library.  For datasets require a larger memory, calculation will be split into smaller chunks. If the memory limit is smaller than minimum required, calculation can fail with an error message. memlimit=0 defaults to unlimited memory usage.
 	autotype:	Whether to automatically convert input data types to meet requirement.
+	return_llr:	Whether to additionally return log likelihood ratios from findr.llr.compute. See findr.llr.
+	nsample:	Number of sampled targets (B) for approximate probability conversion, NumPy engine only. See findr.llr.
 	Return:	dictionary with following keys:
 	ret:0 iff execution succeeded.
 	p:	numpy.ndarray((nt,nt2),dtype=ftype(='=f4' by default)).
 		Probability function from for recommended combination of multiple tests.
 	For more information on tests, see paper.
+	error,errormax:	Mean and maximum absolute differences from exact mode in a few checked rows, only with nsample set.
+	llr1,llr2,llr3,llr4,llr5,nv:	Log likelihood ratios of tests and numbers of anchor model parameters, only with return_llr=True.
+		See findr.llr.compute.
 	ftype can be found in auto.py.
 	
 	Example: see findr.examples.geuvadis5 (same format)
 	"""
 	return _cassist_any(self,dc,dt,dt2,"pij_cassist_trad",nodiag=nodiag,memlimit=memlimit,**ka)
 
-def rank_pv(self,dt,dt2,memlimit=-1,autotype=True):
+def rank_pv(self,dt,dt2,memlimit=-1,autotype=True,return_llr=False,symmetric=False,packed=False):
 	"""Calculates p-values of gene i correlating with gene j by converting log likelihoods into probabilities per A for all B.
 	dt:	numpy.ndarray(nt,ns,dtype=ftype(='=f4' by default)) Gene expression data for A
 		Entry dt[i,j] is gene i's expression level for sample j.
 	dt2:numpy.ndarray(nt2,ns,dtype=ftype(='=f4' by default)) Gene expression data for B.
+		Can also be findr.panel.panel of dt2, prepared once for repeated queries.
 		dt2 has the same format as dt, and can be identical with, different from, a subset of, or a superset of dt.
 	memlimit:	The approximate memory usage limit in bytes for the library.  For datasets require a larger memory, calculation will fail with an error message. memlimit=0 defaults to unlimited memory usage.
 	autotype:	Whether to automatically convert input data types to meet requirement.
+	return_llr:	Whether to additionally return log likelihood ratios from findr.llr.compute. See findr.llr.
+	symmetric:	Whether dt2 is identical with dt, to compute only the upper triangle of symmetric P-values and fill the lower triangle,
+		with findr.sym.rank_pv. Outputs are identical. Default (False) computes the full matrix. It is not detected automatically,
+		because comparing contents would cost a pass over both inputs. See findr.sym.same to check identical inputs.
+	packed:	Whether to return outputs in packed storage of the upper triangle including the diagonal, in symmetric mode only.
+		See findr.sym.unpack.
 	Return:	dictionary with following keys:
 	ret:0 iff execution succeeded.
 	p:	numpy.ndarray((nt,nt2),dtype=ftype(='=f4' by default)). P-values for A--B.
+		numpy.ndarray(nt*(nt+1)//2,dtype=ftype(='=f4' by default)) with packed=True.
+	llr:	numpy.ndarray((nt,nt2),dtype=ftype(='=f4' by default)). Log likelihood ratios, only with return_llr=True.
+		Packed as p with packed=True.
 	ftype and gtype can be found in auto.py.
 	
-	Example: see findr.examples.geuvadis1 (similar format)
+	Example: see findr.examples.geuvadis1 (similar format); a=l.pij_rank_pv(dt,dt,symmetric=True,packed=True)
 	"""
 	if self.lib is None:
 		raise ValueError("Not initialized.")
 	import numpy as np
+	from .panel import unwrap
+	dt2,pnl=unwrap(dt2)
 	from .auto import ftype_np,gtype_np
 	from .types import isint
 	if autotype:
-		dt=dt.astype(ftype_np)
-		dt2=dt2.astype(ftype_np)
+		dt=dt.astype(ftype_np,copy=False)
+		dt2=dt2.astype(ftype_np,copy=False)
 		if memlimit is not None:
 			memlimit=int(memlimit)
 	if dt.dtype.char!=ftype_np or dt2.dtype.char!=ftype_np:
@@ -697,44 +809,67 @@ def rank_pv(self,dt,dt2,memlimit=-1,autotype=True):
 	
 	if dt2.shape[1]!=ns:
 		raise ValueError('Wrong input shape')
-	if np.isnan(dt).sum()+np.isnan(dt2).sum()>0:
+	symmetric=bool(symmetric)
+	if symmetric and dt2.shape!=dt.shape:
+		raise ValueError('Input requires identical shapes of dt and dt2 for symmetric.')
+	if packed and not symmetric:
+		raise ValueError('Input requires symmetric for packed.')
+	if np.isnan(dt).sum()+(np.isnan(dt2).sum() if pnl is None and not symmetric else 0)>0:
 		raise ValueError('NaN found.')
 
+	dtr=np.require(dt,requirements=['A','C'])
+	if symmetric:
+		from .sym import rank_pv as srank_pv
+		return srank_pv(self,dtr,memlimit=memlimit,return_llr=return_llr,packed=packed)
 	dp=np.require(np.zeros((ng,nt),dtype=dt.dtype),requirements=['A','C','O','W'])
-	dtr=np.require(dt,requirements=['A','C','O','W'])
-	dt2r=np.require(dt2,requirements=['A','C','O','W'])
+	dt2r=np.require(dt2,requirements=['A','C'])
 	arglist=['const MATRIXF*','const MATRIXF*','MATRIXF*','size_t']
 	args=[dtr,dt2r,dp,memlimit]
 	func=self.cfunc('pij_rank_pv',rettype='int',argtypes=arglist)
 	ret=func(*args)
 	ans={'ret':ret,'p':dp}
+	if return_llr:
+		from .llr import compute
+		ans.update(compute('pij_rank_pv',dtr,dt2r if pnl is None else pnl))
 	return ans
 
-def rank(self,dt,dt2,nodiag=False,memlimit=-1,autotype=True):
+def rank(self,dt,dt2,nodiag=False,memlimit=-1,autotype=True,return_llr=False,nsample=None,symmetric=False):
 	"""Calculates probability of gene i correlating with gene j by converting log likelihoods into probabilities per A for all B.
 	dt:	numpy.ndarray(nt,ns,dtype=ftype(='=f4' by default)) Gene expression data for A
 		Entry dt[i,j] is gene i's expression level for sample j.
 	dt2:numpy.ndarray(nt2,ns,dtype=ftype(='=f4' by default)) Gene expression data for B.
+		Can also be findr.panel.panel of dt2, prepared once for repeated queries.
 		dt2 has the same format as dt, and can be identical with, different from, a subset of, or a superset of dt. When dt2 is a superset of (or identical with) dt, dt2 must be arranged to be identical with dt at its upper submatrix, i.e. dt2[:nt,:]=dt, and set parameter nodiag = 1. Similarly if dt2 is a subset of dt.
 	nodiag:	skip diagonal regulations, i.e. regulation A--B for A=B.
 		This should be set to True when A is a subset of B and aligned correspondingly.
 	memlimit:	The approximate memory usage limit in bytes for the library.  For datasets require a larger memory, calculation will fail with an error message. memlimit=0 defaults to unlimited memory usage.
 	autotype:	Whether to automatically convert input data types to meet requirement.
+	return_llr:	Whether to additionally return log likelihood ratios from findr.llr.compute. See findr.llr.
+	nsample:	Number of sampled targets (B) for approximate probability conversion, NumPy engine only. See findr.llr.
+	symmetric:	Whether dt2 is identical with dt, to compute only the upper triangle of symmetric LLRs and fill the lower triangle,
+		with findr.sym.rank. Probabilities are then converted in python by findr.llr.convert, as in the NumPy engine (findr.backend),
+		and may differ slightly from the library. They are not symmetric. See findr.sym.same to detect identical inputs.
 	Return:	dictionary with following keys:
 	ret:0 iff execution succeeded.
 	p:	numpy.ndarray((nt,nt2),dtype=ftype(='=f4' by default)). Probability for A--B.
+	error,errormax:	Mean and maximum absolute differences from exact mode in a few checked rows, only with nsample set.
+	llr:	numpy.ndarray((nt,nt2),dtype=ftype(='=f4' by default)). Log likelihood ratios, only with return_llr=True.
 	ftype and gtype can be found in auto.py.
 	
 	Example: see findr.examples.geuvadis1
 	"""
+	if nsample is not None:
+		raise ValueError("nsample is only supported by the NumPy engine. Use findr.lib(backend='numpy').")
 	if self.lib is None:
 		raise ValueError("Not initialized.")
 	import numpy as np
+	from .panel import unwrap
+	dt2,pnl=unwrap(dt2)
 	from .auto import ftype_np,gtype_np
 	from .types import isint
 	if autotype:
-		dt=dt.astype(ftype_np)
-		dt2=dt2.astype(ftype_np)
+		dt=dt.astype(ftype_np,copy=False)
+		dt2=dt2.astype(ftype_np,copy=False)
 		nodiag=bool(nodiag)
 		if memlimit is not None:
 			memlimit=int(memlimit)
@@ -753,15 +888,24 @@ def rank(self,dt,dt2,nodiag=False,memlimit=-1,autotype=True):
 	
 	if dt2.shape[1]!=ns:
 		raise ValueError('Wrong input shape')
-	if np.isnan(dt).sum()+np.isnan(dt2).sum()>0:
+	symmetric=bool(symmetric)
+	if symmetric and dt2.shape!=dt.shape:
+		raise ValueError('Input requires identical shapes of dt and dt2 for symmetric.')
+	if np.isnan(dt).sum()+(np.isnan(dt2).sum() if pnl is None and not symmetric else 0)>0:
 		raise ValueError('NaN found.')
 
+	dtr=np.require(dt,requirements=['A','C'])
+	if symmetric:
+		from .sym import rank as srank
+		return srank(self,dtr,nodiag=nodiag,return_llr=return_llr,nsample=nsample)
 	dp=np.require(np.zeros((ng,nt),dtype=dt.dtype),requirements=['A','C','O','W'])
-	dtr=np.require(dt,requirements=['A','C','O','W'])
-	dt2r=np.require(dt2,requirements=['A','C','O','W'])
+	dt2r=np.require(dt2,requirements=['A','C'])
 	arglist=['const MATRIXF*','const MATRIXF*','MATRIXF*','byte','size_t']
 	args=[dtr,dt2r,dp,nd,memlimit]
 	func=self.cfunc('pij_rank',rettype='int',argtypes=arglist)
 	ret=func(*args)
 	ans={'ret':ret,'p':dp}
+	if return_llr:
+		from .llr import compute
+		ans.update(compute('pij_rank',dtr,dt2r if pnl is None else pnl))
 	return ans
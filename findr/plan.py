@@ -0,0 +1,271 @@
+# Copyright 2016-2018, 2020 Lingfei Wang
+# 
+# This file is part of Findr.
+# 
+# Findr is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# Findr is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+# 
+# You should have received a copy of the GNU Affero General Public License
+# along with Findr.  If not, see <http://www.gnu.org/licenses/>.
+# 
+"""Resource planning for job scheduling.
+Predicts peak memory and runtime of findr functions before running them.
+Runtime predictions are calibrated with a short local benchmark (findr.plan.calibrate, or lib.calibrate)
+and stored in a profile file, separately for each engine and library version (findr.plan.profilekey).
+Memory predictions follow the allocations made by the python interface and an analytical model of the working memory
+of the engine: the library's, or the NumPy engine's (findr.backend) LLRs, standardized targets and conversion temporaries.
+For usage, see findr.estimate."""
+
+try: from exceptions import ValueError
+except ImportError: pass
+
+#Per function: (anchor bytes per entry or 0 if absent, number of vector outputs, number of matrix outputs, number of working matrices in library)
+methods={
+	'pij_rank':(0,0,1,1),
+	'pij_rank_pv':(0,0,1,1),
+	'pij_gassist':(1,0,1,4),
+	'pij_gassist_trad':(1,0,1,2),
+	'pijs_gassist':(1,1,4,4),
+	'pijs_gassist_pv':(1,1,4,4),
+	'pij_cassist':(4,0,1,4),
+	'pij_cassist_trad':(4,0,1,2),
+	'pijs_cassist':(4,1,4,4),
+	'pijs_cassist_pv':(4,1,4,4),
+	'netr_one_greedy':(0,0,1,3),
+	}
+
+#Default runtime coefficients (a,b,c) in seconds for runtime=a+b*nt*nt2*ns/nth+c*nt*nt2, when uncalibrated.
+defaults={
+	'pij_rank':(0.01,3E-10,2E-8),
+	'pij_rank_pv':(0.01,3E-10,1E-8),
+	'pij_gassist':(0.01,3E-9,1E-7),
+	'pij_gassist_trad':(0.01,2E-9,5E-8),
+	'pijs_gassist':(0.01,3E-9,1E-7),
+	'pijs_gassist_pv':(0.01,3E-9,5E-8),
+	'pij_cassist':(0.01,4E-9,1E-7),
+	'pij_cassist_trad':(0.01,3E-9,5E-8),
+	'pijs_cassist':(0.01,4E-9,1E-7),
+	'pijs_cassist_pv':(0.01,4E-9,5E-8),
+	'netr_one_greedy':(0.01,0,5E-7),
+	}
+
+def _nth(nth):
+	from .util import nthread
+	return nthread(nth)
+
+def profilekey(backend='c',version=None):
+	"""Key of runtime coefficients in profile file, by engine and library version.
+	backend:	Engine, as backend of findr.lib. 'auto' is treated as 'c'.
+	version:	Version string of the library, as version of findr.lib. Default (None) indicates the version of the python interface,
+		which loadable libraries match up to the patch version. Ignored for the NumPy engine.
+	Return:	str"""
+	if backend=='numpy':
+		return 'numpy'
+	from .auto import version as v
+	return 'c '+(version if version is not None else '.'.join(map(str,v)))
+
+def _loadall(path):
+	import os
+	import json
+	if not os.path.isfile(path):
+		return {}
+	with open(path,'r') as f:
+		p=json.load(f)
+	#Entries that are not per key are ignored
+	return dict((k,v) for k,v in p.items() if isinstance(v,dict))
+
+def loadprofile(path=None,key=None):
+	"""Loads calibrated runtime coefficients from profile file.
+	path:	Profile file. Default (None) indicates findr.common.profilepath.
+	key:	Engine and library version of coefficients, from findr.plan.profilekey. Default (None) indicates profilekey().
+	Return:	dictionary from function name to (a,b,c), or empty if no profile exists for key."""
+	from .common import profilepath
+	path=profilepath if path is None else path
+	key=profilekey() if key is None else key
+	return dict((k,tuple(v)) for k,v in _loadall(path).get(key,{}).items())
+
+def memory(name,nt,nt2,ns,memlimit=-1,convert=False,nrow=None,backend='c'):
+	"""Predicts peak memory usage in bytes by component.
+	Parameters are as in findr.estimate.
+	Return:	dictionary from component name to bytes."""
+	s=methods[name]
+	f=4
+	if name=='netr_one_greedy':
+		nt2=nt
+		ans={'inputs':nt*nt*f,'convert':nt*nt*f if convert else 0,'nan':nt*nt,
+			'outputs':2*nt*nt,'library':s[3]*nt*nt*f}
+		return ans
+	nin=nt*ns*(s[0]+f)+nt2*ns*f
+	nr=nt if nrow is None else min(nt,nrow)
+	ans={'inputs':nin,'convert':nin if convert else 0,'nan':max(nt,nt2)*ns}
+	ans['outputs']=(s[1]*nt+s[2]*nt*nt2)*f
+	if nrow is not None and nr<nt:
+		#One block of outputs on top of assembled outputs, and for nodiag, targets reordered for the library (findr.blocks).
+		ans['blocks']=(s[1]*nr+s[2]*nr*nt2)*f
+		if not name.endswith('_pv'):
+			ans['blocks']+=nt2*ns*f
+	if backend=='numpy':
+		#LLR matrices of findr.llr.compute, float64 standardized targets, row temporaries bounded by its nbyte,
+		#and float64 temporaries of conversion. memlimit is not used.
+		from .llr import keys
+		ans['library']=len(keys(name)[1])*nr*nt2*f+nt2*ns*8+min(2**26,nr*nt2*48)+3*nr*nt2*8
+		return ans
+	lib=s[3]*nr*nt2*f+(nr+nt2)*ns*f
+	if memlimit is not None and memlimit>0:
+		lib=max(min(lib,memlimit),s[3]*nt2*f+(1+nt2)*ns*f)
+	ans['library']=lib
+	return ans
+
+def runtime(name,nt,nt2,ns,nth=0,profile=None,backend='c',version=None):
+	"""Predicts runtime in seconds.
+	Parameters are as in findr.estimate.
+	Return:	(runtime,calibrated) where calibrated indicates whether a calibrated profile was used."""
+	from math import log
+	p=loadprofile(profile,profilekey(backend,version))
+	calibrated=name in p
+	a,b,c=p[name] if calibrated else defaults[name]
+	nth=_nth(nth)
+	if name=='netr_one_greedy':
+		n=float(nt)*nt
+		return (a+c*n*max(1,log(max(n,2))),calibrated)
+	return (a+b*float(nt)*nt2*ns/nth+c*float(nt)*nt2,calibrated)
+
+def estimate(name,nt,nt2,ns,na=None,memlimit=-1,nth=0,convert=False,nrow=None,profile=None,backend='c',version=None):
+	"""Predicts peak memory usage and runtime of a findr function, for job scheduling.
+	name:	Name of function in findr.lib, e.g. 'pijs_gassist'.
+	nt:	Number of regulators (A). For netr_one_greedy, number of genes.
+	nt2:	Number of targets (B). Ignored for netr_one_greedy.
+	ns:	Number of samples. Ignored for netr_one_greedy.
+	na:	Number of alleles. Accepted for completeness. It does not affect predictions noticeably.
+	memlimit:	memlimit parameter passed to the function.
+	nth:	Number of threads of the library. Default (0) indicates to use the number of cores.
+	convert:	Whether inputs require data type conversion (e.g. float64 expression data), which creates copies.
+	nrow:	Number of rows per block when running with findr.blocks. Default (None) indicates a single call.
+	profile:	Profile file from findr.plan.calibrate. Default (None) indicates findr.common.profilepath.
+	backend:	Engine, as backend of findr.lib, for its memory model and calibrated coefficients. Default: 'c'.
+	version:	Version of the library, as version of findr.lib, for calibrated coefficients. See findr.plan.profilekey.
+	Return:	dictionary with following keys:
+	memory:	Predicted peak memory in bytes, including inputs, conversion copies, NaN masks, outputs and library working memory.
+	runtime:	Predicted runtime in seconds.
+	calibrated:	Whether runtime was predicted from a calibrated profile, instead of built-in defaults.
+	detail:	Dictionary of predicted peak memory by component.
+	"""
+	if name not in methods:
+		raise ValueError('Unknown function: '+str(name))
+	if min(nt,nt2,ns)<=0 or (na is not None and na<=0) or (nrow is not None and nrow<=0):
+		raise ValueError('Wrong input dimension')
+	m=memory(name,nt,nt2,ns,memlimit=memlimit,convert=convert,nrow=nrow,backend=backend)
+	t,calibrated=runtime(name,nt,nt2,ns,nth=nth,profile=profile,backend=backend,version=version)
+	return {'memory':sum(m.values()),'runtime':t,'calibrated':calibrated,'detail':m}
+
+def maxnrow(name,nt,nt2,ns,budget,memlimit=-1,convert=False,backend='c'):
+	"""Largest number of rows per block for findr.blocks within memory budget in bytes.
+	backend:	Engine, as backend of findr.lib.
+	Return:	Number of rows, or 0 if even single-row blocks exceed the budget."""
+	lo,hi=0,nt
+	while lo<hi:
+		x=(lo+hi+1)//2
+		if sum(memory(name,nt,nt2,ns,memlimit=memlimit,convert=convert,nrow=x,backend=backend).values())<=budget:
+			lo=x
+		else:
+			hi=x-1
+	return lo
+
+def calibrate(self,path=None,names=None,ns=[50,200],sizes=[(50,500),(100,1000),(200,2000)],repeat=2):
+	"""Calibrates runtime predictions with a short benchmark on random data, and saves them in profile file.
+	Every size is benchmarked with every number of samples, so costs per sample (b) and per pair (c) can be separated.
+	They are fitted by non-negative least squares. Benchmarks use the number of threads of self, and the dependence on nth is assumed ideal.
+	Coefficients are saved under the engine and library version of self (findr.plan.profilekey).
+	path:	Profile file to write. Default (None) indicates findr.common.profilepath.
+		Existing coefficients of functions not benchmarked, or of other engines or library versions, are kept.
+	names:	List of function names to benchmark. Default (None) indicates all functions in findr.plan.methods.
+	ns:	List of numbers of samples of benchmark data, or a single number. At least two different values are needed
+		to fit b and c separately.
+	sizes:	List of (nt,nt2) of benchmark data.
+	repeat:	Number of repeats for each size, of which the fastest is used.
+	Return:	dictionary from function name to fitted coefficients (a,b,c) for runtime=a+b*nt*nt2*ns/nth+c*nt*nt2.
+	"""
+	import os
+	import json
+	import numpy as np
+	from .common import profilepath
+	path=profilepath if path is None else path
+	names=list(methods) if names is None else names
+	nss=sorted(set(int(x) for x in np.atleast_1d(ns)))
+	if len(nss)==0 or nss[0]<=0:
+		raise ValueError('Wrong ns')
+	nth=_nth(getattr(self,'nth',0))
+	rs=np.random.RandomState(getattr(self,'rs',0) or 0)
+	ans={}
+	for name in names:
+		x=[]
+		y=[]
+		#netr_one_greedy does not depend on samples
+		for nt,nt2,ns in [(a,b,c) for a,b in sizes for c in (nss[:1] if name=='netr_one_greedy' else nss)]:
+			if name=='netr_one_greedy':
+				data=[rs.rand(nt,nt).astype('f4')]
+			else:
+				dt=rs.randn(nt,ns).astype('f4')
+				data=[dt,np.vstack([dt,rs.randn(max(nt2-nt,0),ns).astype('f4')])[:nt2]]
+				if 'gassist' in name:
+					data=[rs.randint(0,3,size=(nt,ns)).astype('u1')]+data
+				elif 'cassist' in name:
+					data=[rs.randn(nt,ns).astype('f4')]+data
+			f=getattr(self,name)
+			t=min(_timeit(f,data) for _ in range(repeat))
+			if name=='netr_one_greedy':
+				n=float(nt)*nt
+				x.append([1,0,n*max(1,np.log(n))])
+			else:
+				x.append([1,float(nt)*nt2*ns/nth,float(nt)*nt2])
+			y.append(t)
+		x=np.array(x)
+		y=np.array(y)
+		ans[name]=tuple(float(v) for v in _nnls(x,y))
+	key=profilekey(getattr(self,'backend','c'),getattr(self,'version',None))
+	p=_loadall(path)
+	p.setdefault(key,{}).update(dict((k,list(v)) for k,v in ans.items()))
+	d=os.path.dirname(path)
+	if d and not os.path.isdir(d):
+		os.makedirs(d)
+	ftmp=path+'.'+str(os.getpid())+'.tmp'
+	with open(ftmp,'w') as f:
+		json.dump(p,f,sort_keys=True,indent=1)
+	os.replace(ftmp,path)
+	return ans
+
+def _nnls(x,y):
+	"""Non-negative least squares solution of x*c=y, exact by enumerating supports of the few coefficients.
+	Columns of x that are all zero get zero coefficients.
+	Return:	numpy.ndarray(x.shape[1])"""
+	import numpy as np
+	from itertools import combinations
+	n=x.shape[1]
+	cols=[i for i in range(n) if x[:,i].any()]
+	best=np.zeros(n)
+	rbest=np.sum(y**2)
+	for k in range(1,len(cols)+1):
+		for t in combinations(cols,k):
+			t=list(t)
+			c=np.linalg.lstsq(x[:,t],y,rcond=None)[0]
+			if (c<0).any():
+				continue
+			r=np.sum((y-np.dot(x[:,t],c))**2)
+			if r<rbest:
+				rbest=r
+				best=np.zeros(n)
+				best[t]=c
+	return best
+
+def _timeit(f,data):
+	import time
+	t=time.time()
+	f(*data)
+	return time.time()-t
@@ -0,0 +1,167 @@
+# Copyright 2016-2018, 2020 Lingfei Wang
+# 
+# This file is part of Findr.
+# 
+# Findr is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# Findr is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+# 
+# You should have received a copy of the GNU Affero General Public License
+# along with Findr.  If not, see <http://www.gnu.org/licenses/>.
+# 
+"""PLINK binary genotype input.
+Genotypes are memory-mapped from .bed files and kept in PLINK's 2-bit packed form.
+They are only unpacked to gtype, one block of rows at a time, when accessed.
+Packed genotypes only save memory with row block runs (lib.blocks, python -m findr run, findr.dist),
+which unpack one block at a time. Pij functions called directly unpack the whole matrix on input conversion.
+Example: g=findr.plink.bed('data/chr1'); dg=g.select(snps); l.blocks('pij_gassist',dg,dt,dt2)"""
+
+try: from exceptions import ValueError
+except ImportError: pass
+
+def _lut(missing):
+	"""Lookup table from one packed byte to four genotypes, as count of allele 1 in .bim.
+	PLINK codes: 00 homozygous allele 1, 01 missing, 10 heterozygous, 11 homozygous allele 2."""
+	import numpy as np
+	code=np.array([2,missing,1,0],dtype='u1')
+	b=np.arange(256,dtype='u1')
+	return code[np.stack([(b>>(2*x))&3 for x in range(4)],axis=1)]
+
+class packedg:
+	"""Genotype matrix in PLINK 2-bit packed form, unpacked on demand.
+	Behaves as a read-only numpy.ndarray(nt,ns,dtype=gtype) for findr's pij functions.
+	Row slicing and indexing only unpack the requested rows. Conversion to numpy.ndarray (e.g. by pij functions
+	called directly) unpacks all rows, so use row block runs (lib.blocks) to keep memory usage low.
+	"""
+	def __init__(self,data,ns,samples=None,missing=None):
+		"""Wraps 2-bit packed genotypes.
+		data:	numpy.ndarray(nt,(nsall+3)//4,dtype='u1'), or memory map of it. Packed genotypes in PLINK's SNP-major layout.
+		ns:		Number of samples (nsall) in packed data.
+		samples:	numpy.ndarray of indices of samples to keep and in which order, or None to keep all samples.
+		missing:	Genotype value for missing calls. Default (None) raises ValueError when a missing call is unpacked.
+		"""
+		import numpy as np
+		from .auto import gtype_np
+		if len(data.shape)!=2 or data.shape[1]!=(ns+3)//4:
+			raise ValueError('Wrong input shape')
+		if missing is not None and (missing<0 or missing>=255):
+			raise ValueError('Wrong missing value')
+		self.data=data
+		self.nsall=ns
+		self.samples=None if samples is None else np.asarray(samples,dtype=int)
+		self.missing=missing
+		self.lut=_lut(255 if missing is None else missing)
+		self.dtype=np.dtype(gtype_np)
+		self.ndim=2
+		self.shape=(data.shape[0],ns if samples is None else len(self.samples))
+		self.nbytes=self.data.nbytes
+	def __len__(self):
+		return self.shape[0]
+	def unpack(self,rows):
+		"""Unpacks selected rows.
+		rows:	Row index, slice, or array of row indices.
+		Return:	numpy.ndarray(len(rows),ns,dtype=gtype) of genotypes."""
+		import numpy as np
+		d=np.asarray(self.data[rows])
+		if d.ndim==1:
+			d=d.reshape(1,-1)
+		ans=self.lut[d].reshape(d.shape[0],-1)[:,:self.nsall]
+		if self.samples is not None:
+			ans=ans[:,self.samples]
+		ans=np.ascontiguousarray(ans)
+		if self.missing is None and (ans==255).any():
+			raise ValueError('Missing genotype found.')
+		return ans
+	def __getitem__(self,key):
+		import numpy as np
+		if type(key) is tuple:
+			if len(key)!=2:
+				raise ValueError('Wrong index dimension')
+			return self[key[0]][...,key[1]]
+		if isinstance(key,(int,np.integer)) and not isinstance(key,(bool,np.bool_)):
+			return self.unpack(int(key))[0]
+		return self.unpack(key)
+	def __array__(self,dtype=None,copy=None):
+		ans=self.unpack(slice(None))
+		return ans if dtype is None else ans.astype(dtype,copy=False)
+	def astype(self,dtype,copy=True):
+		"""Unpacks all rows and converts to given dtype."""
+		return self.unpack(slice(None)).astype(dtype,copy=False)
+	def max(self,nrow=1024):
+		"""Maximum genotype value, computed in blocks of nrow rows."""
+		return max(self.unpack(slice(x,min(x+nrow,self.shape[0]))).max() for x in range(0,self.shape[0],nrow))
+
+class bed:
+	"""Memory-mapped PLINK binary genotype file set (.bed, .bim and .fam).
+	Attributes:
+	samples:	list of sample (individual) IDs from .fam.
+	snps:	list of variant IDs from .bim.
+	chrom:	list of chromosome names from .bim.
+	pos:	numpy.ndarray(nsnp,dtype=int) of base pair positions from .bim.
+	a1, a2:	lists of allele 1 and allele 2 from .bim. Genotypes are counts of allele 1.
+	data:	numpy.memmap(nsnp,(ns+3)//4,dtype='u1') of packed genotypes.
+	"""
+	def __init__(self,prefix):
+		"""Opens PLINK binary genotype files.
+		prefix:	Path to files without extension, or path to .bed file.
+		"""
+		import numpy as np
+		if prefix.endswith('.bed'):
+			prefix=prefix[:-4]
+		with open(prefix+'.fam','r') as f:
+			fam=[x.split() for x in f.read().splitlines() if x.strip()]
+		with open(prefix+'.bim','r') as f:
+			bim=[x.split() for x in f.read().splitlines() if x.strip()]
+		if any(len(x)<6 for x in fam) or any(len(x)<6 for x in bim):
+			raise ValueError('Wrong .fam or .bim format.')
+		self.samples=[x[1] for x in fam]
+		self.snps=[x[1] for x in bim]
+		self.chrom=[x[0] for x in bim]
+		self.pos=np.array([int(x[3]) for x in bim],dtype=int)
+		self.a1=[x[4] for x in bim]
+		self.a2=[x[5] for x in bim]
+		self.ns=len(self.samples)
+		self.nsnp=len(self.snps)
+		with open(prefix+'.bed','rb') as f:
+			magic=bytearray(f.read(3))
+		if len(magic)!=3 or magic[0]!=0x6c or magic[1]!=0x1b:
+			raise ValueError('Not a PLINK .bed file.')
+		if magic[2]!=1:
+			raise ValueError('Only SNP-major .bed files are supported.')
+		self.data=np.memmap(prefix+'.bed',dtype='u1',mode='r',offset=3,shape=(self.nsnp,(self.ns+3)//4))
+		self._snpid=None
+		self._sampleid=None
+	def _index(self,names,allnames,attr):
+		import numpy as np
+		names=list(names)
+		if all(not isinstance(x,str) for x in names):
+			return np.asarray(names,dtype=int)
+		d=getattr(self,attr)
+		if d is None:
+			d=dict(zip(allnames,range(len(allnames))))
+			setattr(self,attr,d)
+		try:
+			return np.array([d[x] for x in names],dtype=int)
+		except KeyError as e:
+			raise ValueError('Not found: '+str(e))
+	def select(self,snps=None,samples=None,missing=None):
+		"""Selects anchor variants (e.g. the best eQTL of each gene) and samples without unpacking genotypes.
+		snps:	List of variant IDs or indices. The i-th variant is the anchor for gene i. Default (None) selects all.
+		samples:	List of sample IDs or indices to keep and in which order, to match expression data. Default (None) keeps all.
+		missing:	Genotype value for missing calls. Default (None) raises ValueError when a missing call is unpacked.
+		Return:	findr.plink.packedg(len(snps),len(samples)) to be used as dg in pij functions.
+		"""
+		import numpy as np
+		if snps is None:
+			d=self.data
+		else:
+			d=np.asarray(self.data[self._index(snps,self.snps,'_snpid')])
+		if samples is not None:
+			samples=self._index(samples,self.samples,'_sampleid')
+		return packedg(d,self.ns,samples=samples,missing=missing)
@@ -0,0 +1,112 @@
+# Copyright 2016-2018, 2020 Lingfei Wang
+# 
+# This file is part of Findr.
+# 
+# Findr is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# Findr is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+# 
+# You should have received a copy of the GNU Affero General Public License
+# along with Findr.  If not, see <http://www.gnu.org/licenses/>.
+# 
+"""Preprocessing of expression data.
+Findr expects expression data to be supernormalized before pij_rank, pij_gassist and pij_cassist.
+For usage, see findr.preprocess.supernormalize."""
+
+try: from exceptions import ValueError
+except ImportError: pass
+
+def rank(d):
+	"""Computes row-wise ranks from 1 to ns, with tied values receiving their average rank.
+	d:	numpy.ndarray(n,ns).
+	Return:	numpy.ndarray(n,ns,dtype=float) of ranks."""
+	import numpy as np
+	n=d.shape[1]
+	o=np.argsort(d,axis=1,kind='stable')
+	s=np.take_along_axis(d,o,axis=1)
+	ids=np.broadcast_to(np.arange(n),s.shape)
+	t=np.ones(s.shape,dtype=bool)
+	t[:,1:]=s[:,1:]!=s[:,:-1]
+	start=np.maximum.accumulate(np.where(t,ids,0),axis=1)
+	t[:,:-1]=t[:,1:]
+	t[:,-1]=True
+	end=np.minimum.accumulate(np.where(t,ids,n-1)[:,::-1],axis=1)[:,::-1]
+	ans=np.empty(s.shape,dtype=float)
+	np.put_along_axis(ans,o,(start+end)/2.+1,axis=1)
+	return ans
+
+def _supernormalize(d):
+	from .stats import ndtri
+	return ndtri(rank(d)/(d.shape[1]+1))
+
+def supernormalize(d,out=None,cache=None,nrow=None,nth=0):
+	"""Supernormalizes each row of data, by converting its ranks to quantiles of the standard normal distribution.
+	Tied values receive the same output from their average rank. Rank r among ns samples is converted to quantile r/(ns+1).
+	Rows are processed in blocks in parallel threads.
+	d:	numpy.ndarray(n,ns) Data, e.g. gene expression levels with genes as rows and samples as columns.
+	out:	Output location as one of
+		None:	New numpy.ndarray.
+		numpy.ndarray(n,ns,dtype=ftype(='=f4' by default)), including numpy.memmap:	Written in place. Can be d itself.
+		str:	Path of a new .npy file, which is created and returned as numpy.memmap.
+	cache:	Directory to cache results in, keyed by hash of d. When a cached result exists, it is read into out
+		without recomputation, so the output type is the same as without caching. Default (None) disables caching.
+	nrow:	Number of rows per block. Default (None) chooses automatically.
+	nth:	Number of parallel threads. Default (0) indicates to use the number of cores.
+	Return:	numpy.ndarray(n,ns,dtype=ftype(='=f4' by default)) of supernormalized data.
+	ftype can be found in auto.py.
+	"""
+	import numpy as np
+	import os
+	from concurrent.futures import ThreadPoolExecutor
+	from .auto import ftype_np
+	from .util import datahash,nthread
+	if len(d.shape)!=2:
+		raise ValueError('Wrong input shape')
+	nth=nthread(nth)
+	n,ns=d.shape
+	if out is not None and not isinstance(out,str):
+		if not isinstance(out,np.ndarray) or out.dtype.char!=ftype_np:
+			raise ValueError('Wrong output dtype')
+		if out.shape!=d.shape:
+			raise ValueError('Wrong output shape')
+	ans=None
+	if cache is not None:
+		fcache=os.path.join(cache,'supernormalize-'+datahash(d)+'.npy')
+		if os.path.isfile(fcache):
+			ans=np.load(fcache,mmap_mode='r')
+			if ans.shape!=(n,ns):
+				raise ValueError('Wrong shape of cached result: '+fcache)
+	if out is None:
+		out=np.empty((n,ns),dtype=ftype_np)
+	elif isinstance(out,str):
+		out=np.lib.format.open_memmap(out,mode='w+',dtype=ftype_np,shape=(n,ns))
+	if ans is not None:
+		out[:]=ans
+		if isinstance(out,np.memmap):
+			out.flush()
+		return out
+	if nrow is None:
+		nrow=max(1,min(-(-n//nth),2**24//max(ns,1)))
+
+	def run(x):
+		v=np.asarray(d[x:x+nrow])
+		if np.isnan(v).any():
+			raise ValueError('NaN found.')
+		out[x:x+nrow]=_supernormalize(v)
+	with ThreadPoolExecutor(max_workers=nth) as e:
+		list(e.map(run,range(0,n,nrow)))
+	if isinstance(out,np.memmap):
+		out.flush()
+	if cache is not None:
+		if not os.path.isdir(cache):
+			os.makedirs(cache)
+		ftmp=fcache+'.'+str(os.getpid())+'.tmp.npy'
+		np.save(ftmp,out)
+		os.replace(ftmp,fcache)
+	return out
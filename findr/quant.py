@@ -0,0 +1,102 @@
+# Copyright 2016-2018, 2020 Lingfei Wang
+# 
+# This file is part of Findr.
+# 
+# Findr is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# Findr is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+# 
+# You should have received a copy of the GNU Affero General Public License
+# along with Findr.  If not, see <http://www.gnu.org/licenses/>.
+# 
+"""Reduced precision storage of probabilities in [0,1].
+Formats:
+	'f2':	float16, with relative precision 2**-11.
+	'u2':	uint16 fixed point, value=q/65535.
+	'u1':	uint8 fixed point, value=q/255.
+Fixed point values are rounded to the nearest level. Quantization preserves the order of values (ties may be introduced),
+so quantized priors give the same networks in netr_one_greedy up to ties.
+Outputs of pij functions can be quantized as they are computed with out_dtype of lib.blocks, the command line interface
+(python -m findr run) and findr.dist, which never hold full outputs in ftype. Pij functions called directly always
+return ftype, as their outputs are allocated for the library, and can be quantized afterwards with findr.quant.quantize.
+netr_one_greedy of the library converts quantized priors to a temporary ftype copy, unlike findr.netr.greedy.
+P-values of _pv functions are refused, because small P-values, which matter most, would be rounded to 0.
+For usage, see findr.quant.quantize and findr.quant.dequantize."""
+
+try: from exceptions import ValueError
+except ImportError: pass
+
+#Per format: (numpy dtype, number of fixed point levels or 0 for floating point)
+formats={'f2':('f2',0),'u2':('u2',65535),'u1':('u1',255)}
+
+def _format(fmt):
+	import numpy as np
+	f=np.dtype(fmt).str[1:]
+	if f not in formats:
+		raise ValueError('Unsupported reduced precision format: '+str(fmt))
+	return formats[f]
+
+def check(name,fmt):
+	"""Validates a reduced precision format for outputs of a pij function.
+	name:	Name of pij function.
+	fmt:	Format as one of findr.quant.formats or its numpy dtype, or None for ftype.
+	Raises ValueError for unsupported formats, or for P-values of _pv functions with any format."""
+	if fmt is None:
+		return
+	_format(fmt)
+	if name.endswith('_pv'):
+		raise ValueError('Reduced precision is not supported for P-values of '+name+'.')
+
+def quantizable(key,name=None):
+	"""Whether an output key of pij functions holds probabilities in [0,1], as opposed to log likelihood ratios.
+	name:	Name of pij function. Outputs of _pv functions are P-values and not quantizable. See findr.quant.check."""
+	if name is not None and name.endswith('_pv'):
+		return False
+	return not (key.startswith('llr') or key=='nv')
+
+def quantize(v,fmt,out=None):
+	"""Converts values in [0,1], such as probabilities, into reduced precision.
+	v:	numpy.ndarray of values in [0,1]. Values outside are clipped for fixed point formats.
+	fmt:	Format as one of findr.quant.formats or its numpy dtype.
+	out:	Output numpy.ndarray of the format and shape of v. Default (None) creates a new one.
+	Return:	numpy.ndarray of the format."""
+	import numpy as np
+	dtype,n=_format(fmt)
+	v=np.asarray(v)
+	if out is None:
+		out=np.empty(v.shape,dtype=dtype)
+	if n==0:
+		out[...]=v
+		return out
+	if v.ndim==0:
+		out[...]=np.rint(np.clip(v,0,1)*n)
+		return out
+	#Rounded in blocks of rows to bound temporary memory
+	k=max(1,2**22//max(1,int(np.prod(v.shape[1:]))))
+	for x in range(0,v.shape[0],k):
+		out[x:x+k]=np.rint(np.clip(v[x:x+k],0,1)*n)
+	return out
+
+def dequantize(q,dtype=None):
+	"""Converts reduced precision values back into floating point values.
+	q:	numpy.ndarray of a format in findr.quant.formats.
+	dtype:	Output data type. Default (None) indicates ftype.
+	Return:	numpy.ndarray of values. ftype can be found in auto.py."""
+	import numpy as np
+	from .auto import ftype_np
+	dtype=ftype_np if dtype is None else dtype
+	_,n=_format(q.dtype)
+	if n==0:
+		return q.astype(dtype)
+	return (q/np.array(n,dtype=dtype)).astype(dtype,copy=False)
+
+def resolution(fmt):
+	"""Maximum absolute rounding error of values in [0,1] in a format."""
+	_,n=_format(fmt)
+	return 0.5/n if n>0 else 2.**-12
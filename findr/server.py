@@ -0,0 +1,435 @@
+# Copyright 2016-2018, 2020 Lingfei Wang
+# 
+# This file is part of Findr.
+# 
+# Findr is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# Findr is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+# 
+# You should have received a copy of the GNU Affero General Public License
+# along with Findr.  If not, see <http://www.gnu.org/licenses/>.
+# 
+"""Long-lived local server of findr functions over a Unix domain socket.
+The server loads the library once and holds named datasets in shared memory, already converted to the required data types
+and checked for NaNs, so requests skip loading and conversion. Requests and replies are length-prefixed JSON messages,
+while arrays are passed through shared memory. Concurrent requests of the same P-value function and datasets, with the same
+parameters, are merged into one call over the union of their selected rows of A, and outputs are split back, as P-values
+of each A do not depend on other A. Other requests with selected rows are run separately on their own rows
+with the engine of the library instance, as row blocks of findr.blocks, so probabilities use histogram bounds
+of the selected rows.
+Calls are run by a fixed number of worker threads (one by default, which serializes them).
+Shared memory of replies is released by the client, or by the server when the client disconnects or times out.
+Requires python 3.8 or above for shared memory.
+For usage, see findr.server.server and findr.server.client.
+
+Example:
+	server: findr.server.server('/tmp/findr.sock').serve_forever()
+	client: c=findr.server.client('/tmp/findr.sock'); c.put('dg',dg,genotype=True); c.put('dt',dt); c.put('dt2',dt2)
+		a=c.run('pij_gassist','dg','dt','dt2',rows=[5])"""
+
+try: from exceptions import ValueError
+except ImportError: pass
+
+def _shm(name=None,create=False,size=0):
+	"""Opens shared memory without tracking by the resource tracker. Its owner unlinks it explicitly with findr.server._unlink."""
+	from multiprocessing import shared_memory
+	try:
+		return shared_memory.SharedMemory(name=name,create=create,size=size,track=False)
+	except TypeError:
+		from multiprocessing import resource_tracker
+		shm=shared_memory.SharedMemory(name=name,create=create,size=size)
+		resource_tracker.unregister(shm._name,'shared_memory')
+		return shm
+
+def _unlink(shm):
+	import sys
+	try:
+		shm.close()
+	except BufferError:
+		#Still in use by a running call. Memory is released when it finishes.
+		pass
+	if sys.version_info<(3,13):
+		#unlink also unregisters from the resource tracker in these versions
+		from multiprocessing import resource_tracker
+		resource_tracker.register(shm._name,'shared_memory')
+	shm.unlink()
+
+def _discard(names):
+	"""Unlinks shared memory of replies that may not have been released by the client. Those already unlinked are skipped."""
+	for x in names:
+		try:
+			shm=_shm(name=x)
+		except FileNotFoundError:
+			continue
+		_unlink(shm)
+
+def _release(desc):
+	"""Releases shared memory of pinned dataset."""
+	del desc['array']
+	_unlink(desc['shm'])
+
+def _share(d):
+	"""Copies array into new shared memory.
+	Return:	(shared memory,descriptor)"""
+	import numpy as np
+	shm=_shm(create=True,size=max(1,d.nbytes))
+	np.ndarray(d.shape,dtype=d.dtype,buffer=shm.buf)[...]=d
+	return (shm,{'shm':shm.name,'shape':list(d.shape),'dtype':d.dtype.str})
+
+def _attach(desc):
+	"""Attaches to shared memory of descriptor.
+	Return:	(shared memory,numpy.ndarray in shared memory)"""
+	import numpy as np
+	shm=_shm(name=desc['shm'])
+	return (shm,np.ndarray(tuple(desc['shape']),dtype=np.dtype(str(desc['dtype'])),buffer=shm.buf))
+
+def _send(sock,obj):
+	import json
+	import struct
+	s=json.dumps(obj).encode('utf-8')
+	sock.sendall(struct.pack('<Q',len(s))+s)
+
+def _recvn(sock,n):
+	buf=bytearray()
+	while len(buf)<n:
+		x=sock.recv(n-len(buf))
+		if not x:
+			if len(buf)==0:
+				return None
+			raise ValueError('Connection closed during message.')
+		buf+=x
+	return bytes(buf)
+
+def _recv(sock):
+	import json
+	import struct
+	h=_recvn(sock,8)
+	if h is None:
+		return None
+	return json.loads(_recvn(sock,struct.unpack('<Q',h)[0]).decode('utf-8'))
+
+class server:
+	"""Server of findr functions on pinned datasets."""
+	def __init__(self,path,l=None,window=0.001,nworker=1,timeout=None):
+		"""Creates server listening on Unix domain socket.
+		path:	Path of socket. Existing socket file is replaced.
+		l:	findr.lib instance. Default (None) creates one with default parameters.
+		window:	Time in seconds to wait for concurrent requests to merge after the first one arrives.
+		nworker:	Number of worker threads running calls. With one, calls are serialized, each using the threads of l (nth).
+			More workers run unmerged calls concurrently, e.g. for many small queries, sharing the cores.
+		timeout:	Time in seconds after which idle connections are closed, which releases shared memory of their last reply
+			if the client has not. Default (None) keeps connections open until the client disconnects."""
+		import os
+		import socket
+		import threading
+		import socketserver
+		try:
+			from queue import Queue
+		except ImportError:
+			from Queue import Queue
+		if l is None:
+			from . import lib
+			l=lib()
+		self.lib=l
+		self.window=window
+		self.path=path
+		self.datasets={}
+		self.lock=threading.Lock()
+		self.queue=Queue()
+		if os.path.exists(path):
+			os.remove(path)
+		parent=self
+		class handler(socketserver.BaseRequestHandler):
+			def handle(self):
+				#Shared memory of the last reply, released by the client before its next request
+				pending=[]
+				if timeout is not None:
+					self.request.settimeout(timeout)
+				try:
+					while True:
+						try:
+							req=_recv(self.request)
+						except socket.timeout:
+							req=None
+						_discard(pending)
+						pending=[]
+						if req is None:
+							break
+						try:
+							ans=parent.handle(req)
+						except Exception as e:
+							ans={'error':str(e)}
+						pending=[v['shm'] for v in ans.get('arrays',{}).values()]
+						_send(self.request,ans)
+						if req.get('op')=='shutdown':
+							threading.Thread(target=parent.shutdown).start()
+							break
+				finally:
+					_discard(pending)
+		class srv(socketserver.ThreadingMixIn,socketserver.UnixStreamServer):
+			daemon_threads=True
+		if nworker<=0:
+			raise ValueError('Wrong nworker')
+		self.srv=srv(path,handler)
+		self.workers=[threading.Thread(target=self._loop) for x in range(nworker)]
+		for x in self.workers:
+			x.daemon=True
+			x.start()
+	def serve_forever(self):
+		"""Serves requests until shutdown."""
+		import os
+		try:
+			self.srv.serve_forever()
+		finally:
+			self.srv.server_close()
+			for x in self.workers:
+				self.queue.put(None)
+			with self.lock:
+				for k in list(self.datasets):
+					_release(self.datasets.pop(k))
+			if os.path.exists(self.path):
+				os.remove(self.path)
+	def shutdown(self):
+		"""Stops serving. Datasets are released."""
+		self.srv.shutdown()
+	def pin(self,name,d,genotype=False):
+		"""Pins a dataset in shared memory.
+		name:	Name of dataset.
+		d:	numpy.ndarray of dataset.
+		genotype:	Whether dataset is genotypes, converted to gtype, instead of ftype for others."""
+		import numpy as np
+		from .auto import ftype_np,gtype_np
+		d=np.asarray(d).astype(gtype_np if genotype else ftype_np,copy=False)
+		if len(d.shape)!=2:
+			raise ValueError('Wrong input shape')
+		if not genotype and np.isnan(d).any():
+			raise ValueError('NaN found.')
+		shm,desc=_share(d)
+		desc['max']=int(d.max()) if genotype and d.size>0 else None
+		desc['genotype']=bool(genotype)
+		desc['array']=np.ndarray(d.shape,dtype=d.dtype,buffer=shm.buf)
+		desc['shm']=shm
+		with self.lock:
+			old=self.datasets.pop(name,None)
+			self.datasets[name]=desc
+		if old is not None:
+			_release(old)
+	def handle(self,req):
+		"""Handles a request.
+		req:	Request as dictionary with key op among put,load,drop,list,run,shutdown.
+		Return:	Reply as dictionary."""
+		op=req.get('op')
+		if op=='put':
+			shm,d=_attach(req)
+			try:
+				self.pin(req['name'],d,genotype=req.get('genotype',False))
+			finally:
+				del d
+				shm.close()
+			return {'ret':0}
+		if op=='load':
+			from .io import load
+			self.pin(req['name'],load(req['path'],dtype=req.get('dtype'),shape=req.get('shape')),genotype=req.get('genotype',False))
+			return {'ret':0}
+		if op=='drop':
+			d=self._dataset(req['name'])
+			with self.lock:
+				self.datasets.pop(req['name'],None)
+			_release(d)
+			return {'ret':0}
+		if op=='list':
+			with self.lock:
+				return {'ret':0,'datasets':dict((k,{'shm':v['shm'].name,'shape':v['shape'],'dtype':v['dtype'],'genotype':v['genotype']}) for k,v in self.datasets.items())}
+		if op=='run':
+			from concurrent.futures import Future
+			f=Future()
+			self.queue.put((req,f))
+			return f.result()
+		if op=='shutdown':
+			return {'ret':0}
+		raise ValueError('Unknown operation: '+str(op))
+	def _key(self,req):
+		"""Key of requests that can be merged, or None. Only P-value functions are merged."""
+		import json
+		from .blocks import methods
+		from .llr import methods as lmethods
+		ka=req.get('ka',{})
+		if req.get('rows') is None or req['func'] not in methods or lmethods[req['func']][1]!='pv':
+			return None
+		return json.dumps([req['func'],req['args'],ka],sort_keys=True)
+	def _loop(self):
+		import time
+		from collections import OrderedDict
+		try:
+			from queue import Empty
+		except ImportError:
+			from Queue import Empty
+		while True:
+			x=self.queue.get()
+			if x is None:
+				break
+			if self.window>0:
+				time.sleep(self.window)
+			items=[x]
+			stop=False
+			while True:
+				try:
+					y=self.queue.get_nowait()
+				except Empty:
+					break
+				if y is None:
+					stop=True
+					break
+				items.append(y)
+			groups=OrderedDict()
+			for req,f in items:
+				try:
+					self._fixka(req)
+					k=self._key(req)
+				except Exception as e:
+					f.set_result({'error':str(e)})
+					continue
+				groups.setdefault(k if k is not None else id(f),[]).append((req,f))
+			for v in groups.values():
+				try:
+					ans=self._run(v)
+				except Exception as e:
+					ans=[{'error':str(e)}]*len(v)
+				for (req,f),a in zip(v,ans):
+					f.set_result(a)
+			if stop:
+				break
+	def _dataset(self,name):
+		with self.lock:
+			if name not in self.datasets:
+				raise ValueError('Dataset not found: '+str(name))
+			return self.datasets[name]
+	def _fixka(self,req):
+		ka=req.setdefault('ka',{})
+		if 'gassist' in req['func'] and ka.get('na') is None:
+			d=self._dataset(req['args'][0])
+			if not d['genotype'] or not d['max']:
+				raise ValueError('Invalid genotype dataset')
+			ka['na']=d['max']
+	def _run(self,reqs):
+		"""Runs one merged call for a group of requests.
+		Return:	List of replies."""
+		import numpy as np
+		from .blocks import methods,outkeys,_call
+		req=reqs[0][0]
+		name=req['func']
+		ka=req['ka']
+		data=[self._dataset(x)['array'] for x in req['args']]
+		rows=[x[0].get('rows') for x in reqs]
+		if rows[0] is not None:
+			n=methods[name][0] if name in methods else len(data)
+			sizes=[len(x) for x in rows]
+			t=np.concatenate([np.asarray(x,dtype=int) for x in rows])
+			d=[np.take(x,t,axis=0) if i<n else x for i,x in enumerate(data)]
+		if rows[0] is None:
+			ans=getattr(self.lib,name)(*data,**ka)
+		elif name in methods:
+			#As a row block, locating diagonal entries of the rows among all A for nodiag
+			ans=_call(self.lib,name,d[:-1],data[-1],t,ka)
+		else:
+			ans=getattr(self.lib,name)(*d,**ka)
+		if rows[0] is None:
+			return [self._reply(ans)]
+		vk,mk=outkeys(name,ka)
+		rk=set(vk+mk)
+		replies=[]
+		start=0
+		for s in sizes:
+			replies.append(self._reply(dict((k,v[start:start+s] if k in rk else v) for k,v in ans.items())))
+			start+=s
+		return replies
+	def _reply(self,ans):
+		"""Encodes output of a function, with arrays in new shared memory owned by the client."""
+		import numpy as np
+		d={}
+		a={}
+		for k,v in ans.items():
+			if isinstance(v,np.ndarray):
+				shm,desc=_share(np.ascontiguousarray(v))
+				shm.close()
+				a[k]=desc
+			else:
+				d[k]=v.item() if hasattr(v,'item') else v
+		d['arrays']=a
+		return d
+
+class client:
+	"""Client of findr.server.server."""
+	def __init__(self,path):
+		"""Connects to server.
+		path:	Path of socket."""
+		import socket
+		self.sock=socket.socket(socket.AF_UNIX,socket.SOCK_STREAM)
+		self.sock.connect(path)
+	def __enter__(self):
+		return self
+	def __exit__(self,*a):
+		self.close()
+	def close(self):
+		"""Closes connection."""
+		self.sock.close()
+	def _call(self,req):
+		_send(self.sock,req)
+		ans=_recv(self.sock)
+		if ans is None:
+			raise ValueError('Connection closed by server.')
+		if 'error' in ans:
+			raise ValueError(ans['error'])
+		return ans
+	def put(self,name,d,genotype=False):
+		"""Pins a dataset on server, replacing any existing one of the same name.
+		name:	Name of dataset.
+		d:	numpy.ndarray of dataset.
+		genotype:	Whether dataset is genotypes."""
+		import numpy as np
+		shm,desc=_share(np.ascontiguousarray(d))
+		try:
+			desc.update({'op':'put','name':name,'genotype':bool(genotype)})
+			return self._call(desc)['ret']
+		finally:
+			_unlink(shm)
+	def load(self,name,path,genotype=False,dtype=None,shape=None):
+		"""Pins a dataset on server from data file read by the server. See findr.io.load for parameters."""
+		from numpy import dtype as npdtype
+		return self._call({'op':'load','name':name,'path':path,'genotype':bool(genotype),
+			'dtype':None if dtype is None else npdtype(dtype).str,'shape':None if shape is None else list(shape)})['ret']
+	def drop(self,name):
+		"""Releases a dataset on server."""
+		return self._call({'op':'drop','name':name})['ret']
+	def list(self):
+		"""Lists datasets on server.
+		Return:	dictionary from name to dictionary with keys shm, shape, dtype and genotype."""
+		return self._call({'op':'list'})['datasets']
+	def shutdown(self):
+		"""Stops server."""
+		return self._call({'op':'shutdown'})['ret']
+	def run(self,func,*args,**ka):
+		"""Runs a function of findr.lib on datasets of server.
+		func:	Name of function in findr.lib, e.g. 'pij_gassist'.
+		args:	Names of datasets as inputs of the function.
+		rows:	Indices of rows of A to compute, for pij functions. Default (None) computes all rows.
+		ka:	Other keyword arguments passed to the function. For gassist functions, na is set from the whole genotype dataset unless specified.
+		Return:	Output of the function, with arrays copied from shared memory."""
+		import numpy as np
+		rows=ka.pop('rows',None)
+		ans=self._call({'op':'run','func':func,'args':list(args),'rows':None if rows is None else [int(x) for x in rows],'ka':ka})
+		arrays=ans.pop('arrays')
+		for k,v in arrays.items():
+			shm,a=_attach(v)
+			try:
+				ans[k]=np.array(a)
+			finally:
+				del a
+				_unlink(shm)
+		return ans
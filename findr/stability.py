@@ -0,0 +1,177 @@
+# Copyright 2016-2018, 2020 Lingfei Wang
+# 
+# This file is part of Findr.
+# 
+# Findr is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# Findr is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+# 
+# You should have received a copy of the GNU Affero General Public License
+# along with Findr.  If not, see <http://www.gnu.org/licenses/>.
+# 
+"""Stability of pairwise probabilities and networks under resampling of samples.
+Inputs are converted once, and each replicate is gathered into a preallocated buffer, so replicates avoid repeated
+conversion and allocation of inputs. Concurrent replicates run in worker processes (findr.batch.pool), each receiving
+the inputs once and holding its own buffer and library with a share of the threads. Statistics are accumulated
+as replicates finish, without keeping outputs of each replicate.
+For usage, see findr.stability.run or lib.stability."""
+
+try: from exceptions import ValueError
+except ImportError: pass
+
+def resamples(ns,nrep,frac=0.8,replace=False,seed=None):
+	"""Generates sample indices of resampling replicates.
+	ns:	Number of samples.
+	nrep:	Number of replicates.
+	frac:	Fraction of samples in each replicate.
+	replace:	Whether to sample with replacement (bootstrap), or without (subsampling).
+	seed:	Random seed or numpy.random.RandomState.
+	Yield:	numpy.ndarray(int(frac*ns),dtype=int) of sample indices of each replicate, sorted for subsampling."""
+	import numpy as np
+	rs=seed if isinstance(seed,np.random.RandomState) else np.random.RandomState(seed)
+	n=int(frac*ns)
+	if n<=2 or n>ns and not replace:
+		raise ValueError('Wrong frac')
+	for x in range(nrep):
+		if replace:
+			yield rs.randint(0,ns,size=n)
+		else:
+			yield np.sort(rs.choice(ns,n,replace=False))
+
+def _replicate(self,name,data,buf,idx,key,net,ka):
+	"""Runs one replicate on samples idx gathered into buffers buf.
+	Return:	(output key,ret of the function,network or None,whether network reconstruction succeeded)"""
+	import numpy as np
+	for x,y in zip(data,buf):
+		np.take(x,idx,axis=1,out=y)
+	ans=getattr(self,name)(*buf,**ka)
+	v=ans[key]
+	if net is None:
+		return (v,ans['ret'],None,True)
+	g=self.netr_one_greedy(v[:,:v.shape[0]],**net)
+	#netr_one_greedy reports success as ret=True
+	return (v,ans['ret'],g['net'],g['ret'] is True)
+
+def _job(name,idx,key,net,ka):
+	"""Runs one replicate in a worker process of findr.batch.pool, with inputs and buffers held by the process."""
+	import numpy as np
+	from .batch import _worker
+	data=_worker['state']
+	if 'buf' not in _worker:
+		_worker['buf']=[np.empty((x.shape[0],len(idx)),dtype=x.dtype) for x in data]
+	return _replicate(_worker['lib'],name,data,_worker['buf'],idx,key,net,ka)
+
+def run(self,name,*data,**ka):
+	"""Runs a pij function on resampled samples repeatedly, and aggregates statistics of probabilities and networks.
+	self:	findr.lib instance. Resampling is seeded by its rs.
+	name:	Name of pij function in findr.lib.
+	data:	Input data of the function, with samples as columns.
+	nrep:	Number of replicates. Default: 50.
+	frac:	Fraction of samples in each replicate. Default: 0.8.
+	replace:	Whether to sample with replacement (bootstrap). Default: False.
+	key:	Output of the function to aggregate. Default: 'p'.
+	threshold:	Selection threshold. Pairs with output at least threshold in a replicate are selected. Default: 0.5.
+		For P-values, use negated outputs and threshold, or aggregate mean instead.
+	net:	Dictionary of keyword arguments of netr_one_greedy, to reconstruct a network in each replicate
+		from the output on the first nt targets, and aggregate its edge frequencies. Default (None) disables networks.
+	njob:	Number of replicates running concurrently, in worker processes (findr.batch.pool). Default: 1, which runs
+		replicates in this process with self.
+	nth:	Number of threads of the library for each concurrent replicate. Default (None) splits nth of self between njob.
+	progress:	Function called with the number of completed replicates after each replicate. Default (None) disables it.
+	ka:	Other keyword arguments passed to the function.
+	Return:	dictionary with following keys:
+	ret:	0 iff all replicates succeeded, the first nonzero return value of the function otherwise,
+		or 1 if network reconstruction failed.
+	mean:	numpy.ndarray(shape of output,dtype=ftype(='=f4' by default)). Mean of output over replicates.
+	sd:	numpy.ndarray(shape of output,dtype=ftype(='=f4' by default)). Standard deviation of output over replicates.
+	freq:	numpy.ndarray(shape of output,dtype=ftype(='=f4' by default)). Selection frequency, as fraction of replicates
+		with output at least threshold.
+	netfreq:	numpy.ndarray((nt,nt),dtype=ftype(='=f4' by default)). Fraction of replicates with each edge in the network,
+		only if net is set.
+	nrep:	Number of replicates.
+	ftype can be found in auto.py.
+
+	Example: a=l.stability('pij_gassist',dg,dt,dt2,nodiag=True,net={'namax':1000},njob=4)
+	"""
+	import numpy as np
+	from concurrent.futures import wait,FIRST_COMPLETED
+	from .auto import ftype_np,gtype_np
+	from .batch import pool,jobnth
+	nrep=int(ka.pop('nrep',50))
+	frac=ka.pop('frac',0.8)
+	replace=bool(ka.pop('replace',False))
+	key=ka.pop('key','p')
+	threshold=ka.pop('threshold',0.5)
+	net=ka.pop('net',None)
+	njob=int(ka.pop('njob',1))
+	nth=ka.pop('nth',None)
+	progress=ka.pop('progress',None)
+	if nrep<=0 or njob<=0:
+		raise ValueError('Wrong input parameter')
+	nth=jobnth(self,njob,nth)
+	if len(data)==0 or any(len(x.shape)!=2 for x in data):
+		raise ValueError('Wrong input shape')
+	ns=data[0].shape[1]
+	if any(x.shape[1]!=ns for x in data):
+		raise ValueError('Wrong input shape')
+	#Convert once. Genotype inputs are the first of gassist functions.
+	data=[np.asarray(x).astype(gtype_np if 'gassist' in name and i==0 else ftype_np,copy=False) for i,x in enumerate(data)]
+	if 'gassist' in name and ka.get('na') is None:
+		ka['na']=int(data[0].max())
+	rs=getattr(self,'rs',0)
+	idx=list(resamples(ns,nrep,frac=frac,replace=replace,seed=rs if rs else None))
+	n=len(idx[0])
+	state={'ret':0,'done':0,'s':None,'s2':None,'c':None,'cn':None}
+
+	def done(r):
+		v0,ret,g,ok=r
+		v=v0.astype(float)
+		nt=v.shape[0]
+		if state['s'] is None:
+			state['s']=np.zeros(v.shape)
+			state['s2']=np.zeros(v.shape)
+			state['c']=np.zeros(v.shape,dtype=np.int32)
+			if net is not None:
+				state['cn']=np.zeros((nt,nt),dtype=np.int32)
+		state['s']+=v
+		state['s2']+=v**2
+		state['c']+=v>=threshold
+		if net is not None:
+			state['cn']+=g
+		if state['ret']==0 and ret!=0:
+			state['ret']=int(ret)
+		if state['ret']==0 and not ok:
+			state['ret']=1
+		state['done']+=1
+		if progress is not None:
+			progress(state['done'])
+
+	if njob==1 and nth==getattr(self,'nth',0):
+		buf=[np.empty((x.shape[0],n),dtype=x.dtype) for x in data]
+		for i in range(nrep):
+			done(_replicate(self,name,data,buf,idx[i],key,net,ka))
+	else:
+		#Inputs are sent once to each process. At most two replicates per process are pending, to bound memory of outputs.
+		with pool(self,min(njob,nrep),nth,state=data) as e:
+			pending=set()
+			i=0
+			while i<nrep or len(pending)>0:
+				while i<nrep and len(pending)<2*njob:
+					pending.add(e.submit(_job,name,idx[i],key,net,ka))
+					i+=1
+				fin,pending=wait(pending,return_when=FIRST_COMPLETED)
+				for x in fin:
+					done(x.result())
+	mean=state['s']/nrep
+	ans={'ret':state['ret'],'nrep':nrep,'mean':mean.astype(ftype_np),
+		'sd':np.sqrt(np.clip(state['s2']/nrep-mean**2,0,None)).astype(ftype_np),
+		'freq':(state['c']/float(nrep)).astype(ftype_np)}
+	if net is not None:
+		ans['netfreq']=(state['cn']/float(nrep)).astype(ftype_np)
+	return ans
@@ -0,0 +1,128 @@
+# Copyright 2016-2018, 2020 Lingfei Wang
+# 
+# This file is part of Findr.
+# 
+# Findr is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# Findr is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+# 
+# You should have received a copy of the GNU Affero General Public License
+# along with Findr.  If not, see <http://www.gnu.org/licenses/>.
+# 
+"""Vectorized statistical functions.
+scipy is used when available, otherwise numpy-only implementations are used."""
+
+def lgamma(x):
+	"""Logarithm of gamma function, elementwise."""
+	import numpy as np
+	from math import lgamma as f
+	x=np.asarray(x,dtype=float)
+	u,ids=np.unique(x,return_inverse=True)
+	return np.array([f(y) for y in u],dtype=float)[ids].reshape(x.shape)
+
+def _betacf(a,b,x,itmax=10000,eps=1E-14):
+	"""Continued fraction for incomplete beta function by modified Lentz's method."""
+	import numpy as np
+	tiny=1E-300
+	qab=a+b
+	qap=a+1
+	qam=a-1
+	c=np.ones_like(x)
+	d=1-qab*x/qap
+	d[np.abs(d)<tiny]=tiny
+	d=1/d
+	h=d.copy()
+	for m in range(1,itmax+1):
+		m2=2*m
+		aa=m*(b-m)*x/((qam+m2)*(a+m2))
+		d=1+aa*d
+		d[np.abs(d)<tiny]=tiny
+		c=1+aa/c
+		c[np.abs(c)<tiny]=tiny
+		d=1/d
+		h*=d*c
+		aa=-(a+m)*(qab+m)*x/((a+m2)*(qap+m2))
+		d=1+aa*d
+		d[np.abs(d)<tiny]=tiny
+		c=1+aa/c
+		c[np.abs(c)<tiny]=tiny
+		d=1/d
+		de=d*c
+		h*=de
+		if (np.abs(de-1)<eps).all():
+			break
+	return h
+
+def betainc(a,b,x):
+	"""Regularized incomplete beta function I_x(a,b), elementwise with broadcasting.
+	a,b:	Positive parameters.
+	x:		Values in [0,1].
+	Return:	numpy.ndarray of float64."""
+	import numpy as np
+	try:
+		from scipy.special import betainc as f
+		return np.asarray(f(a,b,x),dtype=float)
+	except ImportError:
+		pass
+	a,b,x=[np.array(y,dtype=float) for y in np.broadcast_arrays(a,b,x)]
+	ans=np.zeros(x.shape,dtype=float)
+	ans[x>=1]=1
+	t=(x>0)&(x<1)
+	if not t.any():
+		return ans
+	a,b,x=a[t],b[t],x[t]
+	swap=x>(a+1)/(a+b+2)
+	aa=np.where(swap,b,a)
+	bb=np.where(swap,a,b)
+	xx=np.where(swap,1-x,x)
+	front=np.exp(lgamma(aa+bb)-lgamma(aa)-lgamma(bb)+aa*np.log(xx)+bb*np.log1p(-xx))/aa
+	v=front*_betacf(aa,bb,xx)
+	ans[t]=np.where(swap,1-v,v)
+	return ans
+
+def pv_r2(r2,n,k):
+	"""P-values of variance explained in linear models against the null of no association.
+	r2:	Fraction of variance explained, i.e. R^2.
+	n:	Number of samples.
+	k:	Number of parameters of the alternative model including intercept, e.g. 2 for correlation.
+	Return:	numpy.ndarray of P-values, as P(R^2>=r2) for R^2~Beta((k-1)/2,(n-k)/2)."""
+	import numpy as np
+	r2=np.clip(np.asarray(r2,dtype=float),0,1)
+	return betainc((np.asarray(n,dtype=float)-k)/2,(np.asarray(k,dtype=float)-1)/2,1-r2)
+
+def ndtri(p):
+	"""Inverse of standard normal cumulative distribution function, elementwise.
+	p:	Probabilities in (0,1).
+	Return:	numpy.ndarray of float64. Without scipy, Acklam's approximation with relative error below 1.2E-9 is used."""
+	import numpy as np
+	try:
+		from scipy.special import ndtri as f
+		return np.asarray(f(p),dtype=float)
+	except ImportError:
+		pass
+	a=[-3.969683028665376E1,2.209460984245205E2,-2.759285104469687E2,1.383577518672690E2,-3.066479806614716E1,2.506628277459239]
+	b=[-5.447609879822406E1,1.615858368580409E2,-1.556989798598866E2,6.680131188771972E1,-1.328068155288572E1]
+	c=[-7.784894002430293E-3,-3.223964580411365E-1,-2.400758277161838,-2.549732539343734,4.374664141464968,2.938163982698783]
+	d=[7.784695709041462E-3,3.224671290700398E-1,2.445134137142996,3.754408661907416]
+	p=np.asarray(p,dtype=float)
+	ans=np.empty(p.shape,dtype=float)
+	pl=0.02425
+	t=p<pl
+	q=np.sqrt(-2*np.log(p[t]))
+	ans[t]=(((((c[0]*q+c[1])*q+c[2])*q+c[3])*q+c[4])*q+c[5])/((((d[0]*q+d[1])*q+d[2])*q+d[3])*q+1)
+	t=p>1-pl
+	q=np.sqrt(-2*np.log1p(-p[t]))
+	ans[t]=-(((((c[0]*q+c[1])*q+c[2])*q+c[3])*q+c[4])*q+c[5])/((((d[0]*q+d[1])*q+d[2])*q+d[3])*q+1)
+	t=(p>=pl)&(p<=1-pl)
+	q=p[t]-0.5
+	r=q*q
+	ans[t]=(((((a[0]*r+a[1])*r+a[2])*r+a[3])*r+a[4])*r+a[5])*q/(((((b[0]*r+b[1])*r+b[2])*r+b[3])*r+b[4])*r+1)
+	ans[p<=0]=-np.inf
+	ans[p>=1]=np.inf
+	return ans
@@ -0,0 +1,166 @@
+# Copyright 2016-2018, 2020 Lingfei Wang
+# 
+# This file is part of Findr.
+# 
+# Findr is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# Findr is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+# 
+# You should have received a copy of the GNU Affero General Public License
+# along with Findr.  If not, see <http://www.gnu.org/licenses/>.
+# 
+"""Symmetric evaluation of pij_rank_pv and pij_rank when targets (dt2) are identical with A (dt), as in co-expression.
+Correlations, LLRs and P-values of A--B are then symmetric, so only the upper triangle is computed,
+in row blocks of A against the remaining targets, for about half of the computation.
+P-values can be returned in packed storage of the upper triangle (including the diagonal) in row-major order,
+as numpy.triu_indices, for about half of the memory. Probabilities of pij_rank are converted per A
+from the full row of LLRs, so they are not symmetric and always returned in full.
+For usage, see parameter symmetric of pij_rank_pv and pij_rank."""
+
+try: from exceptions import ValueError
+except ImportError: pass
+
+def same(dt,dt2):
+	"""Whether targets are identical with A, as the same object or the same view of the same memory.
+	Contents are not compared, so equal copies are not detected.
+	dt:	Expression data of A.
+	dt2:	Expression data of B, or findr.panel.panel.
+	Return:	bool"""
+	import numpy as np
+	from .panel import unwrap
+	dt2=unwrap(dt2)[0]
+	if dt2 is dt:
+		return True
+	if not (isinstance(dt,np.ndarray) and isinstance(dt2,np.ndarray)):
+		return False
+	return dt.dtype==dt2.dtype and dt.__array_interface__==dt2.__array_interface__
+
+def offsets(nt):
+	"""Offsets of each row in packed storage of upper triangle of (nt,nt) matrix, including the diagonal.
+	Return:	numpy.ndarray(nt+1,dtype=int), where row i occupies [offsets[i],offsets[i+1])."""
+	import numpy as np
+	i=np.arange(nt+1)
+	return i*nt-i*(i-1)//2
+
+def index(i,j,nt):
+	"""Positions of entries (i,j) in packed storage of upper triangle of (nt,nt) symmetric matrix. Entries can be in either triangle.
+	i,j:	Row and column indices, as int or numpy.ndarray.
+	Return:	Positions with the same shape as i and j."""
+	import numpy as np
+	i,j=np.minimum(i,j),np.maximum(i,j)
+	return i*nt-i*(i-1)//2+j-i
+
+def pack(d):
+	"""Packs upper triangle of square matrix including the diagonal, in row-major order.
+	d:	numpy.ndarray((nt,nt))
+	Return:	numpy.ndarray(nt*(nt+1)//2,dtype=d.dtype)"""
+	import numpy as np
+	d=np.asarray(d)
+	if len(d.shape)!=2 or d.shape[0]!=d.shape[1]:
+		raise ValueError('Wrong input shape')
+	nt=d.shape[0]
+	off=offsets(nt)
+	ans=np.empty(off[-1],dtype=d.dtype)
+	for i in range(nt):
+		ans[off[i]:off[i+1]]=d[i,i:]
+	return ans
+
+def unpack(v,nt=None,out=None):
+	"""Recovers full symmetric matrix from packed storage of upper triangle.
+	v:	numpy.ndarray(nt*(nt+1)//2), as from findr.sym.pack or symmetric mode with packed=True.
+	nt:	Size of matrix. Default (None) determines it from length of v.
+	out:	numpy.ndarray((nt,nt)) to write the output into, e.g. a memory map. Default (None) allocates a new one.
+	Return:	numpy.ndarray((nt,nt),dtype=v.dtype)"""
+	import numpy as np
+	v=np.asarray(v)
+	if nt is None:
+		nt=int((np.sqrt(8*len(v)+1)-1)/2+0.5)
+	off=offsets(nt)
+	if len(v.shape)!=1 or len(v)!=off[-1]:
+		raise ValueError('Wrong input shape')
+	if out is None:
+		out=np.empty((nt,nt),dtype=v.dtype)
+	elif out.shape!=(nt,nt):
+		raise ValueError('Wrong output shape')
+	for i in range(nt):
+		out[i,i:]=v[off[i]:off[i+1]]
+		out[i+1:,i]=v[off[i]+1:off[i+1]]
+	return out
+
+def _nrow(nt,nbyte):
+	return max(1,min(nt,nbyte//(8*max(nt,1))))
+
+def _upper(blocks,nt,keys,dtype,packed=True):
+	"""Assembles upper triangles from outputs of row blocks against remaining targets.
+	blocks:	Iterator of (start,stop,ans), where ans[k] for k in keys has shape (stop-start,nt-start).
+	packed:	Whether to assemble packed storage, or full symmetric matrices with each block written directly into both triangles.
+	Return:	dictionary of outputs for keys, and ret."""
+	import numpy as np
+	off=offsets(nt)
+	ans={'ret':0}
+	for k in keys:
+		ans[k]=np.empty(off[-1] if packed else (nt,nt),dtype=dtype)
+	for start,stop,v in blocks:
+		if ans['ret']==0 and int(v.get('ret',0))!=0:
+			ans['ret']=int(v['ret'])
+		n=stop-start
+		t=np.arange(nt-start)[None,:]>=np.arange(n)[:,None]
+		for k in keys:
+			x=np.asarray(v[k])
+			if packed:
+				ans[k][off[start]:off[stop]]=x[t]
+				continue
+			#Upper triangle of the diagonal square is mirrored, as with findr.sym.unpack
+			y=ans[k]
+			y[start:stop,start:]=x
+			y[stop:,start:stop]=x[:,n:].T
+			s=y[start:stop,start:stop]
+			i=np.tril_indices(n,-1)
+			s[i]=s.T[i]
+	return ans
+
+def rank_pv(self,dt,memlimit=-1,return_llr=False,packed=False,nbyte=2**26):
+	"""Symmetric mode of pij_rank_pv with dt2 identical with dt. Only the upper triangle is computed, by calling pij_rank_pv
+	of the engine of findr.lib in row blocks against remaining targets, so P-values are identical with a full call.
+	self:	findr.lib instance.
+	dt:	numpy.ndarray(nt,ns,dtype=ftype(='=f4' by default)) Gene expression data, as both A and B.
+	memlimit,return_llr:	See pij_rank_pv.
+	packed:	Whether to return outputs in packed storage of upper triangle. See findr.sym.unpack.
+	nbyte:	Approximate size in bytes of outputs of each row block, which determines the number of rows per block.
+	Return:	dictionary as pij_rank_pv, where p (and llr) are numpy.ndarray(nt*(nt+1)//2) if packed.
+	"""
+	from .auto import ftype_np
+	nt=dt.shape[0]
+	nrow=_nrow(nt,nbyte)
+	keys=['p','llr'] if return_llr else ['p']
+	blocks=((x,min(x+nrow,nt),self.pij_rank_pv(dt[x:x+nrow],dt[x:],memlimit=memlimit,return_llr=return_llr,symmetric=False))
+		for x in range(0,nt,nrow))
+	return _upper(blocks,nt,keys,ftype_np,packed=packed)
+
+def rank(self,dt,nodiag=False,return_llr=False,nsample=None,nbyte=2**26):
+	"""Symmetric mode of pij_rank with dt2 identical with dt. LLRs of the upper triangle are computed by findr.llr.compute in row blocks
+	against remaining targets, and filled into the lower triangle. They are converted into probabilities of each A
+	from its full row by findr.llr.convert, as in the NumPy engine (findr.backend).
+	self:	findr.lib instance. Sampling of targets with nsample is seeded by its rs.
+	dt:	numpy.ndarray(nt,ns,dtype=ftype(='=f4' by default)) Gene expression data, as both A and B.
+	nodiag,return_llr,nsample:	See pij_rank.
+	nbyte:	Approximate size in bytes of LLRs of each row block, which determines the number of rows per block.
+	Return:	dictionary as pij_rank.
+	"""
+	from .auto import ftype_np
+	from .llr import compute,convert
+	nt,ns=dt.shape
+	nrow=_nrow(nt,nbyte)
+	blocks=((x,min(x+nrow,nt),compute('pij_rank',dt[x:x+nrow],dt[x:],nbyte=nbyte)) for x in range(0,nt,nrow))
+	d={'llr':_upper(blocks,nt,['llr'],ftype_np,packed=False)['llr']}
+	rs=getattr(self,'rs',0)
+	ans=convert('pij_rank',d,ns,nodiag=nodiag,nsample=nsample,seed=rs if rs else None)
+	if return_llr:
+		ans.update(d)
+	return ans
@@ -0,0 +1,72 @@
+# Copyright 2016-2018, 2020 Lingfei Wang
+# 
+# This file is part of Findr.
+# 
+# Findr is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# Findr is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+# 
+# You should have received a copy of the GNU Affero General Public License
+# along with Findr.  If not, see <http://www.gnu.org/licenses/>.
+# 
+"""Utility functions."""
+
+try: from exceptions import ValueError
+except ImportError: pass
+
+def datahash(d,nbyte=2**26):
+	"""Computes hash of array content, shape and dtype, reading nbyte bytes at a time.
+	d:	numpy.ndarray or any object convertible to it, including memory maps.
+	Return:	Hexadecimal hash string."""
+	import hashlib
+	import numpy as np
+	d=np.asarray(d)
+	h=hashlib.sha1()
+	h.update(str((d.shape,d.dtype.str)).encode())
+	if d.ndim==0 or d.shape[0]==0:
+		h.update(np.ascontiguousarray(d).tobytes())
+		return h.hexdigest()
+	n=max(1,nbyte//max(1,d[0].nbytes))
+	for x in range(0,d.shape[0],n):
+		h.update(np.ascontiguousarray(d[x:x+n]).data)
+	return h.hexdigest()
+
+def inputhash(d):
+	"""Computes an identity hash of an input for checkpoints, without unpacking or rereading files.
+	Memory maps of whole files are identified by path, size, modification time and layout rather than content.
+	findr.plink.packedg is identified by its packed data, shape, sample indices and missing value.
+	Other inputs are hashed by content with findr.util.datahash.
+	d:	numpy.ndarray, numpy.memmap or findr.plink.packedg.
+	Return:	Hexadecimal hash string."""
+	import os
+	import mmap
+	import hashlib
+	import numpy as np
+	from .plink import packedg
+	h=hashlib.sha1()
+	if isinstance(d,packedg):
+		h.update(str(('packedg',d.shape,d.nsall,d.missing)).encode())
+		h.update(inputhash(d.data).encode())
+		if d.samples is not None:
+			h.update(np.ascontiguousarray(d.samples).tobytes())
+		return h.hexdigest()
+	if isinstance(d,np.memmap) and getattr(d,'filename',None) and isinstance(d.base,mmap.mmap):
+		st=os.stat(d.filename)
+		h.update(str(('file',os.path.abspath(d.filename),st.st_size,st.st_mtime_ns,d.offset,d.shape,d.dtype.str,d.strides)).encode())
+		return h.hexdigest()
+	return datahash(d)
+
+def nthread(nth):
+	"""Number of threads to use, where 0 indicates the number of cores."""
+	import os
+	if nth<0:
+		raise ValueError('Wrong number of threads')
+	if nth==0:
+		return os.cpu_count() or 1
+	return nth
@@ -26,13 +26,14 @@ def pkg_setup():
 		download_url=url,
 		include_package_data=True,
 		install_requires=['numpy'],
+		#Module attribute access of optional submodules requires python 3.7, and findr.server requires 3.8 for shared memory.
+		python_requires='>=3.7',
 		classifiers=['Development Status :: 5 - Production/Stable',
 			'License :: OSI Approved :: GNU Affero General Public License v3',
 			'Environment :: Console',
 			'Intended Audience :: End Users/Desktop',
 			'Intended Audience :: Science/Research',
 			'Operating System :: OS Independent',
-			'Programming Language :: Python :: 2',
 			'Programming Language :: Python :: 3',
 			'Topic :: Scientific/Engineering :: Bio-Informatics',
 			'Topic :: Software Development :: User Interfaces'],
@@ -0,0 +1,29 @@
+# Copyright 2016-2018, 2020 Lingfei Wang
+# 
+# This file is part of Findr.
+# 
+# Findr is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# Findr is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+# 
+# You should have received a copy of the GNU Affero General Public License
+# along with Findr.  If not, see <http://www.gnu.org/licenses/>.
+# 
+"""Shared fixtures of tests."""
+
+import pytest
+import findr
+
+@pytest.fixture(scope='session')
+def clib():
+	"""findr.lib of the library (C engine), or skips the test if the library is not available."""
+	try:
+		return findr.lib(loglv=3,rs=1)
+	except OSError:
+		pytest.skip('findr library not available')
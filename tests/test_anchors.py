@@ -0,0 +1,72 @@
+# Copyright 2016-2018, 2020 Lingfei Wang
+# 
+# This file is part of Findr.
+# 
+# Findr is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# Findr is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+# 
+# You should have received a copy of the GNU Affero General Public License
+# along with Findr.  If not, see <http://www.gnu.org/licenses/>.
+# 
+"""Tests of findr.anchors: best cis-eQTL selection."""
+
+import numpy as np
+import pytest
+from findr import anchors
+
+def _data(nv=300,ng=40,ns=80):
+	r=np.random.RandomState(0)
+	dg=r.randint(0,3,size=(nv,ns)).astype('u1')
+	gpos=(['1']*(nv//2)+['2']*(nv-nv//2),np.r_[np.arange(nv//2),np.arange(nv-nv//2)]*10000)
+	#Gene i is next to variant 7*i and driven by it for even i
+	snp=7*np.arange(ng)
+	tpos=([gpos[0][x] for x in snp],gpos[1][snp])
+	dt=r.randn(ng,ns)
+	dt[::2]+=dg[snp[::2]]
+	return (dg,dt.astype('f4'),gpos,tpos,snp)
+
+def test_best():
+	dg,dt,gpos,tpos,snp=_data()
+	a=anchors.best(dg,dt,gpos,tpos,window=50000)
+	assert set(range(0,40,2))<=set(a['gene'].tolist())
+	t=a['gene']%2==0
+	assert (a['snp'][t]==snp[a['gene'][t]]).all()
+	assert (a['dg']==dg[a['snp']]).all() and (a['dt']==dt[a['gene']]).all()
+	assert (a['padj']>=a['p']).all() and (a['padj']<=1E-5).all()
+	#Tiles within a small memory limit and threads give the same results
+	b=anchors.best(dg,dt,gpos,tpos,window=50000,memlimit=2**16,nth=3)
+	assert all((a[k]==b[k]).all() for k in ['gene','snp','dg','dt'])
+	assert np.allclose(a['p'],b['p'],rtol=1E-4) and np.allclose(a['r2'],b['r2'],rtol=1E-4)
+
+def test_pvalue():
+	stats=pytest.importorskip('scipy.stats')
+	dg,dt,gpos,tpos,snp=_data()
+	a=anchors.best(dg,dt,gpos,tpos,window=50000,pv=1,adjust=False)
+	for g,v,p in zip(a['gene'][:5],a['snp'][:5],a['p'][:5]):
+		assert np.isclose(p,stats.linregress(dg[v].astype(float),dt[g].astype(float)).pvalue,rtol=1E-3)
+
+def test_window():
+	dg,dt,gpos,tpos,snp=_data()
+	#Variants outside windows, or on other chromosomes, are not anchors
+	a=anchors.best(dg,dt,gpos,tpos,window=0,pv=1,adjust=False)
+	assert (a['snp']==snp[a['gene']]).all()
+	tpos=(['3']*len(tpos[0]),tpos[1])
+	assert len(anchors.best(dg,dt,gpos,tpos,pv=1)['gene'])==0
+
+def test_categorical():
+	dg,dt,gpos,tpos,snp=_data()
+	a=anchors.best(dg,dt,gpos,tpos,window=50000,model='categorical',pv=1E-3)
+	assert set(range(0,40,2))<=set(a['gene'].tolist())
+	stats=pytest.importorskip('scipy.stats')
+	g,v=a['gene'][0],a['snp'][0]
+	x=dt[g].astype(float)
+	assert np.isclose(a['p'][0],stats.f_oneway(*[x[dg[v]==k] for k in range(3)]).pvalue,rtol=1E-3)
+	with pytest.raises(ValueError):
+		anchors.best(dg,dt,gpos,tpos,model='unknown')
@@ -0,0 +1,62 @@
+# Copyright 2016-2018, 2020 Lingfei Wang
+# 
+# This file is part of Findr.
+# 
+# Findr is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# Findr is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+# 
+# You should have received a copy of the GNU Affero General Public License
+# along with Findr.  If not, see <http://www.gnu.org/licenses/>.
+# 
+"""Tests of findr.backend: the NumPy engine against the library, and conformance checks."""
+
+import numpy as np
+import pytest
+import findr
+from findr.backend import conformance
+
+def _clib():
+	try:
+		return findr.lib(loglv=3,rs=1)
+	except OSError:
+		return None
+
+def test_numpy_vs_c(clib):
+	ans=conformance(findr.lib(backend='numpy',rs=1),clib)
+	assert ans['ret']==0,ans
+
+def test_self_conformance():
+	l=findr.lib(backend='numpy',rs=1)
+	ans=conformance(l,findr.lib(backend='numpy',rs=1))
+	assert ans['ret']==0
+	assert all(x==0 for v in ans['diff'].values() for x in v.values())
+
+def test_conformance_detects_shift():
+	"""A small systematic change of probabilities fails conformance."""
+	l=findr.lib(backend='numpy',rs=1)
+	b=findr.lib(backend='numpy',rs=1)
+	f=b.pij_gassist
+	def shifted(*a,**ka):
+		ans=f(*a,**ka)
+		ans['p']=np.clip(ans['p']+0.005,0,1)
+		return ans
+	b.pij_gassist=shifted
+	ans=conformance(l,b,names=['pij_gassist'])
+	assert ans['ret']!=0 and not ans['passed']['pij_gassist']
+
+def test_one_greedy_ret():
+	l=findr.lib(backend='numpy')
+	dp=np.random.RandomState(0).rand(10,10).astype('f4')
+	v=l.netr_one_greedy(dp,namax=20)
+	assert v['ret'] is True and v['net'].sum()==20
+	c=_clib()
+	if c is not None:
+		w=c.netr_one_greedy(dp,namax=20)
+		assert w['ret']==v['ret'] and (w['net']==v['net']).all()
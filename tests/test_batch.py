@@ -0,0 +1,61 @@
+# Copyright 2016-2018, 2020 Lingfei Wang
+# 
+# This file is part of Findr.
+# 
+# Findr is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# Findr is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+# 
+# You should have received a copy of the GNU Affero General Public License
+# along with Findr.  If not, see <http://www.gnu.org/licenses/>.
+# 
+"""Tests of findr.batch: concurrent problems give the outputs of separate calls."""
+
+import numpy as np
+import findr
+
+def _data():
+	r=np.random.RandomState(0)
+	dg=r.randint(0,3,(10,60)).astype('u1')
+	dt=(r.randn(10,60)+dg).astype('f4')
+	dt2=r.randn(25,60).astype('f4')
+	return (dg,dt,dt2,np.repeat(['a','b','c'],20))
+
+def test_groups_equal_calls():
+	dg,dt,dt2,g=_data()
+	l=findr.lib(backend='numpy',rs=3)
+	ans=l.batch('pij_gassist',dg,dt,dt2,groups=g,njob=1,nodiag=True)
+	assert ans['ret']==0 and ans['labels']==['a','b','c']
+	for k in ans['labels']:
+		t=g==k
+		v=l.pij_gassist(dg[:,t],dt[:,t],dt2[:,t],na=2,nodiag=True)
+		assert np.abs(ans['results'][k]['p']-v['p']).max()==0
+
+def test_processes():
+	dg,dt,dt2,g=_data()
+	l=findr.lib(backend='numpy',rs=3,nth=4)
+	a=l.batch('pij_gassist',dg,dt,dt2,groups=g,njob=1)
+	b=l.batch('pij_gassist',dg,dt,dt2,groups=g,njob=3)
+	assert b['ret']==0 and l.nth==4
+	for k in a['labels']:
+		assert np.abs(a['results'][k]['p']-b['results'][k]['p']).max()==0
+
+def test_jobnth():
+	from findr.batch import jobnth
+	l=findr.lib(backend='numpy',nth=8)
+	assert jobnth(l,1)==8 and jobnth(l,3)==2 and jobnth(l,16)==1 and jobnth(l,3,5)==5
+
+def test_c(clib):
+	dg,dt,dt2,g=_data()
+	ans=clib.batch('pij_gassist',dg,dt,dt2,groups=g,njob=2,nodiag=True)
+	assert ans['ret']==0
+	for k in ans['labels']:
+		t=g==k
+		v=clib.pij_gassist(dg[:,t],dt[:,t],dt2[:,t],na=2,nodiag=True)
+		assert np.abs(ans['results'][k]['p']-v['p']).max()==0
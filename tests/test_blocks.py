@@ -0,0 +1,146 @@
+# Copyright 2016-2018, 2020 Lingfei Wang
+# 
+# This file is part of Findr.
+# 
+# Findr is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# Findr is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+# 
+# You should have received a copy of the GNU Affero General Public License
+# along with Findr.  If not, see <http://www.gnu.org/licenses/>.
+# 
+"""Tests of findr.blocks: row blocks equal calls of the engine on the same rows."""
+
+import os
+import numpy as np
+import pytest
+import findr
+
+def _data(nt=12,nt2=30,ns=40,seed=0):
+	r=np.random.RandomState(seed)
+	dg=r.randint(0,3,(nt,ns)).astype('u1')
+	dt=(r.randn(nt,ns)+dg).astype('f4')
+	dt2=r.randn(nt2,ns).astype('f4')
+	dt2[:nt]+=dt
+	return (dg,dt,dt2)
+
+def _diff(a,b):
+	return max(np.abs(a[k]-b[k]).max() for k in a if k!='ret')
+
+@pytest.fixture
+def l():
+	return findr.lib(backend='numpy',rs=3)
+
+@pytest.mark.parametrize('name',['pij_rank','pij_gassist','pijs_gassist','pijs_gassist_pv','pij_cassist','pijs_cassist_pv'])
+def test_single_block_equals_call(l,name):
+	dg,dt,dt2=_data()
+	d=[dt,dt2] if 'rank' in name else ([dg,dt,dt2] if 'gassist' in name else [dt,dt,dt2])
+	ka={} if name.endswith('_pv') else {'nodiag':True}
+	assert _diff(getattr(l,name)(*d,**ka),l.blocks(name,*d,nrow=len(dt),**ka))==0
+
+@pytest.mark.parametrize('name',['pij_rank','pijs_gassist','pijs_gassist_pv'])
+def test_block_equals_call_on_rows(l,name):
+	dg,dt,dt2=_data()
+	d=[dt,dt2] if 'rank' in name else [dg,dt,dt2]
+	ka={} if 'rank' in name else {'na':2}
+	ans=l.blocks(name,*d,nrow=5,**ka)
+	sub=getattr(l,name)(*([x[5:10] for x in d[:-1]]+[dt2]),**ka)
+	assert _diff(sub,dict((k,ans[k][5:10]) for k in sub if k!='ret'))==0
+
+@pytest.mark.parametrize('name',['pij_rank','pijs_gassist','pijs_gassist_pv'])
+def test_c_block_equals_call_on_rows(clib,name):
+	dg,dt,dt2=_data()
+	d=[dt,dt2] if 'rank' in name else [dg,dt,dt2]
+	ka={} if 'rank' in name else {'na':2}
+	ans=clib.blocks(name,*d,nrow=5,**ka)
+	sub=getattr(clib,name)(*([x[5:10] for x in d[:-1]]+[dt2]),**ka)
+	assert _diff(sub,dict((k,ans[k][5:10]) for k in sub if k!='ret'))==0
+
+@pytest.mark.parametrize('name',['pij_gassist','pijs_gassist_pv'])
+def test_numpy_vs_c(clib,l,name):
+	dg,dt,dt2=_data()
+	ka={} if name.endswith('_pv') else {'nodiag':True}
+	a=l.blocks(name,dg,dt,dt2,nrow=5,**ka)
+	b=clib.blocks(name,dg,dt,dt2,nrow=5,**ka)
+	assert _diff(a,b)<=(1E-4 if name.endswith('_pv') else 0.02)
+
+def test_pv_independent_of_nrow(l):
+	dg,dt,dt2=_data()
+	assert _diff(l.pijs_gassist_pv(dg,dt,dt2),l.blocks('pijs_gassist_pv',dg,dt,dt2,nrow=5))==0
+
+@pytest.mark.parametrize('name',['pij_rank','pijs_gassist'])
+def test_nodiag_reorder_equals_rows(l,name):
+	"""Targets reordered for the library's nodiag give the same outputs as locating diagonal entries by row."""
+	dg,dt,dt2=_data()
+	d=[dt,dt2] if 'rank' in name else [dg,dt,dt2]
+	a=l.blocks(name,*d,nrow=5,nodiag=True)
+	l.backend='c'
+	b=l.blocks(name,*d,nrow=5,nodiag=True)
+	assert _diff(a,b)==0
+
+def test_checkpoint_resume(l,tmp_path):
+	dg,dt,dt2=_data()
+	a=l.blocks('pij_gassist',dg,dt,dt2,nrow=5,path=str(tmp_path))
+	b=l.blocks('pij_gassist',dg,dt,dt2,nrow=5,path=str(tmp_path))
+	assert a['ret']==0 and _diff(a,b)==0
+	with pytest.raises(ValueError):
+		l.blocks('pij_gassist',dg,dt,dt2,nrow=4,path=str(tmp_path))
+
+def test_inputhash(tmp_path):
+	from findr.util import inputhash
+	from findr.plink import packedg
+	dt=_data()[1]
+	f=str(tmp_path/'dt.npy')
+	findr.io.save(f,dt)
+	m=findr.io.load(f)
+	assert inputhash(m)==inputhash(findr.io.load(f))
+	assert inputhash(m)!=inputhash(dt)
+	r=np.random.RandomState(0)
+	p=r.randint(0,256,(10,10)).astype('u1')
+	assert inputhash(packedg(p,40))!=inputhash(packedg(p,40,samples=np.arange(40)))
+	assert inputhash(packedg(p,40,samples=np.arange(40)))==inputhash(packedg(p.copy(),40,samples=np.arange(40)))
+
+def test_nsample_seed(tmp_path):
+	"""Without rs, a random seed is fixed for the run and reused when resuming from its checkpoint."""
+	import json
+	l=findr.lib(backend='numpy')
+	dg,dt,dt2=_data(nt2=200)
+	a=l.blocks('pij_gassist',dg,dt,dt2,nrow=5,nsample=50,path=str(tmp_path))
+	with open(str(tmp_path/'manifest.json')) as f:
+		seed=json.load(f)['parameters']['seed']
+	b=l.blocks('pij_gassist',dg,dt,dt2,nrow=5,nsample=50,seed=seed)
+	assert a['ret']==0 and _diff(a,b)==0
+	os.remove(str(tmp_path/'block-0-5.npz'))
+	c=l.blocks('pij_gassist',dg,dt,dt2,nrow=5,nsample=50,path=str(tmp_path))
+	assert _diff(a,c)==0
+
+def test_nsample_library_only_numpy():
+	from findr import pij
+	dt,dt2=_data()[1:]
+	with pytest.raises(ValueError):
+		pij.rank(findr.lib(backend='numpy'),dt,dt2,nsample=10)
+
+def test_progress_cancel(l,tmp_path):
+	import io
+	import threading
+	dg,dt,dt2=_data()
+	infos=[]
+	l.blocks('pij_gassist',dg,dt,dt2,nrow=5,progress=infos.append)
+	assert [x['done'] for x in infos]==[0,5,10,12] and all(x['total']==12 for x in infos)
+	f=io.StringIO()
+	findr.blocks.printprogress(infos[-1],file=f)
+	assert '12/12 rows' in f.getvalue()
+	#Cancelled after the first block, then resumed from its checkpoint
+	e=threading.Event()
+	a=l.blocks('pij_gassist',dg,dt,dt2,nrow=5,path=str(tmp_path),cancel=e,progress=lambda x:x['done']>0 and e.set())
+	assert a['ret']==-1 and a['done'].tolist()==[True]*5+[False]*7
+	infos=[]
+	b=l.blocks('pij_gassist',dg,dt,dt2,nrow=5,path=str(tmp_path),progress=infos.append)
+	assert b['ret']==0 and [x['done'] for x in infos]==[5,10,12]
+	assert _diff(b,l.blocks('pij_gassist',dg,dt,dt2,nrow=5))==0
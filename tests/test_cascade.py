@@ -0,0 +1,62 @@
+# Copyright 2016-2018, 2020 Lingfei Wang
+# 
+# This file is part of Findr.
+# 
+# Findr is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# Findr is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+# 
+# You should have received a copy of the GNU Affero General Public License
+# along with Findr.  If not, see <http://www.gnu.org/licenses/>.
+# 
+"""Tests of findr.cascade: pruned evaluation of the tests of pijs functions."""
+
+import numpy as np
+import findr
+
+def _data():
+	r=np.random.RandomState(0)
+	dg=r.randint(0,3,(10,80)).astype('u1')
+	dt=(r.randn(10,80)+dg).astype('f4')
+	dt2=r.randn(60,80).astype('f4')
+	dt2[:10]+=dt
+	dt2[10:20]+=dt
+	return (dg,dt,dt2)
+
+def test_pv_equals_pijs():
+	"""P-values of passing pairs equal those of pijs_gassist_pv, and all passing pairs are found."""
+	dg,dt,dt2=_data()
+	l=findr.lib(backend='numpy',rs=1)
+	tests=[(2,0.01),(4,0.05)]
+	a=l.cascade('pijs_gassist_pv',dg,dt,dt2,tests=tests,nbyte=2**14)
+	v=l.pijs_gassist_pv(dg,dt,dt2)
+	ok=(v['p2']<=0.01)&(v['p4']<=0.05)
+	assert set(zip(a['row'],a['col']))==set(zip(*np.nonzero(ok)))
+	assert np.abs(a['p2']-v['p2'][a['row'],a['col']]).max()<1E-5
+	assert list(a['npass'])==[int((v['p2']<=0.01).sum()),int(ok.sum())]
+
+def test_probabilities():
+	dg,dt,dt2=_data()
+	l=findr.lib(backend='numpy',rs=1)
+	a=l.cascade('pijs_gassist',dg,dt,dt2,tests=[(2,0.5),(5,0.5)],nodiag=True,nsample=60)
+	assert a['ret']==0 and len(a['row'])==a['npass'][-1]
+	assert not (a['row']==a['col']).any()
+	assert ((a['p2']>=0.5)&(a['p5']>=0.5)).all()
+	#With one block and all targets sampled, the first test matches pijs_gassist
+	v=l.pijs_gassist(dg,dt,dt2,nodiag=True)
+	assert np.abs(a['p2']-v['p2'][a['row'],a['col']]).max()<1E-5
+
+def test_c(clib):
+	"""Pairs passing P-value cutoffs agree with P-values of the library, away from the cutoffs."""
+	dg,dt,dt2=_data()
+	a=findr.lib(backend='numpy',rs=1).cascade('pijs_gassist_pv',dg,dt,dt2,tests=[(2,0.01),(4,0.05)])
+	v=clib.pijs_gassist_pv(dg,dt,dt2)
+	assert np.abs(a['p2']-v['p2'][a['row'],a['col']]).max()<=1E-4
+	ok=(v['p2']<=0.01-1E-4)&(v['p4']<=0.05-1E-4)
+	assert set(zip(*np.nonzero(ok)))<=set(zip(a['row'],a['col']))
@@ -0,0 +1,58 @@
+# Copyright 2016-2018, 2020 Lingfei Wang
+# 
+# This file is part of Findr.
+# 
+# Findr is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# Findr is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+# 
+# You should have received a copy of the GNU Affero General Public License
+# along with Findr.  If not, see <http://www.gnu.org/licenses/>.
+# 
+"""Tests of findr.dist: published runs assemble the outputs of row blocks."""
+
+import os
+import numpy as np
+import pytest
+import findr
+from findr import dist
+
+def _publish(tmp_path,nrow=5):
+	r=np.random.RandomState(0)
+	dt=r.randn(12,40).astype('f4')
+	dt2=r.randn(30,40).astype('f4')
+	f=[str(tmp_path/'dt.npy'),str(tmp_path/'dt2.npy')]
+	findr.io.save(f[0],dt)
+	findr.io.save(f[1],dt2)
+	out=str(tmp_path/'out')
+	ans=dist.publish(out,'pij_rank',f,nrow=nrow,nodiag=True)
+	return (out,f,dt,dt2,ans)
+
+def test_work_collect(tmp_path):
+	out,f,dt,dt2,ans=_publish(tmp_path)
+	assert ans['ret']==0 and ans['ntile']==3
+	l=findr.lib(backend='numpy',rs=3)
+	assert l.dist_work(out)['computed']==3
+	v=dist.collect(out)
+	assert v['ret']==0
+	p=np.load(v['files'][0])
+	assert np.abs(p-l.blocks('pij_rank',dt,dt2,nrow=5,nodiag=True)['p']).max()==0
+
+def test_changed_input(tmp_path):
+	out,f,dt,dt2,ans=_publish(tmp_path)
+	st=os.stat(f[1])
+	os.utime(f[1],ns=(st.st_atime_ns,st.st_mtime_ns+10**9))
+	with pytest.raises(ValueError):
+		findr.lib(backend='numpy').dist_work(out)
+
+def test_c(tmp_path,clib):
+	out,f,dt,dt2,ans=_publish(tmp_path)
+	assert clib.dist_work(out)['computed']==3
+	p=np.load(dist.collect(out)['files'][0])
+	assert np.abs(p-clib.blocks('pij_rank',dt,dt2,nrow=5,nodiag=True)['p']).max()==0
@@ -0,0 +1,73 @@
+# Copyright 2016-2018, 2020 Lingfei Wang
+# 
+# This file is part of Findr.
+# 
+# Findr is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# Findr is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+# 
+# You should have received a copy of the GNU Affero General Public License
+# along with Findr.  If not, see <http://www.gnu.org/licenses/>.
+# 
+"""Tests of findr.export: edge lists of pij outputs."""
+
+import gzip
+import numpy as np
+import pytest
+import findr
+from findr import export,io
+
+def _data():
+	p=np.random.RandomState(0).rand(25,30).astype('f4')
+	names=['g'+str(i) for i in range(30)]
+	return (p,names)
+
+def _edges(p,cutoff,nodiag=False):
+	t=p>=cutoff
+	if nodiag:
+		t[np.arange(len(p)),np.arange(len(p))]=False
+	r,c=np.nonzero(t)
+	return (r,c,p[r,c])
+
+@pytest.mark.parametrize('ext',['.txt','.gz'])
+def test_text(tmp_path,ext):
+	p,names=_data()
+	path=str(tmp_path/('e'+ext))
+	#Small blocks in several threads keep row-major order
+	n=export.edges(path,{'p':p},0.8,names=names,nodiag=True,nrow=3,nth=3)
+	r,c,v=_edges(p,0.8,nodiag=True)
+	assert n==len(r)
+	with (gzip.open(path,'rb') if ext=='.gz' else open(path,'rb')) as f:
+		s=f.read().decode('utf-8').splitlines()
+	assert s[0]=='A\tB\tp' and len(s)==n+1
+	x=[y.split('\t') for y in s[1:]]
+	assert [y[0] for y in x]==[names[i] for i in r] and [y[1] for y in x]==[names[i] for i in c]
+	assert np.allclose([float(y[2]) for y in x],v,rtol=1E-5)
+
+def test_binary(tmp_path):
+	p,names=_data()
+	path=str(tmp_path/'e.bin')
+	n=export.edges(path,p,0.05,below=True,binary=True,nrow=4)
+	d=io.load(path)
+	t=p<=0.05
+	assert n==t.sum()==len(d)
+	assert (p[d['row'],d['col']]==d['p']).all() and (d['p']<=0.05).all()
+
+def test_blocks(tmp_path):
+	r=np.random.RandomState(0)
+	dt=r.randn(12,30).astype('f4')
+	dt2=np.vstack([dt,r.randn(8,30).astype('f4')])
+	l=findr.lib(backend='numpy')
+	a=export.edges(str(tmp_path/'a.txt'),findr.blocks.iterblocks(l,'pij_rank',dt,dt2,nrow=5,nodiag=True),0.3,nodiag=True)
+	b=export.edges(str(tmp_path/'b.txt'),l.blocks('pij_rank',dt,dt2,nrow=5,nodiag=True),0.3,nodiag=True)
+	assert a==b
+	with open(str(tmp_path/'a.txt'),'rb') as f,open(str(tmp_path/'b.txt'),'rb') as g:
+		assert f.read()==g.read()
+	with pytest.raises(ValueError):
+		export.edges(str(tmp_path/'c.txt'),l.pij_rank(dt,dt2)['p'],0,names=['x'])
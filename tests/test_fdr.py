@@ -0,0 +1,80 @@
+# Copyright 2016-2018, 2020 Lingfei Wang
+# 
+# This file is part of Findr.
+# 
+# Findr is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# Findr is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+# 
+# You should have received a copy of the GNU Affero General Public License
+# along with Findr.  If not, see <http://www.gnu.org/licenses/>.
+# 
+"""Tests of findr.fdr: Benjamini-Hochberg thresholds and q-values."""
+
+import numpy as np
+import pytest
+from findr import fdr
+
+def _data(n=20000):
+	r=np.random.RandomState(0)
+	p=r.rand(n)
+	p[:n//10]*=1E-4
+	return r.permutation(p).astype('f4').reshape(200,-1)
+
+def _bh(p,alpha):
+	v=np.sort(p.ravel().astype(float))
+	m=len(v)
+	t=np.nonzero(v<=alpha*np.arange(1,m+1)/m)[0]
+	return (float(v[t[-1]]),t[-1]+1) if len(t)>0 else (0.,0)
+
+def _q(p):
+	v=p.ravel().astype(float)
+	o=np.argsort(v,kind='stable')
+	q=v[o]*len(v)/np.arange(1,len(v)+1)
+	q=np.minimum(np.minimum.accumulate(q[::-1])[::-1],1)
+	ans=np.empty_like(q)
+	ans[o]=q
+	return ans
+
+@pytest.mark.parametrize('memlimit',[2**28,2**10])
+def test_threshold(memlimit):
+	p=_data()
+	t,n=_bh(p,0.05)
+	ans=fdr.threshold(p,alpha=0.05,memlimit=memlimit,nrow=7)
+	assert ans['threshold']==np.float32(t) and ans['n']==n and ans['m']==p.size
+
+def test_threshold_approximate():
+	p=_data()
+	t,n=_bh(p,0.05)
+	#Iterables are read once in approximate mode
+	ans=fdr.threshold(iter([p[:50],{'p':p[50:]}]),alpha=0.05,exact=False)
+	assert ans['n']<=n<=ans['nmax'] and t<=ans['thresholdmax']
+	#Rejected P-values are discoveries of the exact threshold
+	assert (p<=ans['threshold']).sum()<=n
+	with pytest.raises(ValueError):
+		fdr.threshold(iter([p]),exact=True)
+
+@pytest.mark.parametrize('memlimit',[2**28,2**12])
+def test_qvalues(memlimit):
+	p=_data()
+	q=_q(p)
+	ans=fdr.qvalues(p,memlimit=memlimit)
+	assert ans['q'].shape==p.shape and ans['bound']==0
+	assert np.allclose(ans['q'].ravel(),q,rtol=1E-6,atol=0)
+	a=fdr.qvalues(lambda:iter([p[:30],p[30:]]),exact=False)
+	assert a['q'].shape==(p.size,)
+	assert (a['q']>=q*(1-1E-6)).all() and (a['q']<=q+a['bound']+1E-6).all()
+
+def test_hist():
+	p=_data()
+	h=fdr.hist(p,nth=2)
+	e=fdr.edges()
+	assert h.sum()==p.size and len(e)==len(h)+1
+	i=np.searchsorted(e,p.ravel().astype(float),side='right')-1
+	assert (np.bincount(i,minlength=len(h))==h).all()
@@ -0,0 +1,71 @@
+# Copyright 2016-2018, 2020 Lingfei Wang
+# 
+# This file is part of Findr.
+# 
+# Findr is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# Findr is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+# 
+# You should have received a copy of the GNU Affero General Public License
+# along with Findr.  If not, see <http://www.gnu.org/licenses/>.
+# 
+"""Tests of findr.io: findr-bin and .npy data files, and name lists."""
+
+import numpy as np
+import pytest
+import findr
+from findr import io
+
+@pytest.mark.parametrize('ext',['.bin','.npy'])
+def test_save_load(tmp_path,ext):
+	d=np.random.RandomState(0).rand(37,11).astype('f4')
+	path=str(tmp_path/('d'+ext))
+	#Small nbyte writes in several chunks, with conversion
+	io.save(path,d[:,::-1],dtype='f8',nbyte=200)
+	assert io.meta(path)==((37,11),np.dtype('f8'))
+	m=io.load(path)
+	assert isinstance(m,np.memmap) and m.dtype==np.dtype('f8')
+	assert (m==d[:,::-1]).all()
+	v=io.load(path,mode=None)
+	assert not isinstance(v,np.memmap) and (v==m).all()
+
+def test_raw(tmp_path):
+	d=np.arange(24,dtype='u1').reshape(6,4)
+	path=str(tmp_path/'g.bin')
+	d.tofile(path)
+	assert io.meta(path) is None
+	with pytest.raises(ValueError):
+		io.load(path)
+	assert (io.load(path,dtype='u1',shape=(-1,4))==d).all()
+	with pytest.raises(ValueError):
+		io.load(path,dtype='u1',shape=(-1,5))
+	#Raw genotypes are of gtype and expression data of ftype
+	e=np.random.RandomState(0).randn(6,4).astype('f4')
+	e.tofile(str(tmp_path/'t.bin'))
+	a=io.loadinputs([path,str(tmp_path/'t.bin')],'pij_gassist',ns=4)
+	assert (a[0]==d).all() and (a[1]==e).all()
+	with pytest.raises(ValueError):
+		io.loadinputs([path],'pij_gassist')
+
+@pytest.mark.parametrize('ext',['.bin','.npy'])
+def test_writeblocks(tmp_path,ext):
+	r=np.random.RandomState(0)
+	dt=r.randn(12,30).astype('f4')
+	dt2=r.randn(20,30).astype('f4')
+	l=findr.lib(backend='numpy')
+	path=str(tmp_path/('p'+ext))
+	ret=io.writeblocks(findr.blocks.iterblocks(l,'pij_rank_pv',dt,dt2,nrow=5),path,(12,20))
+	assert ret==0
+	assert (io.load(path)==l.pij_rank_pv(dt,dt2)['p']).all()
+
+def test_names(tmp_path):
+	names=['A1BG','ÄB','x y']
+	path=str(tmp_path/'names.txt')
+	io.savenames(path,names)
+	assert io.loadnames(path)==names
@@ -0,0 +1,79 @@
+# Copyright 2016-2018, 2020 Lingfei Wang
+# 
+# This file is part of Findr.
+# 
+# Findr is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# Findr is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+# 
+# You should have received a copy of the GNU Affero General Public License
+# along with Findr.  If not, see <http://www.gnu.org/licenses/>.
+# 
+"""Tests of findr.labeled: sample alignment and labeled outputs."""
+
+import numpy as np
+import pytest
+import findr
+from findr.labeled import align,matrix
+
+pd=pytest.importorskip('pandas')
+
+def _frames():
+	r=np.random.RandomState(0)
+	s=['s'+str(x) for x in range(30)]
+	dt=pd.DataFrame(r.randn(5,30),index=['g'+str(x) for x in range(5)],columns=s)
+	dt2=pd.DataFrame(r.randn(8,30),index=['h'+str(x) for x in range(8)],columns=s)
+	return (dt,dt2)
+
+def test_align_unlabeled():
+	"""Unlabeled inputs are kept when labeled inputs share the same samples."""
+	dt,dt2=_frames()
+	ds=[matrix(dt,'f4'),(dt2.to_numpy().astype('f4'),None,None),matrix(dt2,'f4')]
+	ans=align(*ds)
+	assert all(x is y for x,y in zip(ans,ds))
+
+def test_align_join():
+	dt,dt2=_frames()
+	ans=align(matrix(dt,'f4'),matrix(dt2.iloc[:,::-1].iloc[:,:20],'f4'))
+	assert ans[0][2]==ans[1][2] and len(ans[0][2])==20
+	assert np.allclose(ans[0][0],dt[ans[0][2]].to_numpy())
+	assert np.allclose(ans[1][0],dt2[ans[0][2]].to_numpy())
+	with pytest.raises(ValueError):
+		align(matrix(dt,'f4'),matrix(dt2.iloc[:,:20],'f4'),(np.zeros((2,30),dtype='f4'),None,None))
+
+def test_rank_labels():
+	dt,dt2=_frames()
+	l=findr.lib(backend='numpy',rs=1)
+	ans=l.labeled('pij_rank',dt,dt2)
+	assert list(ans['p'].index)==list(dt.index) and list(ans['p'].columns)==list(dt2.index)
+	assert ans['p'].to_numpy().flags['C_CONTIGUOUS']
+
+def test_packed():
+	dt=_frames()[1]
+	l=findr.lib(backend='numpy',rs=1)
+	ans=l.labeled('pij_rank_pv',dt,dt,packed=True,symmetric=True)
+	assert isinstance(ans['p'],np.ndarray) and ans['p'].shape==(8*9//2,)
+
+def test_packedg():
+	from findr.plink import packedg
+	r=np.random.RandomState(0)
+	g=packedg(r.randint(0,256,(5,10)).astype('u1'),40,missing=0)
+	dt=pd.DataFrame(r.randn(5,40).astype('f4'))
+	dt2=pd.DataFrame(r.randn(8,40).astype('f4'))
+	l=findr.lib(backend='numpy',rs=1)
+	ans=l.labeled('pij_gassist',g,dt,dt2)
+	assert ans['p'].shape==(5,8)
+	assert np.abs(ans['p'].to_numpy()-l.pij_gassist(np.asarray(g),dt.to_numpy(),dt2.to_numpy())['p']).max()==0
+
+def test_c(clib):
+	dt,dt2=_frames()
+	ans=clib.labeled('pij_rank',dt,dt2.iloc[:,::-1])
+	v=clib.pij_rank(dt.to_numpy().astype('f4'),dt2.to_numpy().astype('f4'))
+	assert list(ans['p'].index)==list(dt.index)
+	assert np.abs(ans['p'].to_numpy()-v['p']).max()==0
@@ -0,0 +1,100 @@
+# Copyright 2016-2018, 2020 Lingfei Wang
+# 
+# This file is part of Findr.
+# 
+# Findr is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# Findr is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+# 
+# You should have received a copy of the GNU Affero General Public License
+# along with Findr.  If not, see <http://www.gnu.org/licenses/>.
+# 
+"""Tests of findr.llr: log likelihood ratios of pij functions and their conversion."""
+
+import numpy as np
+import pytest
+import findr
+from findr import llr
+
+def _data(nt=15,nt2=40,ns=60):
+	r=np.random.RandomState(0)
+	dt=r.randn(nt,ns).astype('f4')
+	dt2=np.vstack([dt,r.randn(nt2-nt,ns).astype('f4')])
+	dt2[nt:]+=0.5*dt2[:nt2-nt]
+	return [r.randint(0,3,size=(nt,ns)).astype('u1'),dt,dt2]
+
+def test_rank():
+	dg,dt,dt2=_data()
+	ns=dt.shape[1]
+	d=llr.compute('pij_rank',dt,dt2)
+	r=np.corrcoef(dt.astype(float),dt2.astype(float))[:len(dt),len(dt):]
+	l=-ns/2.*np.log(np.clip(1-r**2,1E-300,None))
+	t=np.abs(r)<0.999
+	assert np.allclose(d['llr'][t],l[t],rtol=1E-4,atol=1E-4)
+
+def test_pv():
+	stats=pytest.importorskip('scipy.stats')
+	dg,dt,dt2=_data()
+	ns=dt.shape[1]
+	l=llr.compute('pij_rank',dt,dt2)['llr']
+	p=llr.pv(l,'rank',ns)
+	#exp(-2*LLR/ns)=1-r**2 follows Beta((ns-2)/2,1/2) under the null hypothesis
+	assert np.allclose(p,stats.beta.cdf(np.exp(-2*l.astype(float)/ns),(ns-2)/2.,0.5),atol=1E-6)
+
+@pytest.mark.parametrize('name',['pijs_gassist','pij_gassist','pij_gassist_trad','pijs_gassist_pv'])
+def test_convert(name):
+	data=_data()
+	l=findr.lib(backend='numpy')
+	a=getattr(l,name)(*data,nodiag=not name.endswith('_pv'),return_llr=True)
+	#LLRs of one function convert into outputs of others of the same family, as computed directly
+	b=llr.convert(name,llr.compute('pijs_gassist',*data),data[1].shape[1],nodiag=not name.endswith('_pv'))
+	for k in b:
+		if k!='ret':
+			assert np.allclose(a[k],b[k],atol=1E-6)
+	assert all(k in a for k in ['llr1','llr2','llr3','llr4','llr5','nv'])
+
+def test_convert_rows():
+	data=_data()
+	ns=data[1].shape[1]
+	d=llr.compute('pij_gassist',*data)
+	a=llr.convert('pij_gassist',d,ns,nodiag=True)
+	dcol=np.arange(15)
+	lmax=dict((k,llr._lmax(d[k],dcol)) for k in ['llr2','llr3','llr4','llr5'])
+	#Row subsets with global histogram bounds reproduce full conversion
+	for s in [slice(0,4),slice(4,15)]:
+		b=llr.convert('pij_gassist',dict((k,d[k][s]) for k in d),ns,nodiag=True,lmax=lmax,rows=np.arange(15)[s])
+		assert np.allclose(a['p'][s],b['p'],atol=1E-6)
+
+def test_c_return_llr(clib):
+	data=_data()
+	ns=data[1].shape[1]
+	a=clib.pijs_gassist_pv(*data,return_llr=True)
+	d=llr.compute('pijs_gassist_pv',*data)
+	assert all((a[k]==d[k]).all() for k in d)
+	#P-values of the library agree with conversion of python LLRs
+	b=llr.convert('pijs_gassist_pv',d,ns)
+	assert all(np.abs(a[k]-b[k]).max()<=1E-4 for k in b if k!='ret')
+	a=clib.pij_rank_pv(data[1],data[2])
+	assert np.abs(a['p']-llr.pv(llr.compute('pij_rank',data[1],data[2])['llr'],'rank',ns)).max()<=1E-4
+
+def test_nsample():
+	data=_data(nt2=400)
+	ns=data[1].shape[1]
+	d=llr.compute('pijs_gassist',*data)
+	a=llr.convert('pijs_gassist',d,ns,nodiag=True)
+	b=llr.convert('pijs_gassist',d,ns,nodiag=True,nsample=200,seed=1,nerror=15)
+	#Reported error is that of checked rows against exact conversion, here all rows
+	v=np.concatenate([np.abs(a[k]-b[k]).ravel() for k in a if k!='ret'])
+	assert np.isclose(b['errormax'],v.max(),atol=1E-6) and np.isclose(b['error'],v.mean(),atol=1E-6)
+	assert b['error']<0.1
+	c=llr.convert('pijs_gassist',d,ns,nodiag=True,nsample=200,seed=1,nerror=15)
+	assert all(np.array_equal(b[k],c[k]) for k in b if k!='ret')
+	#The NumPy engine samples with rs of findr.lib
+	e=findr.lib(backend='numpy',rs=1).pijs_gassist(*data,nodiag=True,nsample=200)
+	assert all(np.array_equal(e[k],b[k]) for k in a if k!='ret')
@@ -0,0 +1,80 @@
+# Copyright 2016-2018, 2020 Lingfei Wang
+# 
+# This file is part of Findr.
+# 
+# Findr is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# Findr is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+# 
+# You should have received a copy of the GNU Affero General Public License
+# along with Findr.  If not, see <http://www.gnu.org/licenses/>.
+# 
+"""Tests of the command line interface (python -m findr) on the NumPy engine."""
+
+import json
+import os
+import numpy as np
+import pytest
+import findr
+from findr.__main__ import main
+
+def _run(capsys,args):
+	ret=main(args)
+	ans=json.loads(capsys.readouterr().out)
+	return (ret,ans)
+
+@pytest.fixture
+def inputs(tmp_path):
+	r=np.random.RandomState(0)
+	dg=r.randint(0,3,(11,40)).astype('u1')
+	dt=(r.randn(11,40)+dg).astype('f4')
+	dt2=np.vstack([dt,r.randn(9,40).astype('f4')])
+	paths=[str(tmp_path/x) for x in ['dg.npy','dt.npy','dt2.npy']]
+	for p,d in zip(paths,[dg,dt,dt2]):
+		np.save(p,d)
+	return (paths,[dg,dt,dt2])
+
+def test_run(capsys,tmp_path,inputs):
+	paths,data=inputs
+	out=str(tmp_path/'out')
+	opts=['--nodiag','--nrow','4','--backend','numpy','--rs','1']
+	ret,ans=_run(capsys,['run','pij_gassist']+paths+['-o',out]+opts)
+	assert ret==0 and ans['nblock']==3 and ans['computed']==3
+	l=findr.lib(backend='numpy',rs=1)
+	p=l.blocks('pij_gassist',*data,nrow=4,nodiag=True)['p']
+	assert len(ans['files'])==1 and (np.load(ans['files'][0])==p).all()
+	#Rerunning skips completed blocks
+	ret,ans=_run(capsys,['run','pij_gassist']+paths+['-o',out]+opts)
+	assert ret==0 and ans['skipped']==3 and ans['computed']==0
+
+def test_shard_merge(capsys,tmp_path,inputs):
+	paths,data=inputs
+	out=str(tmp_path/'out')
+	opts=['--nrow','3','--backend','numpy']
+	for i in range(2):
+		ret,ans=_run(capsys,['run','pijs_gassist_pv']+paths+['-o',out,'--shard',str(i)+'/2']+opts)
+		assert ret==0 and 'files' not in ans
+	ret,ans=_run(capsys,['merge','pijs_gassist_pv']+paths+['-o',out,'--nrow','3'])
+	assert ret==0
+	v=findr.lib(backend='numpy').pijs_gassist_pv(*data)
+	for f in ans['files']:
+		k=os.path.basename(f).split('.')[0]
+		assert np.allclose(np.load(f),v[k],atol=1E-6)
+
+def test_netr_plan(capsys,tmp_path):
+	d=np.random.RandomState(0).rand(15,15).astype('f4')
+	path=str(tmp_path/'dp.npy')
+	np.save(path,d)
+	out=str(tmp_path/'net.npy')
+	ret,ans=_run(capsys,['netr',path,'-o',out,'--backend','numpy','--namax','20'])
+	assert ret==0 and ans['nedge']==20
+	assert (np.load(out)==findr.lib(backend='numpy').netr_one_greedy(d,namax=20)['net']).all()
+	ret,ans=_run(capsys,['plan','pijs_gassist','100','1000','50','--nrow','10','--memory',str(2**30),'--backend','numpy'])
+	assert ret==0 and ans['memory']>0 and ans['maxnrow']==100
+	assert main(['run','pij_rank',path,'-o',out+'x','--backend','numpy'])==1
@@ -0,0 +1,107 @@
+# Copyright 2016-2018, 2020 Lingfei Wang
+# 
+# This file is part of Findr.
+# 
+# Findr is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# Findr is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+# 
+# You should have received a copy of the GNU Affero General Public License
+# along with Findr.  If not, see <http://www.gnu.org/licenses/>.
+# 
+"""Tests of findr.netr: network analytics and greedy reconstruction."""
+
+import numpy as np
+import pytest
+import findr
+from findr import netr
+
+def _dag(nt=60,p=0.08,seed=0):
+	r=np.random.RandomState(seed)
+	net=np.triu(r.rand(nt,nt)<p,1)
+	o=r.permutation(nt)
+	return net[o][:,o]
+
+def _closure(net):
+	ans=net.copy()
+	while True:
+		v=ans|(np.dot(ans.astype(int),ans.astype(int))>0)
+		if (v==ans).all():
+			return ans
+		ans=v
+
+def test_toposort():
+	net=_dag()
+	o=netr.toposort(net)
+	pos=np.empty(len(o),dtype=int)
+	pos[o]=np.arange(len(o))
+	r,c=np.nonzero(net)
+	assert sorted(o.tolist())==list(range(len(net))) and (pos[r]<pos[c]).all()
+	net[c[0],r[0]]=True
+	with pytest.raises(ValueError):
+		netr.toposort(net)
+
+def test_reach():
+	net=_dag()
+	nt=len(net)
+	d=_closure(net)
+	bits=netr.reach(net)
+	anc=netr.reach(net,reverse=True)
+	assert all((netr.members(bits,i,nt)==np.nonzero(d[i])[0]).all() for i in range(nt))
+	assert all((netr.members(anc,i,nt)==np.nonzero(d[:,i])[0]).all() for i in range(nt))
+	assert (netr.counts(bits,nbyte=64)==d.sum(axis=1)).all()
+
+def test_reduction():
+	net=_dag()
+	d=_closure(net)
+	ans=netr.reduction(net,nbyte=16)
+	#An edge is redundant iff another child of its source reaches its target
+	keep=net&~(np.dot(net.astype(int),d.astype(int))>0)
+	assert (ans==keep).all()
+	assert (_closure(ans)==d).all()
+
+def _dp(nt=70,seed=0,levels=None):
+	dp=np.random.RandomState(seed).rand(nt,nt).astype('f4')
+	#Coarse levels introduce ties
+	return dp if levels is None else (np.floor(dp*levels)/levels).astype('f4')
+
+@pytest.mark.parametrize('levels',[None,20])
+@pytest.mark.parametrize('ka',[{'namax':300},{'nimax':3},{'nomax':2,'namax':150},{}])
+def test_greedy(levels,ka):
+	dp=_dp(levels=levels)
+	l=findr.lib(backend='numpy')
+	a=l.netr_one_greedy(dp,**ka)
+	#Small batches and several threads give the sequential result
+	for nth,nbatch in [(1,4096),(3,7)]:
+		b=netr.greedy(dp,nth=nth,nbatch=nbatch,**ka)
+		assert b['ret']==0 and (a['net']==b['net']).all()
+	assert (l.netr_one_greedy_parallel(dp,**ka)['net']==a['net']).all()
+
+def test_argsort():
+	k=np.random.RandomState(0).randint(0,50,size=200000)
+	assert (netr.argsort(k,nth=3)==np.argsort(k,kind='stable')).all()
+
+def test_record_prefix():
+	dp=_dp(levels=20)
+	l=findr.lib(backend='numpy')
+	r=netr.record(dp,nimax=4,nth=2,nbatch=11)
+	assert r['nt']==len(dp) and len(r['row'])==len(r['col'])==len(r['rank'])
+	assert (np.diff(r['rank'])>0).all() and (r['row']!=r['col']).all()
+	for n in [1,50,len(r['row'])]:
+		assert (netr.prefix(r,n)['net']==l.netr_one_greedy(dp,namax=n,nimax=4)['net']).all()
+	with pytest.raises(ValueError):
+		netr.prefix(r,0)
+
+def test_sweep():
+	dp=_dp()
+	l=findr.lib(backend='numpy')
+	a=l.netr_one_greedy_sweep(dp,namax=[20,100,None],nimax=[None,3],nomax=2)
+	assert len(a['net'])==6 and a['params'][0]==(20,None,2) and a['params'][3]==(20,3,2)
+	for (xa,xi,xo),net in zip(a['params'],a['net']):
+		assert (net==l.netr_one_greedy(dp,namax=xa,nimax=xi,nomax=xo)['net']).all()
@@ -0,0 +1,82 @@
+# Copyright 2016-2018, 2020 Lingfei Wang
+# 
+# This file is part of Findr.
+# 
+# Findr is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# Findr is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+# 
+# You should have received a copy of the GNU Affero General Public License
+# along with Findr.  If not, see <http://www.gnu.org/licenses/>.
+# 
+"""Tests of findr.panel: target panels for repeated queries."""
+
+import numpy as np
+import pytest
+import findr
+from findr import llr
+from findr.panel import panel
+
+def _data():
+	r=np.random.RandomState(0)
+	dg=r.randint(0,3,(10,40)).astype('u1')
+	dt=(r.randn(10,40)+dg).astype('f4')
+	dt2=np.vstack([dt,r.randn(15,40).astype('f4')]).astype('f8')
+	return (dg,dt,dt2)
+
+def test_panel():
+	dg,dt,dt2=_data()
+	p=panel(dt2)
+	assert p.shape==dt2.shape and p.dtype==np.dtype('f4') and len(p)==25
+	assert not p.data.flags.writeable and p.std() is p.std()
+	with pytest.raises(ValueError):
+		p.data[0,0]=0
+	#Panels of float32 inputs are copies, so later changes of inputs do not affect them
+	x=dt2.astype('f4')
+	q=panel(x)
+	x[0]=0
+	assert (np.asarray(q)==p.data).all()
+	dt2[0,0]=np.nan
+	with pytest.raises(ValueError):
+		panel(dt2)
+
+@pytest.mark.parametrize('name',['pij_gassist','pijs_gassist_pv','pij_rank','pij_cassist_trad'])
+def test_query(name):
+	dg,dt,dt2=_data()
+	l=findr.lib(backend='numpy')
+	data=[dt] if 'rank' in name else [dg if 'gassist' in name else dt+1,dt]
+	p=panel(dt2)
+	ka={} if name.endswith('_pv') else {'nodiag':True}
+	a=getattr(l,name)(*data,dt2,**ka)
+	for s in [slice(0,10),slice(3,7)]:
+		b=getattr(l,name)(*[x[s] for x in data],p,**ka)
+		c=getattr(l,name)(*[x[s] for x in data],dt2,**ka)
+		assert all((b[k]==c[k]).all() for k in b if k!='ret')
+	assert all(np.allclose(a[k],getattr(l,name)(*data,p,**ka)[k],atol=1E-6) for k in a if k!='ret')
+
+def test_llr_cascade():
+	dg,dt,dt2=_data()
+	p=panel(dt2)
+	a=llr.compute('pijs_gassist',dg,dt,dt2)
+	b=llr.compute('pijs_gassist',dg,dt,p)
+	assert all(np.allclose(a[k],b[k],atol=1E-5) for k in a)
+	l=findr.lib(backend='numpy',rs=1)
+	a=l.cascade('pijs_gassist',dg,dt,dt2,nodiag=True)
+	b=l.cascade('pijs_gassist',dg,dt,p,nodiag=True)
+	assert (a['row']==b['row']).all() and (a['col']==b['col']).all()
+
+def test_c(clib):
+	dg,dt,dt2=_data()
+	p=panel(dt2)
+	for name in ['pij_gassist','pijs_gassist_pv','pij_rank']:
+		data=[dt] if 'rank' in name else [dg,dt]
+		ka={} if name.endswith('_pv') else {'nodiag':True}
+		a=getattr(clib,name)(*data,dt2,**ka)
+		b=getattr(clib,name)(*data,p,**ka)
+		assert all((a[k]==b[k]).all() for k in a if k!='ret')
@@ -0,0 +1,57 @@
+# Copyright 2016-2018, 2020 Lingfei Wang
+# 
+# This file is part of Findr.
+# 
+# Findr is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# Findr is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+# 
+# You should have received a copy of the GNU Affero General Public License
+# along with Findr.  If not, see <http://www.gnu.org/licenses/>.
+# 
+"""Tests of findr.plan: memory and runtime predictions, and calibration."""
+
+import numpy as np
+import findr
+from findr import plan
+
+def test_nnls():
+	x=np.array([[1,1,0],[1,2,0],[1,3,0],[1,4,0]],dtype=float)
+	#Unconstrained least squares gives a negative intercept
+	y=np.array([0.,1,2,3])
+	c=plan._nnls(x,y)
+	assert (c>=0).all() and c[2]==0
+	assert np.allclose(c,[0,np.dot(x[:,1],y)/np.dot(x[:,1],x[:,1]),0])
+	assert np.allclose(plan._nnls(x,1+2*x[:,1]),[1,2,0])
+
+def test_profile(tmp_path):
+	path=str(tmp_path/'profile.json')
+	l=findr.lib(backend='numpy',rs=1)
+	ans=l.calibrate(path=path,names=['pij_rank'],ns=[10,20],sizes=[(5,20),(10,40)],repeat=1)
+	assert all(v>=0 for v in ans['pij_rank'])
+	assert plan.loadprofile(path,plan.profilekey('numpy'))['pij_rank']==ans['pij_rank']
+	assert plan.loadprofile(path,plan.profilekey('c'))=={}
+	assert plan.estimate('pij_rank',10,40,20,profile=path,backend='numpy')['calibrated']
+	assert not plan.estimate('pij_rank',10,40,20,profile=path)['calibrated']
+	assert plan.profilekey('c','1.0.9')!=plan.profilekey('c','1.0.8')
+
+def test_memory_numpy():
+	import tracemalloc
+	r=np.random.RandomState(0)
+	nt,nt2,ns=200,1000,50
+	data=[r.randint(0,3,(nt,ns)).astype('u1'),r.randn(nt,ns).astype('f4'),r.randn(nt2,ns).astype('f4')]
+	l=findr.lib(backend='numpy',rs=1)
+	tracemalloc.start()
+	l.blocks('pijs_gassist',*data,nrow=50)
+	peak=tracemalloc.get_traced_memory()[1]
+	tracemalloc.stop()
+	m=plan.memory('pijs_gassist',nt,nt2,ns,nrow=50,backend='numpy')
+	#Inputs were allocated before tracing
+	assert sum(m.values())-m['inputs']>=peak
+	assert plan.maxnrow('pijs_gassist',nt,nt2,ns,sum(m.values()),backend='numpy')>=50
@@ -0,0 +1,101 @@
+# Copyright 2016-2018, 2020 Lingfei Wang
+# 
+# This file is part of Findr.
+# 
+# Findr is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# Findr is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+# 
+# You should have received a copy of the GNU Affero General Public License
+# along with Findr.  If not, see <http://www.gnu.org/licenses/>.
+# 
+"""Tests of findr.plink: memory-mapped PLINK .bed genotypes in packed form."""
+
+import numpy as np
+import pytest
+import findr
+from findr import plink
+
+def _write(prefix,g):
+	"""Writes genotypes as counts of allele 1, with 255 for missing, into PLINK binary files."""
+	nsnp,ns=g.shape
+	code=np.zeros(g.shape,dtype='u1')
+	code[g==2]=0
+	code[g==255]=1
+	code[g==1]=2
+	code[g==0]=3
+	c=np.zeros((nsnp,4*((ns+3)//4)),dtype='u1')
+	c[:,:ns]=code
+	c=c.reshape(nsnp,-1,4)
+	packed=(c[:,:,0]|(c[:,:,1]<<2)|(c[:,:,2]<<4)|(c[:,:,3]<<6)).astype('u1')
+	with open(prefix+'.bed','wb') as f:
+		f.write(bytearray([0x6c,0x1b,1]))
+		f.write(packed.tobytes())
+	with open(prefix+'.fam','w') as f:
+		f.write(''.join('f{0} s{0} 0 0 0 -9\n'.format(i) for i in range(ns)))
+	with open(prefix+'.bim','w') as f:
+		f.write(''.join('1 rs{0} 0 {1} A G\n'.format(i,1000*i) for i in range(nsnp)))
+
+@pytest.fixture
+def data(tmp_path):
+	g=np.random.RandomState(0).randint(0,3,size=(30,41)).astype('u1')
+	prefix=str(tmp_path/'g')
+	_write(prefix,g)
+	return (prefix,g)
+
+def test_select(data):
+	prefix,g=data
+	b=plink.bed(prefix+'.bed')
+	assert b.ns==41 and b.nsnp==30 and b.pos[3]==3000
+	dg=b.select()
+	assert dg.shape==g.shape and (np.asarray(dg)==g).all()
+	snps=['rs5','rs2','rs29']
+	samples=[40,0,7,3]
+	dg=b.select(snps,['s'+str(x) for x in samples])
+	assert (np.asarray(dg)==g[[5,2,29]][:,samples]).all()
+	assert (dg[1:]==g[[2,29]][:,samples]).all() and (dg[2]==g[29,samples]).all()
+	assert dg.max()==np.asarray(dg).max()
+	with pytest.raises(ValueError):
+		b.select(['rs100'])
+
+def test_missing(data):
+	prefix,g=data
+	g=g.copy()
+	g[4,9]=255
+	_write(prefix,g)
+	b=plink.bed(prefix)
+	with pytest.raises(ValueError):
+		np.asarray(b.select([4]))
+	assert b.select([4],missing=3)[0][9]==3
+	assert (b.select([3])[0]==g[3]).all()
+
+def test_blocks(data):
+	prefix,g=data
+	r=np.random.RandomState(1)
+	dt=r.randn(30,41).astype('f4')
+	dt2=np.vstack([dt,r.randn(10,41).astype('f4')])
+	l=findr.lib(backend='numpy')
+	dg=plink.bed(prefix).select()
+	#Packed genotypes are unpacked per block with the same outputs as unpacked ones
+	a=l.blocks('pij_gassist',dg,dt,dt2,nrow=7,nodiag=True)
+	b=l.blocks('pij_gassist',g,dt,dt2,nrow=7,nodiag=True)
+	assert (a['p']==b['p']).all()
+	a=l.blocks('pijs_gassist_pv',dg,dt,dt2,nrow=7)
+	b=l.pijs_gassist_pv(g,dt,dt2)
+	assert all(np.allclose(a[k],b[k],atol=1E-6) for k in b if k!='ret')
+
+def test_c(data,clib):
+	prefix,g=data
+	r=np.random.RandomState(1)
+	dt=r.randn(30,41).astype('f4')
+	dt2=np.vstack([dt,r.randn(10,41).astype('f4')])
+	dg=plink.bed(prefix).select()
+	a=clib.blocks('pij_gassist',dg,dt,dt2,nrow=7,nodiag=True)
+	b=clib.blocks('pij_gassist',g,dt,dt2,nrow=7,nodiag=True)
+	assert (a['p']==b['p']).all()
@@ -0,0 +1,64 @@
+# Copyright 2016-2018, 2020 Lingfei Wang
+# 
+# This file is part of Findr.
+# 
+# Findr is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# Findr is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+# 
+# You should have received a copy of the GNU Affero General Public License
+# along with Findr.  If not, see <http://www.gnu.org/licenses/>.
+# 
+"""Tests of findr.preprocess: supernormalization."""
+
+import numpy as np
+import pytest
+from findr import preprocess
+
+def _data():
+	d=np.random.RandomState(0).randn(37,20)
+	d[:,3]=d[:,5]
+	return d
+
+def test_supernormalize():
+	from findr.stats import ndtri
+	d=_data()
+	ans=preprocess.supernormalize(d,nrow=5,nth=3)
+	assert ans.dtype==np.dtype('f4')
+	#Ties receive the average rank
+	assert (ans[:,3]==ans[:,5]).all()
+	r=preprocess.rank(d[:1])[0]
+	assert r[3]==r[5] and r[3]==int(r[3])+0.5
+	assert np.allclose(ans[0],ndtri(r/21.),atol=1E-6)
+	#Blocks and threads do not change outputs
+	assert (preprocess.supernormalize(d)==ans).all()
+
+def test_out(tmp_path):
+	d=_data()
+	ans=preprocess.supernormalize(d)
+	out=np.empty(d.shape,dtype='f4')
+	assert preprocess.supernormalize(d,out=out) is out
+	assert (out==ans).all()
+	m=preprocess.supernormalize(d,out=str(tmp_path/'o.npy'))
+	assert isinstance(m,np.memmap) and (m==ans).all()
+	with pytest.raises(ValueError):
+		preprocess.supernormalize(d,out=np.empty(d.shape))
+	with pytest.raises(ValueError):
+		preprocess.supernormalize(d,out=np.empty((3,3),dtype='f4'))
+
+def test_cache(tmp_path):
+	d=_data()
+	a=preprocess.supernormalize(d,cache=str(tmp_path))
+	b=preprocess.supernormalize(d,cache=str(tmp_path))
+	assert len(list(tmp_path.iterdir()))==1
+	assert type(a) is type(b) is np.ndarray and b.flags.writeable
+	assert (a==b).all()
+	out=np.zeros(d.shape,dtype='f4')
+	assert preprocess.supernormalize(d,out=out,cache=str(tmp_path)) is out
+	assert (out==a).all()
@@ -0,0 +1,67 @@
+# Copyright 2016-2018, 2020 Lingfei Wang
+# 
+# This file is part of Findr.
+# 
+# Findr is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# Findr is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+# 
+# You should have received a copy of the GNU Affero General Public License
+# along with Findr.  If not, see <http://www.gnu.org/licenses/>.
+# 
+"""Tests of findr.quant: reduced precision storage of probabilities."""
+
+import numpy as np
+import pytest
+import findr
+from findr import quant
+
+@pytest.mark.parametrize('fmt',['f2','u2','u1'])
+def test_roundtrip(fmt):
+	p=np.random.RandomState(0).rand(50,40).astype('f4')
+	q=quant.quantize(p,fmt)
+	v=quant.dequantize(q)
+	assert np.abs(v-p).max()<=quant.resolution(fmt)*1.01
+	#Order is preserved
+	i=np.argsort(p.ravel(),kind='stable')
+	assert (np.diff(q.ravel()[i].astype(float))>=0).all()
+
+def test_pv_refused():
+	with pytest.raises(ValueError):
+		quant.check('pij_gassist_pv','u1')
+
+def test_blocks_out_dtype():
+	r=np.random.RandomState(0)
+	dt=r.randn(10,40).astype('f4')
+	dt2=r.randn(30,40).astype('f4')
+	l=findr.lib(backend='numpy',rs=1)
+	a=l.blocks('pij_rank',dt,dt2,nrow=4,out_dtype='u2')
+	b=l.blocks('pij_rank',dt,dt2,nrow=4)
+	assert a['p'].dtype==np.dtype('u2')
+	assert np.abs(quant.dequantize(a['p'])-b['p']).max()<=quant.resolution('u2')*1.01
+
+def test_quantized_prior():
+	dp=np.random.RandomState(0).rand(12,12).astype('f4')
+	q=quant.quantize(dp,'u2')
+	l=findr.lib(backend='numpy')
+	a=l.netr_one_greedy(q,namax=20)
+	b=l.netr_one_greedy(quant.dequantize(q),namax=20)
+	assert (a['net']==b['net']).all()
+
+def test_c_blocks_out_dtype(clib):
+	r=np.random.RandomState(0)
+	dt=r.randn(10,40).astype('f4')
+	dt2=r.randn(30,40).astype('f4')
+	a=clib.blocks('pij_rank',dt,dt2,nrow=4,out_dtype='u1')
+	b=clib.blocks('pij_rank',dt,dt2,nrow=4)
+	assert (a['p']==quant.quantize(b['p'],'u1')).all()
+	#Quantized priors give the same network up to ties
+	dp=r.rand(12,12).astype('f4')
+	q=quant.quantize(dp,'u2')
+	assert (clib.netr_one_greedy(q,namax=20)['net']==clib.netr_one_greedy(quant.dequantize(q),namax=20)['net']).all()
@@ -0,0 +1,84 @@
+# Copyright 2016-2018, 2020 Lingfei Wang
+# 
+# This file is part of Findr.
+# 
+# Findr is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# Findr is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+# 
+# You should have received a copy of the GNU Affero General Public License
+# along with Findr.  If not, see <http://www.gnu.org/licenses/>.
+# 
+"""Tests of findr.server: row queries agree with calls of the same engine."""
+
+import sys
+import threading
+import numpy as np
+import pytest
+import findr
+
+pytestmark=pytest.mark.skipif(sys.version_info<(3,8),reason='findr.server requires python 3.8')
+
+def _serve(tmp_path,l):
+	from findr.server import server,client
+	path=str(tmp_path/'findr.sock')
+	s=server(path,l=l,window=0.01)
+	t=threading.Thread(target=s.serve_forever)
+	t.start()
+	r=np.random.RandomState(0)
+	dg=r.randint(0,3,(12,40)).astype('u1')
+	dt=(r.randn(12,40)+dg).astype('f4')
+	dt2=r.randn(30,40).astype('f4')
+	dt2[:12]+=dt
+	with client(path) as x:
+		x.put('dg',dg,genotype=True)
+		x.put('dt',dt)
+		x.put('dt2',dt2)
+		yield (x,path)
+		x.shutdown()
+	t.join()
+
+@pytest.fixture
+def c(tmp_path):
+	for x in _serve(tmp_path,findr.lib(backend='numpy',rs=3)):
+		yield x
+
+@pytest.fixture
+def cc(tmp_path,clib):
+	for x in _serve(tmp_path,clib):
+		yield x
+
+@pytest.mark.parametrize('name',['pij_gassist','pijs_gassist','pijs_gassist_pv'])
+def test_rows_equal_full(c,name):
+	c=c[0]
+	ka={} if name.endswith('_pv') else {'nodiag':True}
+	a=c.run(name,'dg','dt','dt2',**ka)
+	b=c.run(name,'dg','dt','dt2',rows=list(range(12)),**ka)
+	for k in a:
+		if isinstance(a[k],np.ndarray):
+			assert np.abs(a[k]-b[k]).max()==0
+
+def test_merged_pv(c):
+	from concurrent.futures import ThreadPoolExecutor
+	from findr.server import client
+	c,path=c
+	full=c.run('pijs_gassist_pv','dg','dt','dt2')
+	def one(rows):
+		with client(path) as x:
+			return x.run('pijs_gassist_pv','dg','dt','dt2',rows=rows)
+	rows=[[0,5],[3],[11,2,7]]
+	with ThreadPoolExecutor(3) as p:
+		ans=list(p.map(one,rows))
+	for r,a in zip(rows,ans):
+		for k in ['p1','p2','p3','p4','p5']:
+			assert np.abs(a[k]-full[k][r]).max()==0
+
+@pytest.mark.parametrize('name',['pij_gassist','pijs_gassist_pv'])
+def test_c_rows_equal_full(cc,name):
+	test_rows_equal_full(cc,name)
@@ -0,0 +1,63 @@
+# Copyright 2016-2018, 2020 Lingfei Wang
+# 
+# This file is part of Findr.
+# 
+# Findr is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# Findr is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+# 
+# You should have received a copy of the GNU Affero General Public License
+# along with Findr.  If not, see <http://www.gnu.org/licenses/>.
+# 
+"""Tests of findr.stability: statistics over replicates and network success."""
+
+import numpy as np
+import findr
+
+def _data():
+	r=np.random.RandomState(0)
+	dg=r.randint(0,3,(8,60)).astype('u1')
+	dt=(r.randn(8,60)+dg).astype('f4')
+	dt2=r.randn(20,60).astype('f4')
+	dt2[:8]+=dt
+	return (dg,dt,dt2)
+
+def test_network_ret():
+	"""netr_one_greedy reports success as ret=True, which is not a failure of the run."""
+	l=findr.lib(backend='numpy',rs=3)
+	ans=l.stability('pij_gassist',*_data(),nrep=4,nodiag=True,net={'namax':10})
+	assert ans['ret']==0 and ans['nrep']==4
+	assert np.isclose(ans['netfreq'].sum(),10)
+	assert ((ans['freq']>=0)&(ans['freq']<=1)).all() and (ans['sd']>=0).all()
+
+def test_replicates_equal_calls():
+	from findr.stability import resamples
+	d=_data()
+	l=findr.lib(backend='numpy',rs=3)
+	ans=l.stability('pij_gassist',*d,nrep=3,nodiag=True)
+	idx=list(resamples(60,3,seed=3))
+	v=[l.pij_gassist(*[x[:,t] for x in d],na=2,nodiag=True)['p'] for t in idx]
+	assert np.abs(ans['mean']-np.mean(v,axis=0)).max()<1E-6
+
+def test_processes():
+	d=_data()
+	l=findr.lib(backend='numpy',rs=3,nth=4)
+	a=l.stability('pij_gassist',*d,nrep=5,nodiag=True,net={'namax':10})
+	b=l.stability('pij_gassist',*d,nrep=5,nodiag=True,net={'namax':10},njob=2)
+	assert b['ret']==0 and l.nth==4
+	for k in ['mean','sd','freq','netfreq']:
+		assert np.abs(a[k]-b[k]).max()<1E-6
+
+def test_c(clib):
+	"""Network success of the library (ret=True) is not a failure, in processes as in the parent."""
+	d=_data()
+	a=clib.stability('pij_gassist',*d,nrep=4,nodiag=True,net={'namax':10})
+	b=clib.stability('pij_gassist',*d,nrep=4,nodiag=True,net={'namax':10},njob=2)
+	assert a['ret']==0 and b['ret']==0
+	assert np.abs(a['mean']-b['mean']).max()<1E-6 and np.isclose(a['netfreq'].sum(),10)
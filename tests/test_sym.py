@@ -0,0 +1,77 @@
+# Copyright 2016-2018, 2020 Lingfei Wang
+# 
+# This file is part of Findr.
+# 
+# Findr is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# Findr is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+# 
+# You should have received a copy of the GNU Affero General Public License
+# along with Findr.  If not, see <http://www.gnu.org/licenses/>.
+# 
+"""Tests of findr.sym: symmetric mode of pij_rank_pv and pij_rank, and packed storage."""
+
+import numpy as np
+import pytest
+import findr
+from findr import sym
+
+def _data(nt=23,ns=30):
+	return np.random.RandomState(0).randn(nt,ns).astype('f4')
+
+def test_pack():
+	x=np.random.RandomState(0).rand(9,9)
+	x=x+x.T
+	v=sym.pack(x)
+	assert len(v)==sym.offsets(9)[-1]==45
+	assert (sym.unpack(v)==x).all()
+	i,j=np.array([0,3,8]),np.array([5,1,8])
+	assert (v[sym.index(i,j,9)]==x[i,j]).all()
+
+@pytest.mark.parametrize('packed',[False,True])
+def test_rank_pv(packed):
+	dt=_data()
+	l=findr.lib(backend='numpy')
+	a=l.pij_rank_pv(dt,dt)
+	b=l.pij_rank_pv(dt,dt,symmetric=True,packed=packed,return_llr=True)
+	p=sym.unpack(b['p']) if packed else b['p']
+	#Small blocks exercise assembly across blocks
+	c=sym.rank_pv(l,dt,packed=packed,nbyte=8*23*4)
+	assert np.allclose(p,a['p'],atol=1E-6)
+	assert (c['p']==b['p']).all()
+	assert (p==p.T).all()
+
+def test_rank():
+	dt=_data()
+	l=findr.lib(backend='numpy')
+	a=l.pij_rank(dt,dt,nodiag=True)
+	b=l.pij_rank(dt,dt,nodiag=True,symmetric=True)
+	c=sym.rank(l,dt,nodiag=True,nbyte=8*23*4)
+	assert np.allclose(a['p'],b['p'],atol=1E-5)
+	assert (b['p']==c['p']).all()
+
+def test_default():
+	dt=_data()
+	l=findr.lib(backend='numpy')
+	#Not detected by default, and packed requires symmetric
+	with pytest.raises(ValueError):
+		l.pij_rank_pv(dt,dt,packed=True)
+	assert sym.same(dt,dt) and sym.same(dt,dt[:])
+	assert not sym.same(dt,dt.copy())
+
+def test_c(clib):
+	dt=_data()
+	a=clib.pij_rank_pv(dt,dt)
+	b=clib.pij_rank_pv(dt,dt,symmetric=True)
+	p=clib.pij_rank_pv(dt,dt,symmetric=True,packed=True)['p']
+	assert np.abs(a['p']-b['p']).max()<=1E-6 and (sym.unpack(p)==b['p']).all()
+	#Symmetric mode of pij_rank follows the NumPy engine
+	c=clib.pij_rank(dt,dt,nodiag=True,symmetric=True)
+	d=findr.lib(backend='numpy').pij_rank(dt,dt,nodiag=True,symmetric=True)
+	assert (c['p']==d['p']).all()